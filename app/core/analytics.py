@@ -0,0 +1,110 @@
+import datetime
+
+import numpy as np
+
+# How many periods (the current one included) the rolling averages cover
+ROLLING_WINDOW = 4
+
+# 1970-01-01, day 0 of datetime64[D], was a Thursday; this shifts day numbers so Monday is 0
+_MONDAY_OFFSET = 3
+
+
+def progress_series(
+    start: datetime.date,
+    end: datetime.date,
+    period: str,
+    log_days: np.ndarray,
+    log_times: np.ndarray,
+    log_plans: np.ndarray,
+    exercise_plans: np.ndarray,
+    exercise_volumes: np.ndarray,
+) -> dict:
+    """Computes per-period progress series from a user's logs, held as columnar arrays.
+
+    `log_days` holds each log's day as an offset from `start`, `log_times` its total time and
+    `log_plans` the index of its plan (-1 when it has none). `exercise_plans` and
+    `exercise_volumes` hold the plan index and sets x reps x weight of every exercise of those
+    plans. `period` is "week" (starting on Mondays) or "month".
+    """
+    n_days = (end - start).days + 1
+    log_days = np.asarray(log_days, dtype=np.int64)
+    log_times = np.asarray(log_times, dtype=np.float64)
+    log_plans = np.asarray(log_plans, dtype=np.int64)
+    exercise_plans = np.asarray(exercise_plans, dtype=np.int64)
+    exercise_volumes = np.asarray(exercise_volumes, dtype=np.float64)
+
+    # Each log's volume is the volume of its plan's exercises
+    plan_volumes = np.bincount(
+        exercise_plans, weights=exercise_volumes, minlength=int(log_plans.max(initial=-1)) + 1
+    )
+    log_volumes = np.where(log_plans >= 0, plan_volumes[np.maximum(log_plans, 0)], 0.0)
+
+    # The period every day of the range falls in, as an index into the series
+    days = np.datetime64(start, "D") + np.arange(n_days)
+    if period == "week":
+        period_starts = days - (days.astype(np.int64) + _MONDAY_OFFSET) % 7
+    else:
+        period_starts = days.astype("datetime64[M]").astype("datetime64[D]")
+    starts, day_periods = np.unique(period_starts, return_inverse=True)
+    n_periods = len(starts)
+    log_periods = day_periods[log_days]
+
+    sessions = np.bincount(log_periods, minlength=n_periods)
+    total_time = np.bincount(log_periods, weights=log_times, minlength=n_periods)
+    volume = np.bincount(log_periods, weights=log_volumes, minlength=n_periods)
+
+    active = np.zeros(n_days, dtype=bool)
+    active[log_days] = True
+    active_days = np.bincount(day_periods, weights=active, minlength=n_periods)
+
+    columns = {
+        "period_start": starts.astype(datetime.date).tolist(),
+        "sessions": sessions.tolist(),
+        "total_time": total_time.astype(np.int64).tolist(),
+        "volume": np.round(volume, 2).tolist(),
+        "active_days": active_days.astype(np.int64).tolist(),
+        "sessions_rolling_avg": np.round(_rolling_mean(sessions), 2).tolist(),
+        "total_time_rolling_avg": np.round(_rolling_mean(total_time), 2).tolist(),
+        "volume_rolling_avg": np.round(_rolling_mean(volume), 2).tolist(),
+    }
+
+    return {
+        "period": period,
+        "start": start,
+        "end": end,
+        "series": [dict(zip(columns, values)) for values in zip(*columns.values())],
+        "streaks": {
+            "longest_days": _longest_run(active),
+            "current_days": _trailing_run(active),
+            "longest_periods": _longest_run(sessions > 0),
+            "current_periods": _trailing_run(sessions > 0),
+        },
+    }
+
+
+def _rolling_mean(values: np.ndarray) -> np.ndarray:
+    """Mean over the last ROLLING_WINDOW values, or as many as there are at the start."""
+    totals = np.cumsum(values, dtype=np.float64)
+    totals[ROLLING_WINDOW:] = totals[ROLLING_WINDOW:] - totals[:-ROLLING_WINDOW]
+    return totals / np.minimum(np.arange(1, len(values) + 1), ROLLING_WINDOW)
+
+
+def _run_lengths(flags: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """The end positions (exclusive) and lengths of every run of True in `flags`."""
+    edges = np.diff(np.concatenate(([0], flags.astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+    return run_ends, run_ends - run_starts
+
+
+def _longest_run(flags: np.ndarray) -> int:
+    _, lengths = _run_lengths(flags)
+    return int(lengths.max(initial=0))
+
+
+def _trailing_run(flags: np.ndarray) -> int:
+    """The length of the run of True that reaches the end of `flags`, if any."""
+    run_ends, lengths = _run_lengths(flags)
+    if len(run_ends) and run_ends[-1] == len(flags):
+        return int(lengths[-1])
+    return 0
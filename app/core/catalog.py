@@ -0,0 +1,132 @@
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Channel the exercises table's trigger notifies on (see migrations/001_exercise_catalog_version.sql)
+CATALOG_CHANNEL = "exercise_catalog"
+
+
+class ExerciseCatalog:
+    """An in-memory copy of the exercises table.
+
+    The table is a small, practically static catalog, so every worker keeps all of it in
+    memory and serves exercise lookups without touching Postgres. Changes to the table bump
+    a version number and notify the `exercise_catalog` channel; `watch` listens for those
+    notifications (and polls the version as a fallback) and reloads the catalog when it changes.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._exercises = {}
+        self._lock = asyncio.Lock()
+
+    def all(self) -> list[dict]:
+        """Every exercise, ordered by exercise_id."""
+        return list(self._exercises.values())
+
+    def get(self, exercise_id: int) -> dict | None:
+        return self._exercises.get(exercise_id)
+
+    async def load(self, cursor=None):
+        """(Re)loads the whole catalog, borrowing a pooled connection unless a cursor is given."""
+        if cursor is None:
+            async with connection.get_async_db() as (conn, cursor):
+                return await self.load(cursor)
+
+        async with self._lock:
+            await cursor.execute("SELECT version FROM exercise_catalog_version")
+            row = await cursor.fetchone()
+            await cursor.execute(
+                """SELECT exercise_id, name, description, category
+                FROM exercises ORDER BY exercise_id"""
+            )
+            exercises = await cursor.fetchall()
+
+            self._exercises = {exercise["exercise_id"]: exercise for exercise in exercises}
+            self.version = row["version"] if row else None
+
+        logger.info(f"Exercise catalog loaded: version {self.version}, {len(exercises)} exercises")
+
+    async def lookup_many(self, exercise_ids, cursor=None) -> dict:
+        """Returns the requested exercises keyed by exercise_id, leaving out unknown IDs.
+
+        An ID the catalog doesn't know costs a check of the catalog's version, in case the
+        exercise was added since the last refresh; the catalog is only reloaded if the version
+        has moved on, so unknown IDs can't be used to force a reload on every request.
+        """
+        exercise_ids = set(exercise_ids)
+        if not exercise_ids.issubset(self._exercises.keys()):
+            await self.refresh_if_stale(cursor)
+
+        return {
+            exercise_id: self._exercises[exercise_id]
+            for exercise_id in exercise_ids
+            if exercise_id in self._exercises
+        }
+
+    async def enrich(self, plan_exercises: list[dict], cursor=None) -> list[dict]:
+        """Adds exercise_name, description and category to plan exercise rows, in place."""
+        exercises = await self.lookup_many(
+            (plan_exercise["exercise_id"] for plan_exercise in plan_exercises), cursor
+        )
+
+        for plan_exercise in plan_exercises:
+            exercise = exercises.get(plan_exercise["exercise_id"])
+            if exercise:
+                plan_exercise.update(
+                    {
+                        "exercise_name": exercise["name"],
+                        "description": exercise["description"],
+                        "category": exercise["category"],
+                    }
+                )
+
+        return plan_exercises
+
+    async def watch(self):
+        """Keeps the catalog up to date until cancelled; meant to run as a background task."""
+        interval = settings.EXERCISE_CATALOG_REFRESH_INTERVAL
+
+        while True:
+            try:
+                listener = await connection.connect_async(autocommit=True)
+                async with listener:
+                    await listener.execute(f"LISTEN {CATALOG_CHANNEL}")
+
+                    # The catalog may have changed before we started listening
+                    async with listener.cursor() as cursor:
+                        await self.refresh_if_stale(cursor)
+
+                    while True:
+                        notified = False
+                        async for notify in listener.notifies(timeout=interval, stop_after=1):
+                            notified = notify.payload != str(self.version)
+
+                        if notified:
+                            await self.load()
+                        else:
+                            async with listener.cursor() as cursor:
+                                await self.refresh_if_stale(cursor)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                logger.error(f"Exercise catalog watcher failed, retrying: {error}")
+                await asyncio.sleep(interval)
+
+    async def refresh_if_stale(self, cursor=None):
+        """Reloads the catalog if its version in the database differs from the loaded one."""
+        if cursor is None:
+            async with connection.get_async_db() as (conn, cursor):
+                return await self.refresh_if_stale(cursor)
+
+        await cursor.execute("SELECT version FROM exercise_catalog_version")
+        row = await cursor.fetchone()
+        if row and row["version"] != self.version:
+            await self.load(cursor)
+
+
+exercise_catalog = ExerciseCatalog()
@@ -0,0 +1,210 @@
+import hashlib
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+# brotli and zstd are offered only when their (optional) packages are installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Encodings we can produce, most preferred first when the client likes several equally
+ENCODINGS = tuple(
+    encoding
+    for encoding, available in (("br", brotli), ("zstd", zstandard), ("gzip", zlib))
+    if available is not None
+)
+
+# Only text-like bodies are worth compressing
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/", "application/javascript")
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """Picks the encoding to use from an Accept-Encoding header, or None to send the body as is."""
+    qualities = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            qualities[name] = quality
+
+    default = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, default)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class StreamCompressor:
+    """Compresses a body in one or more pieces with one of ENCODINGS."""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=min(level, 11))
+        elif encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            self._compressor = zlib.compressobj(min(level, 9), zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool = True) -> bytes:
+        """Compresses the next piece; with `flush`, everything so far can be decoded by the client."""
+        if self.encoding == "br":
+            return self._compressor.process(data) + (self._compressor.flush() if flush else b"")
+        compressed = self._compressor.compress(data)
+        if flush:
+            if self.encoding == "zstd":
+                compressed += self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            else:
+                compressed += self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return compressed
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    compressor = StreamCompressor(encoding, level)
+    return compressor.compress(body, flush=False) + compressor.finish()
+
+
+class CompressionMiddleware:
+    """ASGI middleware that compresses response bodies with gzip, or brotli or zstd when they
+    are installed, whichever the client prefers.
+
+    Bodies smaller than `minimum_size` go out as they are. Streamed responses are compressed
+    piece by piece, each piece flushed so the client can decode it right away. For the paths in
+    `cached_paths`, whose bodies rarely change and don't depend on the query string, the
+    compressed body is kept (one per path and encoding) and reused for as long as the response's
+    ETag (or, without one, the body's hash) stays the same.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, level: int = 6, cached_paths=()):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.cached_paths = frozenset(cached_paths)
+        # (path, encoding) -> (validator, compressed body); the query string is left out so
+        # clients can't grow the cache by adding junk to it
+        self._cache = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(self, scope, send, encoding)
+        await self.app(scope, receive, responder.send)
+
+    def compress_cached(self, scope, encoding: str, body: bytes, etag: str | None) -> bytes:
+        if scope["path"] not in self.cached_paths:
+            return compress(body, encoding, self.level)
+
+        key = (scope["path"], encoding)
+        validator = etag or hashlib.blake2b(body, digest_size=16).digest()
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == validator:
+            return cached[1]
+
+        compressed = compress(body, encoding, self.level)
+        self._cache[key] = (validator, compressed)
+        return compressed
+
+
+class _CompressingResponder:
+    """Holds back a response's start message until its first body piece shows whether and how
+    to compress it.
+    """
+
+    def __init__(self, middleware: CompressionMiddleware, scope, send, encoding: str):
+        self.middleware = middleware
+        self.scope = scope
+        self._send = send
+        self.encoding = encoding
+        self.start = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self.passthrough:
+            await self._send(message)
+            return
+        if self.compressor is not None:
+            await self._send_compressed_piece(message)
+            return
+
+        # First body piece: decide what to do with the whole response
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = MutableHeaders(raw=list(self.start["headers"]))
+
+        too_small = not more_body and len(body) < self.middleware.minimum_size
+        if too_small or not self._should_compress(headers):
+            self.passthrough = True
+            await self._send(self.start)
+            await self._send(message)
+            return
+
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+
+        if not more_body:
+            compressed = self.middleware.compress_cached(
+                self.scope, self.encoding, body, headers.get("etag")
+            )
+            headers["Content-Length"] = str(len(compressed))
+            await self._send({**self.start, "headers": headers.raw})
+            await self._send({"type": "http.response.body", "body": compressed})
+            return
+
+        # Streamed: the length isn't known up front
+        del headers["Content-Length"]
+        self.compressor = StreamCompressor(self.encoding, self.middleware.level)
+        await self._send({**self.start, "headers": headers.raw})
+        await self._send_compressed_piece(message)
+
+    async def _send_compressed_piece(self, message):
+        if message.get("more_body", False):
+            body = self.compressor.compress(message.get("body", b""))
+            if body:
+                await self._send({"type": "http.response.body", "body": body, "more_body": True})
+        else:
+            body = self.compressor.compress(message.get("body", b""), flush=False)
+            await self._send({"type": "http.response.body", "body": body + self.compressor.finish()})
+
+    def _should_compress(self, headers: MutableHeaders) -> bool:
+        if self.start["status"] < 200 or self.start["status"] in (204, 304):
+            return False
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES) or "+json" in content_type
@@ -0,0 +1,94 @@
+import datetime
+import hashlib
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response, status
+
+# Clients may keep responses but must check with us (cheaply, see conditional_response) before reuse
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts, weak: bool = True) -> str:
+    """Builds an ETag from the values a response's version is made of (row versions, counts,
+    the catalog version), without building or hashing the response itself.
+
+    ETags are weak by default: they mark the same data, not byte-identical bodies, which also
+    keeps them valid however the body ends up being encoded or compressed.
+    """
+    digest = hashlib.blake2b("|".join(str(part) for part in parts).encode(), digest_size=12)
+    return f'{"W/" if weak else ""}"{digest.hexdigest()}"'
+
+
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    # If-None-Match uses the weak comparison: W/"x" and "x" are the same tag
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque_tag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def _as_utc(moment: datetime.datetime) -> datetime.datetime:
+    # TIMESTAMP columns come back naive; they are taken to be UTC, consistently both ways
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=datetime.timezone.utc)
+    return moment.astimezone(datetime.timezone.utc)
+
+
+def _http_date(last_modified: datetime.datetime) -> datetime.datetime | None:
+    """`last_modified` as an HTTP date, or None while its second isn't over yet.
+
+    HTTP dates only have whole seconds, so a date handed out during the second of the change
+    would also be the date of a later change in that same second, and If-Modified-Since would
+    miss it. Once the second is over, any later change has a later date.
+    """
+    last_modified = _as_utc(last_modified).replace(microsecond=0)
+    if last_modified >= datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0):
+        return None
+    return last_modified
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: datetime.datetime | None = None
+) -> bool:
+    """Whether the client's copy, per If-None-Match or else If-Modified-Since, is still current."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(etag, if_none_match)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = _as_utc(parsedate_to_datetime(if_modified_since))
+    except (TypeError, ValueError):
+        return False
+    http_date = _http_date(last_modified)
+    return http_date is not None and http_date <= since
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: datetime.datetime | None = None,
+) -> Response | None:
+    """Returns a 304 Not Modified response if the client's copy is current. Otherwise sets the
+    ETag and Last-Modified headers on `response` (the handler's injected Response) and returns
+    None, and the handler goes on to build the full response.
+
+    Only pass `last_modified` if every change to the response moves it forward; a timestamp
+    that a delete leaves behind would let If-Modified-Since serve a stale copy.
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    http_date = _http_date(last_modified) if last_modified is not None else None
+    if http_date is not None:
+        headers["Last-Modified"] = format_datetime(http_date, usegmt=True)
+
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -11,10 +11,83 @@ class Settings(BaseSettings):
     DATABASE_USERNAME: str
     DATABASE_NAME: str
 
+    DATABASE_POOL_MIN_SIZE: int = 1
+    DATABASE_POOL_MAX_SIZE: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30.0
+    DATABASE_POOL_MAX_IDLE: float = 300.0
+    DATABASE_POOL_MAX_LIFETIME: float = 3600.0
+    DATABASE_POOL_CHECK_INTERVAL: float = 30.0
+    # Run the hot queries in app/db/statements.py as server-side prepared statements
+    DATABASE_PREPARED_STATEMENTS: bool = True
+    # Other queries are prepared once a connection has run them this many times (0: right away)
+    DATABASE_PREPARE_THRESHOLD: int = 5
+
+    # How often (seconds) the exercise catalog double-checks its version if no change was announced
+    EXERCISE_CATALOG_REFRESH_INTERVAL: float = 60.0
+
+    # How often (seconds) overdue pending workouts are marked as missed, and how many per transaction
+    MISSED_WORKOUTS_SWEEP_INTERVAL: float = 60.0
+    MISSED_WORKOUTS_SWEEP_BATCH_SIZE: int = 500
+
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRES_MINUTES: int
     JWT_ALGORITHM: str
 
+    # How long (days) a refresh token can be exchanged for a new access token
+    REFRESH_TOKEN_EXPIRES_DAYS: int = 30
+
+    # How many verified access tokens to remember (0 disables the cache) and for how long (seconds)
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_TTL: float = 300.0
+
+    # 0 means one worker per CPU core
+    PASSWORD_HASH_WORKERS: int = 0
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+
+    # Root log level, plus per-logger levels as "logger=LEVEL,other.logger=LEVEL"
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""
+    # "json" for one JSON object per line, "text" for plain lines
+    LOG_FORMAT: str = "json"
+    # Rotating log file; empty to log to the console only
+    LOG_FILE: str = "app.log"
+    LOG_FILE_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_FILE_BACKUP_COUNT: int = 5
+    # INFO and DEBUG records allowed per call site per period (0 = no limit), and the share
+    # of the records over the limit that are still kept
+    LOG_RATE_LIMIT: int = 20
+    LOG_RATE_LIMIT_PERIOD: float = 1.0
+    LOG_SAMPLE_RATE: float = 0.01
+
+    # Adds Server-Timing headers with each request's database time
+    DEBUG: bool = False
+    # Warn about requests that run more statements, or spend more seconds in the database, than
+    # this, and about single statements slower than SLOW_QUERY_THRESHOLD seconds
+    QUERY_COUNT_WARNING: int = 20
+    QUERY_TIME_WARNING: float = 0.5
+    SLOW_QUERY_THRESHOLD: float = 0.2
+
+    # Responses smaller than this many bytes aren't compressed; the level applies to gzip, brotli
+    # (up to 11) and zstd alike. The compressed bodies of the listed paths are cached
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_LEVEL: int = 6
+    COMPRESSION_CACHED_PATHS: str = "/exercises,/openapi.json"
+
+    # Production server (app/serve.py): where to listen, how many worker processes (0 = one per
+    # CPU core) and how many pending connections to queue, how long (seconds) to keep idle
+    # connections open, and how long a worker may go silent before it's restarted
+    SERVER_BIND: str = "0.0.0.0:8000"
+    SERVER_WORKERS: int = 0
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEPALIVE: int = 5
+    SERVER_TIMEOUT: int = 60
+    # How long (seconds) workers get to finish their requests when stopping
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    # Workers are replaced after this many requests (0 = never), plus up to the jitter, so they
+    # don't all restart at once
+    SERVER_MAX_REQUESTS: int = 10000
+    SERVER_MAX_REQUESTS_JITTER: int = 1000
+
     class Config:
         env_file = '../.env'
 
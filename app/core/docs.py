@@ -36,8 +36,39 @@ Logs in a user using their credentials and returns a JWT token.
 - `password` (string): The user's password.
 
 **Response:**
-- **Success**: Returns `202 Accepted` with a JWT token.
+- **Success**: Returns `202 Accepted` with a JWT token and a `refresh_token`; exchange the refresh token at
+`/token/refresh` for a new access token instead of logging in again.
 - **Error**: Returns `404 Not Found` for invalid credentials or `400 Bad Request` for other errors.
+Returns `503 Service Unavailable` when too many logins are already waiting for password verification.
+"""
+
+refresh_token = """
+## Refresh Access Token
+
+Exchanges a refresh token for a new access token and a new refresh token. Each refresh token can be
+used once: keep the new one and discard the old.
+
+**Request Body:**
+- `refresh_token` (string): The refresh token from `/login` or the previous refresh.
+
+**Response:**
+- **Success**: Returns `200 OK` with a new JWT token and `refresh_token`.
+- **Error**: Returns `401 Unauthorized` if the refresh token is invalid, expired or revoked. Presenting a
+refresh token that was already used revokes every refresh token issued since that login, so the user has
+to log in again.
+"""
+
+revoke_token = """
+## Revoke Refresh Token
+
+Logs a session out by revoking its refresh token and every token issued from the same login. Access
+tokens already issued stay valid until they expire.
+
+**Request Body:**
+- `refresh_token` (string): The refresh token to revoke.
+
+**Response:**
+- **Success**: Returns `200 OK`, whether or not the token was valid.
 """
 
 
@@ -57,6 +88,7 @@ Creates a new user in the database.
 **Response:**
 - **Success**: Returns `201 Created` with the created user's details.
 - **Error**: Returns `400 Bad Request` if the email is already in use or if another error occurs.
+Returns `503 Service Unavailable` when too many registrations are already waiting for password hashing.
 """
 
 create_workout_plan = """
@@ -123,8 +155,10 @@ Retrieves a list of all workout plans created by the current user.
 **Query Parameters:**
 - `limit` (integer, optional): The maximum number of workout plans to return. Default is 10.
 - `skip` (integer, optional): The number of workout plans to skip before starting to return results. Default is 0.
+- `after` (string, optional): The cursor from a previous page's `X-Next-Cursor` response header; returns the workout plans that come after that page. Prefer it over `skip` for deep pages.
 
 **Response:**
+- **Headers**: `X-Next-Cursor` is set when there are more workout plans; pass it back as `after` to get the next page. Results are ordered oldest first (by creation time).
 - **Success**: Returns `200 OK` with a list of workout plans, including their exercises and metadata (e.g., exercise count).
 - **Error**: Returns `404 Not Found` if no workout plans are found for the user. Returns `400 Bad Request` if there's an error during the retrieval process.
 """
@@ -181,9 +215,11 @@ Retrieves a list of all workout schedules created by the current user.
 **Query Parameters:**
 - `limit` (integer, optional): The maximum number of workout plans to return. Default is 10.
 - `skip` (integer, optional): The number of workout plans to skip before starting to return results. Default is 0.
+- `after` (string, optional): The cursor from a previous page's `X-Next-Cursor` response header; returns the workout schedules that come after that page. Prefer it over `skip` for deep pages.
 - `workout_status` (StatusChoice): A custom field, only values allowed are pending, missed, completed and all
 
 **Response:**
+- **Headers**: `X-Next-Cursor` is set when there are more workout schedules; pass it back as `after` to get the next page. Results are ordered by scheduled date, and within a day latest time first.
 - **Success**: Returns `200 OK` with a list of workout schedules, including their exercises.
 - **Error**: Returns `404 Not Found` if no workout schedules are found for the user. Returns `400 Bad Request` if there's an error during the retrieval process.
 """
@@ -262,8 +298,117 @@ Retrieves a list of all workout logs created by the current user.
 **Query Parameters:**
 - `limit` (integer, optional): The maximum number of workout logs to return. Default is 10.
 - `skip` (integer, optional): The number of workout logs to skip before starting to return results. Default is 0.
+- `after` (string, optional): The cursor from a previous page's `X-Next-Cursor` response header; returns the workout logs that come after that page. Prefer it over `skip` for deep pages.
 
 **Response:**
+- **Headers**: `X-Next-Cursor` is set when there are more workout logs; pass it back as `after` to get the next page. Results are ordered newest first (by completion time).
 - **Success**: Returns `200 OK` with a list of workout logs.
 - **Error**: Returns `404 Not Found` if no workout logs are found for the user. Returns `400 Bad Request` if there's an error during the retrieval process.
 """
+
+db_pool_stats = """
+## Database Connection Pool Statistics
+
+Returns a snapshot of the database connection pool of the worker that served the request.
+
+**Response:**
+- `async`: The psycopg pool behind `get_async_db` (used by the endpoints), as reported by
+`psycopg_pool` (`pool_size`, `pool_available`, `requests_waiting`, `requests_wait_ms`, ...).
+"""
+
+password_hashing_stats = """
+## Password Hashing Statistics
+
+Returns a snapshot of the worker pool that hashes and verifies passwords for `/register` and `/login`.
+
+**Response:**
+- `max_workers`, `max_queue`: Hashes that can run at once, and how many more may wait for a worker.
+- `in_flight`, `queued`: Hashes currently running or waiting.
+- `completed`, `rejected`: Finished hashes, and requests turned away with `503` because the queue was full.
+- `hash_ms_avg`, `hash_ms_max`: Time spent hashing or verifying a password.
+- `queue_wait_ms_avg`, `queue_wait_ms_max`: Time spent waiting for a free worker.
+"""
+
+token_cache_stats = """
+## Access Token Cache Statistics
+
+Returns a snapshot of the cache of verified access tokens of the worker that served the request.
+Requests whose token is cached skip the JWT signature check.
+
+**Response:**
+- `enabled`: Whether the cache is on; `TOKEN_CACHE_SIZE=0` turns it off.
+- `max_size`, `ttl_seconds`: Most tokens kept, and longest time one is kept (never past the token's `exp`).
+- `size`: Tokens currently cached.
+- `hits`, `misses`, `hit_rate`: Lookups served from the cache, and lookups that had to verify the token.
+- `evictions`: Tokens dropped to make room for newer ones.
+"""
+
+prometheus_metrics = """
+## Prometheus Metrics
+
+Returns the metrics of the worker that served the request, in the Prometheus text format.
+
+**Metrics:**
+- `http_requests_total`, `http_request_duration_seconds`: Requests and their latency, by method and route template
+  (`/workout-plans/{plan_id}`, not the actual path). Requests that match no route are counted as `<unmatched>`.
+- `db_query_duration_seconds`, `db_query_rows`: Execution time and rows returned of every query, named after the
+  function that ran it and its SQL verb, e.g. `app.endpoints.workout.list_workout_plans:SELECT`. Prepared
+  statements are named after the statement instead, e.g. `app.db.statements.user_by_email:SELECT`.
+- `db_pool_acquire_seconds`: Time spent waiting for a database connection, by pool (`sync` or `async`).
+- `password_hash_seconds`: Time bcrypt spends hashing (`hash`) or checking (`verify`) a password.
+- `event_loop_lag_seconds`: How late the event loop is in running scheduled work; high values mean something
+  is blocking it.
+"""
+
+progress_series = """
+## Progress Over Time
+
+Returns the current user's progress as a series of weeks or months over a date range.
+
+**Query Parameters:**
+- `period` (PeriodChoice, optional): `week` (weeks start on Monday) or `month`. Default is `week`.
+- `start` (datetime.date, optional): The first day of the range. Default is one year before `end`.
+- `end` (datetime.date, optional): The last day of the range. Default is today.
+
+**Response:**
+- **Success**: Returns `200 OK` with one entry per period in the range (empty periods included):
+  - `sessions`, `total_time`, `active_days`: Workouts logged, their total time and the days with at least one workout.
+  - `volume`: Training volume, the sum of sets x reps x weight over the exercises of each logged workout's plan.
+  - `*_rolling_avg`: Averages over the last 4 periods, the current one included.
+  - `streaks`: The longest run of consecutive active days and periods in the range, and the run that reaches its end.
+- **Error**: Returns `400 Bad Request` if `start` is after `end` or there's an error during the retrieval process.
+"""
+
+export_workout_logs = """
+## Export Workout Logs
+
+Streams every workout log of the current user, oldest first, as a file download.
+
+**Query Parameters:**
+- `format` (LogFileFormat, optional): `ndjson` (one JSON object per line) or `csv`. Default is `ndjson`.
+- `include_schedule` (boolean, optional): Also include each log's scheduled workout (`scheduled_date`, `scheduled_time`, `status`) and plan (`plan_id`, `plan_name`). Default is false.
+
+**Response:**
+- **Success**: Returns `200 OK` and streams the logs as they are read, so large histories start downloading straight away.
+- **Error**: An error while streaming ends the download early; the response status can no longer change by then.
+"""
+
+import_workout_logs = """
+## Import Workout Logs
+
+Imports workout logs in bulk from an uploaded file, e.g. a history exported from another tracker.
+
+**Request Body (multipart/form-data):**
+- `file`: A CSV file with a header row, or an NDJSON file (one JSON object per line). Each row has the
+fields of a new workout log: `completed_at`, `total_time`, `notes` and `scheduled_workout_id`, which must
+be one of the user's scheduled workouts.
+
+**Query Parameters:**
+- `format` (LogFileFormat, optional): `csv` or `ndjson`. Default is taken from the file name, falling back to `ndjson`.
+- `all_or_nothing` (boolean, optional): Import nothing if any row is invalid. Default is false, which imports the valid rows.
+
+**Response:**
+- **Success**: Returns `201 Created` with the number of rows `imported` and `failed`, and the errors
+for the failed rows by line number (the first 1000).
+- **Error**: Returns `400 Bad Request` if the file can't be read or there's an error during the import.
+"""
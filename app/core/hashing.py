@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasher:
+    """Runs password hashing and verification on a bounded pool of worker threads.
+
+    bcrypt releases the GIL while it works, so hashes run in parallel across cores
+    while the event loop keeps serving other requests. At most `max_workers` hashes
+    run at once and at most `max_queue` more wait for a worker; anything beyond that
+    is rejected straight away with a 503 instead of piling up behind the others.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = None
+        self._lock = threading.Lock()
+
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._hash_time_total = 0.0
+        self._hash_time_max = 0.0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    async def run(self, func, *args):
+        """Runs `func(*args)` on a worker thread and returns its result."""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                saturated = True
+            else:
+                self._pending += 1
+                saturated = False
+
+        if saturated:
+            logger.warning("Password hashing queue is full, rejecting request")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The server is busy, please try again shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            result = func(*args)
+            return result, started - submitted, time.perf_counter() - started
+
+        future = self._get_executor().submit(job)
+        # The job keeps its place in the pool until it's done, even if the request that
+        # queued it is cancelled (e.g. the client disconnects), so only then does it stop counting
+        future.add_done_callback(self._job_done)
+
+        result, _, _ = await asyncio.wrap_future(future)
+        return result
+
+    def _job_done(self, future):
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                return
+            _, waited, took = future.result()
+            self._completed += 1
+            self._hash_time_total += took
+            self._hash_time_max = max(self._hash_time_max, took)
+            self._wait_time_total += waited
+            self._wait_time_max = max(self._wait_time_max, waited)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def get_stats(self) -> dict:
+        """A snapshot of the queue depth, rejections, hash latency and queue wait."""
+        with self._lock:
+            completed = self._completed
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._pending,
+                "queued": max(self._pending - self.max_workers, 0),
+                "completed": completed,
+                "rejected": self._rejected,
+                "hash_ms_avg": round(self._hash_time_total / completed * 1000, 3)
+                if completed
+                else 0.0,
+                "hash_ms_max": round(self._hash_time_max * 1000, 3),
+                "queue_wait_ms_avg": round(self._wait_time_total / completed * 1000, 3)
+                if completed
+                else 0.0,
+                "queue_wait_ms_max": round(self._wait_time_max * 1000, 3),
+            }
+
+    def _get_executor(self):
+        # Created on first use so forked worker processes don't inherit the threads
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="password-hasher"
+                )
+            return self._executor
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
@@ -0,0 +1,156 @@
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import threading
+import time
+
+from app.core.config import settings
+
+# Attributes every LogRecord has; anything else on a record came in through `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line, including any `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.datetime.fromtimestamp(
+                record.created, tz=datetime.timezone.utc
+            ).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "function": record.funcName,
+            "line": record.lineno,
+        }
+        entry.update(
+            (key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES
+        )
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets through at most `rate` records per `period` seconds from each logging call site,
+    plus a `sample_rate` share of the rest, for records at `max_level` or below.
+
+    Hot success paths can then log freely without flooding the logs under load, while
+    warnings and errors always get through. The next record let through from a call site
+    carries the number of records it suppressed in the meantime as `suppressed`.
+    """
+
+    def __init__(self, rate: int, period: float, sample_rate: float, max_level: int = logging.INFO):
+        super().__init__()
+        self.rate = rate
+        self.period = period
+        self.sample_rate = sample_rate
+        self.max_level = max_level
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level or self.rate <= 0:
+            return True
+
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+
+        with self._lock:
+            window_start, count, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - window_start >= self.period:
+                window_start, count = now, 0
+
+            if count < self.rate or random.random() < self.sample_rate:
+                self._windows[key] = (window_start, count + 1, 0)
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+
+            self._windows[key] = (window_start, count, suppressed + 1)
+            return False
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    """A QueueHandler that leaves formatting (tracebacks included) to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve the message now, in case its arguments change after the call returns
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def parse_levels(levels: str) -> dict:
+    """Parses "logger=LEVEL,other.logger=LEVEL" into {logger: LEVEL}."""
+    parsed = {}
+    for item in levels.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            parsed[name.strip()] = level.strip().upper()
+    return parsed
+
+
+def setup_logging():
+    """Sends every log record through a queue to a background thread that formats them and
+    writes them to the console and a rotating log file, so logging never blocks a request on I/O.
+    Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+
+    handlers = [logging.StreamHandler()]
+    if settings.LOG_FILE:
+        handlers.append(
+            logging.handlers.RotatingFileHandler(
+                settings.LOG_FILE,
+                maxBytes=settings.LOG_FILE_MAX_BYTES,
+                backupCount=settings.LOG_FILE_BACKUP_COUNT,
+                encoding="utf-8",
+            )
+        )
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    enqueue_handler = _EnqueueHandler(log_queue)
+    enqueue_handler.addFilter(
+        RateLimitFilter(
+            rate=settings.LOG_RATE_LIMIT,
+            period=settings.LOG_RATE_LIMIT_PERIOD,
+            sample_rate=settings.LOG_SAMPLE_RATE,
+        )
+    )
+
+    root = logging.getLogger()
+    root.handlers = [enqueue_handler]
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in parse_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Writes out whatever is still queued and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
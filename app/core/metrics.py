@@ -0,0 +1,173 @@
+import asyncio
+import sys
+import time
+
+from prometheus_client import Counter, Histogram
+from psycopg import sql
+
+# Latency buckets (seconds) shared by the request and query histograms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+http_requests_total = Counter(
+    "http_requests_total",
+    "HTTP requests handled, by route template and status code.",
+    ["method", "route", "status"],
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response.",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+
+db_query_duration_seconds = Histogram(
+    "db_query_duration_seconds",
+    "Time spent executing a query, by query name (calling module.function and SQL verb).",
+    ["query"],
+    buckets=LATENCY_BUCKETS,
+)
+db_query_rows = Histogram(
+    "db_query_rows",
+    "Rows returned (or affected) per query, by query name.",
+    ["query"],
+    buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000),
+)
+db_pool_acquire_seconds = Histogram(
+    "db_pool_acquire_seconds",
+    "Time spent waiting for a connection from a pool.",
+    ["pool"],
+    buckets=LATENCY_BUCKETS,
+)
+
+password_hash_seconds = Histogram(
+    "password_hash_seconds",
+    "Time bcrypt spends hashing or verifying a password, on its worker thread.",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0),
+)
+
+event_loop_lag_seconds = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a callback scheduled for a fixed time.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+
+# Route used for requests that matched no route, to keep the label's cardinality bounded
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Modules whose frames are skipped when working out which function ran a query
+_QUERY_NAME_SKIP = ("psycopg", "psycopg2", "psycopg_pool", "contextlib", "app.db.cursors", "app.db.statements")
+
+
+# The function each place that executes a query belongs to, by code object and bytecode offset
+_query_callers = {}
+
+
+def query_name(query, caller: str | None = None) -> str:
+    """Names a query after `caller`, by default the function that executed it, and its SQL
+    verb, e.g. `app.endpoints.workout.list_workout_plans:SELECT`.
+
+    Looking up the function means walking the stack, so it's done once per call site.
+    """
+    if caller is None:
+        caller = _query_caller(sys._getframe(2))
+    return f"{caller}:{sql_verb(query)}"
+
+
+def _query_caller(frame) -> str:
+    site = (frame.f_code, frame.f_lasti)
+    caller = _query_callers.get(site)
+    if caller is not None:
+        return caller
+
+    # Calls from the skipped modules are made on behalf of different functions each time,
+    # so only sites outside them are remembered
+    cacheable = not frame.f_globals.get("__name__", "").startswith(_QUERY_NAME_SKIP)
+    while frame is not None and frame.f_globals.get("__name__", "").startswith(_QUERY_NAME_SKIP):
+        frame = frame.f_back
+    caller = (
+        f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}" if frame else "?"
+    )
+    if cacheable:
+        _query_callers[site] = caller
+    return caller
+
+
+def sql_verb(query) -> str:
+    if isinstance(query, bytes):
+        query = query.decode(errors="replace")
+    elif not isinstance(query, str):
+        # A psycopg.sql object; only its leading literal SQL is needed
+        while isinstance(query, sql.Composed):
+            query = next(iter(query), None)
+        if not isinstance(query, sql.SQL):
+            return "?"
+        query = query.as_string(None)
+
+    # Skip leading whitespace and -- comments
+    for line in query.splitlines():
+        line = line.strip()
+        if line and not line.startswith("--"):
+            verb = line.split(None, 1)[0].upper()
+            return verb.rstrip(";")
+    return "?"
+
+
+def observe_query(name: str, duration: float, rows: int):
+    db_query_duration_seconds.labels(name).observe(duration)
+    if rows is not None and rows >= 0:
+        db_query_rows.labels(name).observe(rows)
+
+
+class MetricsMiddleware:
+    """ASGI middleware that counts and times every HTTP request by route template.
+
+    The route is looked up from the endpoint the router picked, after the request has been
+    handled, so `/workout-plans/{plan_id}` is one series however many plans there are.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = self._route_for(scope)
+            method = scope["method"]
+            http_request_duration_seconds.labels(method, route).observe(
+                time.perf_counter() - started
+            )
+            http_requests_total.labels(method, route, str(status_code)).inc()
+
+    def _route_for(self, scope) -> str:
+        if self._routes is None:
+            app = scope.get("app")
+            routes = getattr(app, "routes", [])
+            self._routes = {
+                route.endpoint: route.path for route in routes if hasattr(route, "endpoint")
+            }
+        return self._routes.get(scope.get("endpoint"), UNMATCHED_ROUTE)
+
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """Measures how late the event loop wakes up from a fixed sleep, until cancelled."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        event_loop_lag_seconds.observe(max(loop.time() - expected, 0.0))
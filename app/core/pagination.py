@@ -0,0 +1,38 @@
+import base64
+import json
+
+from fastapi import HTTPException, Response, status
+
+# Response header carrying the cursor for the next page, when there is one
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values) -> str:
+    """Packs the sort key of the last row of a page into an opaque, URL-safe token."""
+    payload = json.dumps([str(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> list[str]:
+    """Unpacks a token made by encode_cursor, checking that it holds `size` values."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor"
+        )
+    return values
+
+
+def paginate(rows: list, limit: int, sort_key, response: Response) -> list:
+    """Trims rows fetched with LIMIT limit + 1 down to a page and, if there was a row beyond
+    it, sets the next page's cursor (made from `sort_key(last_row)`) on the response.
+    """
+    page = rows[:limit]
+    if len(rows) > limit and page:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*sort_key(page[-1]))
+    return page
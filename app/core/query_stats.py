@@ -0,0 +1,149 @@
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Stats of the request being handled; None outside a request
+_current = contextvars.ContextVar("query_stats", default=None)
+
+# Callbacks told about every finished request; see assert_max_queries
+_observers = []
+_observers_lock = threading.Lock()
+
+
+class QueryStats:
+    """The statements one request ran: how many, their total time and the slowest one."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_name = None
+        self.slowest_time = 0.0
+
+    def record(self, name: str, duration: float):
+        self.count += 1
+        self.total_time += duration
+        if duration > self.slowest_time:
+            self.slowest_name, self.slowest_time = name, duration
+
+
+def record_query(name: str, duration: float):
+    """Adds a statement to the current request's stats, and logs it if it was slow.
+    Called by the instrumented cursors for every statement they execute.
+    """
+    stats = _current.get()
+    if stats is not None:
+        stats.record(name, duration)
+    if duration >= settings.SLOW_QUERY_THRESHOLD:
+        logger.warning(
+            f"Slow query {name} took {duration * 1000:.1f}ms",
+            extra={"query": name, "duration_ms": round(duration * 1000, 1)},
+        )
+
+
+def server_timing(stats: QueryStats, elapsed: float) -> str:
+    return (
+        f'db;dur={stats.total_time * 1000:.1f};desc="{stats.count} queries", '
+        f"app;dur={elapsed * 1000:.1f}"
+    )
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware that counts the statements each request runs through get_db or
+    get_async_db, warns when a request goes over QUERY_COUNT_WARNING statements or
+    QUERY_TIME_WARNING seconds of database time, and in DEBUG mode reports them in a
+    Server-Timing header.
+
+    Sync endpoints run in a worker thread with a copy of the request's context, so their
+    statements land in the same QueryStats.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.DEBUG:
+                headers = list(message.get("headers", []))
+                headers.append(
+                    (
+                        b"server-timing",
+                        server_timing(stats, time.perf_counter() - started).encode(),
+                    )
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self._finish(scope, stats)
+
+    def _finish(self, scope, stats: QueryStats):
+        path = scope["path"]
+        if (
+            stats.count > settings.QUERY_COUNT_WARNING
+            or stats.total_time > settings.QUERY_TIME_WARNING
+        ):
+            logger.warning(
+                f"{scope['method']} {path} ran {stats.count} queries "
+                f"in {stats.total_time * 1000:.1f}ms",
+                extra={
+                    "path": path,
+                    "query_count": stats.count,
+                    "db_time_ms": round(stats.total_time * 1000, 1),
+                    "slowest_query": stats.slowest_name,
+                    "slowest_query_ms": round(stats.slowest_time * 1000, 1),
+                },
+            )
+        with _observers_lock:
+            observers = list(_observers)
+        for observer in observers:
+            observer(scope["method"], path, stats)
+
+
+@contextlib.contextmanager
+def assert_max_queries(max_queries: int):
+    """Fails if any request handled inside the block ran more than `max_queries` statements.
+
+    Meant for tests against a TestClient, to pin an endpoint's query budget:
+
+        with assert_max_queries(3):
+            client.get("/workout-plans", headers=auth_headers)
+
+    Yields the list of (method, path, QueryStats) of the requests seen so far.
+    """
+    seen = []
+
+    def observer(method, path, stats):
+        seen.append((method, path, stats))
+
+    with _observers_lock:
+        _observers.append(observer)
+    try:
+        yield seen
+    finally:
+        with _observers_lock:
+            _observers.remove(observer)
+
+    over_budget = [
+        f"{method} {path}: {stats.count} queries" for method, path, stats in seen
+        if stats.count > max_queries
+    ]
+    assert not over_budget, (
+        f"Expected at most {max_queries} queries per request, got " + ", ".join(over_budget)
+    )
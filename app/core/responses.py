@@ -0,0 +1,32 @@
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+def validated_response(
+    adapter: TypeAdapter,
+    content,
+    response: Response | None = None,
+    status_code: int = 200,
+    validate: bool = True,
+) -> Response:
+    """Validates `content` against `adapter`'s type and serializes it to JSON in one pass,
+    returning a ready-made response.
+
+    FastAPI hands Response objects back untouched, so this skips its own response_model
+    validation and its conversion of the result to plain Python before encoding it. Keep the
+    route's response_model for the docs, and pass the same type's adapter here. With
+    `validate=False`, `content` must already be instances of the type's models, e.g. models
+    the handler built itself. Headers set on `response` (the handler's injected Response) are
+    carried over.
+
+    A TypeAdapter compiles its validator and serializer when it's created, so build each one
+    once, at import, next to its schema.
+    """
+    if validate:
+        content = adapter.validate_python(content)
+    fast_response = Response(
+        adapter.dump_json(content), status_code=status_code, media_type="application/json"
+    )
+    if response is not None:
+        fast_response.raw_headers.extend(response.raw_headers)
+    return fast_response
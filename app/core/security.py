@@ -1,14 +1,21 @@
+import hashlib
+import hmac
 import logging
+import secrets
+import uuid
 from jose import jwt, JWTError
 from datetime import timedelta, datetime
 from app.schemas import users_schemas
 from fastapi import Depends, status, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from app.core.config import settings
+from app.core.token_cache import token_cache
+from app.db import statements
 
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.JWT_ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRES_MINUTES
+REFRESH_TOKEN_EXPIRE_DAYS = settings.REFRESH_TOKEN_EXPIRES_DAYS
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 logger = logging.getLogger(__name__)
 
@@ -22,7 +29,70 @@ async def create_access_token(data: dict):
     return encoded_jwt
 
 
+def _hash_refresh_secret(secret: str) -> bytes:
+    return hashlib.sha256(secret.encode()).digest()
+
+
+async def create_refresh_token(user_id: str, cursor, family_id: str | None = None) -> str:
+    """Issues a refresh token, starting a new family unless `family_id` is given.
+
+    The token is `<token_id>.<secret>`: the ID finds the row by primary key and only a hash
+    of the secret is stored, so renewing an access token is one indexed lookup rather than
+    a bcrypt password check. The caller commits.
+    """
+    token_id = uuid.uuid4()
+    secret = secrets.token_urlsafe(32)
+
+    await cursor.execute(
+        """
+        INSERT INTO refresh_tokens (token_id, family_id, user_id, token_hash, expires_at)
+        VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP + %s * INTERVAL '1 day');
+        """,
+        (
+            token_id,
+            family_id or token_id,
+            user_id,
+            _hash_refresh_secret(secret),
+            REFRESH_TOKEN_EXPIRE_DAYS,
+        ),
+    )
+    return f"{token_id}.{secret}"
+
+
+async def find_refresh_token(refresh_token: str, cursor) -> dict | None:
+    """Looks up and locks the row of a refresh token, or returns None if the token is unknown
+    or its secret doesn't match.
+    """
+    token_id, _, secret = refresh_token.partition(".")
+    try:
+        token_id = uuid.UUID(token_id)
+    except ValueError:
+        return None
+
+    await statements.REFRESH_TOKEN.execute(cursor, (token_id,))
+    row = await cursor.fetchone()
+
+    if not row or not hmac.compare_digest(bytes(row["token_hash"]), _hash_refresh_secret(secret)):
+        return None
+    return row
+
+
+async def revoke_refresh_token_family(family_id: str, cursor):
+    await cursor.execute(
+        """
+        UPDATE refresh_tokens SET revoked_at = CURRENT_TIMESTAMP
+        WHERE family_id = %s AND revoked_at IS NULL;
+        """,
+        (family_id,),
+    )
+
+
 def verify_access_token(token: str, credentials_exception) -> users_schemas.TokenData:
+    # A token verified before (and not yet expired) doesn't need its signature checked again
+    token_data = token_cache.get(token)
+    if token_data is not None:
+        return token_data
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = payload.get("user_id")
@@ -32,6 +102,7 @@ def verify_access_token(token: str, credentials_exception) -> users_schemas.Toke
             raise credentials_exception
 
         token_data = users_schemas.TokenData(user_id=str(user_id))
+        token_cache.put(token, token_data, payload.get("exp"))
     except JWTError as error:
         logger.error(error)
         raise HTTPException(status_code=401, detail=str(error))
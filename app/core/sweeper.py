@@ -0,0 +1,72 @@
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.core.utils import overdue_workout_condition
+from app.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class MissedWorkoutSweeper:
+    """Marks overdue pending scheduled workouts as missed, for every user, in the background.
+
+    Reads already report overdue pending workouts as missed (see
+    `utils.scheduled_workout_columns`), so the sweep only has to catch the stored status up.
+    It runs every `interval` seconds and updates at most `batch_size` rows per transaction,
+    skipping rows another worker (or a request) holds locked, so several workers can sweep
+    at once without blocking each other or the endpoints.
+    """
+
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+
+    async def sweep(self) -> int:
+        """Sweeps until no overdue pending workouts are left and returns how many were marked."""
+        sweep_query = f"""
+            WITH overdue AS (
+                SELECT scheduled_workout_id
+                FROM scheduled_workouts
+                WHERE {overdue_workout_condition}
+                ORDER BY scheduled_date, scheduled_time
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE scheduled_workouts s
+            SET status = 'missed'
+            FROM overdue
+            WHERE s.scheduled_workout_id = overdue.scheduled_workout_id;
+        """
+
+        swept = 0
+        while True:
+            async with connection.get_async_db() as (conn, cursor):
+                await cursor.execute(sweep_query, (self.batch_size,))
+                marked = cursor.rowcount
+                await conn.commit()
+
+            swept += marked
+            if marked < self.batch_size:
+                break
+
+        if swept:
+            logger.info(f"Marked {swept} overdue scheduled workouts as missed")
+        return swept
+
+    async def run(self):
+        """Sweeps every `interval` seconds until cancelled; meant to run as a background task."""
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                logger.error(f"Sweeping missed workouts failed, retrying: {error}")
+            await asyncio.sleep(self.interval)
+
+
+missed_workout_sweeper = MissedWorkoutSweeper(
+    interval=settings.MISSED_WORKOUTS_SWEEP_INTERVAL,
+    batch_size=settings.MISSED_WORKOUTS_SWEEP_BATCH_SIZE,
+)
@@ -0,0 +1,101 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.config import settings
+from app.schemas import users_schemas
+
+
+class TokenCache:
+    """A bounded LRU cache of access tokens that have already passed verification.
+
+    Tokens are keyed by their SHA-256 digest, so the cache never holds a usable token, and
+    each entry lives for at most `ttl` seconds and never past the token's own `exp`. Once
+    `max_size` tokens are cached, the least recently used one makes room for the next.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """A max_size of 0 turns the cache off, and lookups aren't counted."""
+        return self.max_size > 0
+
+    def get(self, token: str) -> users_schemas.TokenData | None:
+        """The token's data if it was verified before and hasn't expired since, else None."""
+        if not self.enabled:
+            return None
+
+        key = self._key(token)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, token: str, token_data: users_schemas.TokenData, expires_at: float | None):
+        """Caches a verified token until `expires_at` (its `exp`, in epoch seconds) or `ttl`."""
+        if not self.enabled:
+            return
+
+        expires = time.time() + self.ttl
+        if expires_at is not None:
+            expires = min(expires, expires_at)
+
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (token_data, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def discard(self, token: str):
+        with self._lock:
+            self._entries.pop(self._key(token), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """A snapshot of the cache's size and hit rate for monitoring."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "size": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+
+token_cache = TokenCache(
+    max_size=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.TOKEN_CACHE_TTL,
+)
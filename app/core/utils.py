@@ -1,102 +1,347 @@
 import logging
+from decimal import ROUND_HALF_UP, Decimal
 
 from fastapi import HTTPException, status
 from passlib.context import CryptContext
-from psycopg2 import sql
+from psycopg import sql
+from app.core.catalog import exercise_catalog
+from app.core.hashing import password_hasher
+from app.core.metrics import password_hash_seconds
+from app.db import statements
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 logger = logging.getLogger(__name__)
 logging.getLogger("passlib").setLevel(logging.CRITICAL)
 
 
+def _hash_password(password: str) -> str:
+    with password_hash_seconds.labels("hash").time():
+        return pwd_context.hash(password)
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    with password_hash_seconds.labels("verify").time():
+        return pwd_context.verify(plain_password, hashed_password)
+
+
 async def bcrypt_hash(password: str):
-    hashed_password = pwd_context.hash(password)
+    # bcrypt is slow on purpose, so it runs on the hasher's worker threads, off the event loop
+    hashed_password = await password_hasher.run(_hash_password, password)
     return hashed_password
 
 
 async def verify_login_details(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return await password_hasher.run(_verify_password, plain_password, hashed_password)
+
 
+async def user_data_version(user_id: str, cursor) -> dict:
+    """The version numbers of the user's plans and scheduled workouts, which every change to
+    them bumps (see migration 009), and whether one of their pending workouts is overdue but
+    not yet marked missed. Users who never changed anything are at version 0.
+    """
+    await statements.USER_DATA_VERSION.execute(cursor, (user_id,))
+    version = await cursor.fetchone()
+    return version or {"plans_version": 0, "schedules_version": 0, "overdue": False}
 
-async def update_missed_workouts(user_id: str, conn, cursor):
 
-    update_status_query = """
-    UPDATE scheduled_workouts
-    SET status = 'missed'
-    WHERE status = 'pending' AND (scheduled_date < CURRENT_DATE OR 
-    (scheduled_date = CURRENT_DATE AND scheduled_time < CURRENT_TIME))
-    AND user_id = %s;
+# A pending workout whose scheduled time has passed; the sweeper marks these as missed
+overdue_workout_condition = """status = 'pending' AND (scheduled_date < CURRENT_DATE OR
+    (scheduled_date = CURRENT_DATE AND scheduled_time < CURRENT_TIME))"""
+
+# Scheduled workout columns with overdue pending workouts reported as missed, so reads are
+# right even before the sweeper has caught up with them
+effective_status = f"CASE WHEN {overdue_workout_condition} THEN 'missed' ELSE status END"
+scheduled_workout_columns = f"""scheduled_workout_id, plan_id, user_id, scheduled_date, scheduled_time,
+    {effective_status} AS status, created_at"""
+
+
+# Plans with more exercises than this are written with COPY instead of a multi-row INSERT
+PLAN_EXERCISES_COPY_THRESHOLD = 500
+
+# The plan exercise values an update can change, as unnest() columns; rows are keyed on position
+plan_exercise_values = sql.SQL(
+    """
+    unnest(%s::int[], %s::int[], %s::int[], %s::int[], %s::numeric[], %s::text[])
+    AS v(position, exercise_id, sets, reps, weight, comments)
     """
+)
 
-    try:
-        cursor.execute(update_status_query, (user_id,))
-        conn.commit()
-    except Exception as error:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error occurred while updating missed workouts: {str(error)}",
+
+def plan_exercise_rows(exercises) -> list[tuple]:
+    """Turns a plan's ExercisePlanCreate list into (position, exercise_id, sets, reps, weight,
+    comments) rows, numbering them in the order they were given.
+    """
+    return [
+        (
+            position,
+            exercise.exercise_id,
+            exercise.sets,
+            exercise.reps,
+            exercise.weight,
+            exercise.comments,
         )
+        for position, exercise in enumerate(exercises)
+    ]
 
 
-async def fetch_plan_with_exercises(plan_id: str, user_id: str, cursor) -> dict:
-    # SQL query to fetch the workout plan details
-    select_plan_query = sql.SQL(
+def _plan_exercise_columns(rows: list[tuple]) -> list[list]:
+    positions, exercise_ids, sets, reps, weights, comments = (list(column) for column in zip(*rows))
+    # Weights go over as text so that e.g. 0.1 reaches the DECIMAL column exactly
+    weights = [None if weight is None else str(weight) for weight in weights]
+    return [positions, exercise_ids, sets, reps, weights, comments]
+
+
+# workout_plan_exercises.weight is DECIMAL(10,2); Postgres rounds half away from zero to fit it
+WEIGHT_PRECISION = Decimal("0.01")
+
+
+def stored_weight(weight) -> Decimal | None:
+    """A weight as the DECIMAL(10,2) column will store it."""
+    if weight is None:
+        return None
+    return Decimal(str(weight)).quantize(WEIGHT_PRECISION, rounding=ROUND_HALF_UP)
+
+
+def _same_plan_exercise(stored: dict, row: tuple) -> bool:
+    _, exercise_id, sets, reps, weight, comments = row
+    return (
+        stored["exercise_id"] == exercise_id
+        and stored["sets"] == sets
+        and stored["reps"] == reps
+        and stored["weight"] == stored_weight(weight)
+        and stored["comments"] == comments
+    )
+
+
+async def check_exercises_exist(exercises, cursor):
+    """Raises a 400 for the first exercise_id that isn't in the exercise catalog."""
+    exercise_ids = [exercise.exercise_id for exercise in exercises]
+    known = await exercise_catalog.lookup_many(exercise_ids, cursor)
+
+    for exercise_id in exercise_ids:
+        if exercise_id not in known:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Exercise id {exercise_id} does not exist",
+            )
+
+
+async def insert_plan_exercises(plan_id: str, rows: list[tuple], cursor) -> list[dict]:
+    """Inserts plan exercise rows (see plan_exercise_rows) in one statement, or with COPY for
+    very large plans, and returns them as stored, ordered by position.
+    """
+    if not rows:
+        return []
+
+    if len(rows) > PLAN_EXERCISES_COPY_THRESHOLD:
+        copy_query = sql.SQL(
+            """
+            COPY workout_plan_exercises (plan_id, position, exercise_id, sets, reps, weight, comments)
+            FROM STDIN
+            """
+        )
+        async with cursor.copy(copy_query) as copy:
+            for row in rows:
+                await copy.write_row((plan_id, *row))
+
+        await cursor.execute(
+            """
+            SELECT position, exercise_id, sets, reps, weight, comments
+            FROM workout_plan_exercises
+            WHERE plan_id = %s AND position >= %s
+            ORDER BY position
+            """,
+            (plan_id, rows[0][0]),
+        )
+        return await cursor.fetchall()
+
+    insert_query = sql.SQL(
         """
-        SELECT plan_id, user_id, name AS plan_name, description, created_at, updated_at
-        FROM workout_plans
-        WHERE user_id = %s AND plan_id = %s;
+        INSERT INTO workout_plan_exercises (plan_id, position, exercise_id, sets, reps, weight, comments)
+        SELECT %s::uuid, v.position, v.exercise_id, v.sets, v.reps, v.weight, v.comments
+        FROM {values}
+        RETURNING position, exercise_id, sets, reps, weight, comments;
         """
-    )
+    ).format(values=plan_exercise_values)
+
+    await cursor.execute(insert_query, (plan_id, *_plan_exercise_columns(rows)))
+    return sorted(await cursor.fetchall(), key=lambda row: row["position"])
+
 
-    # SQL query to fetch the exercises associated with the plan
-    select_plan_exercises_query = sql.SQL(
+async def replace_plan_exercises(plan_id: str, rows: list[tuple], cursor) -> list[dict]:
+    """Makes a plan's exercises match `rows` (see plan_exercise_rows), only touching the rows
+    that actually changed: rows are matched on position, changed ones are updated in place,
+    missing ones inserted and leftover ones deleted, each in a single statement.
+    Returns the plan's exercises as stored, ordered by position.
+
+    Matching on position keeps appends, removals from the end and edits in place cheap, but
+    inserting or removing an exercise earlier in the list shifts every row after it, and those
+    are all rewritten.
+    """
+    await cursor.execute(
         """
-        SELECT *
+        SELECT position, exercise_id, sets, reps, weight, comments
         FROM workout_plan_exercises
-        WHERE plan_id = %s;
+        WHERE plan_id = %s
+        """,
+        (plan_id,),
+    )
+    stored = {row["position"]: row for row in await cursor.fetchall()}
+
+    changed = [
+        row for row in rows if row[0] in stored and not _same_plan_exercise(stored[row[0]], row)
+    ]
+    added = [row for row in rows if row[0] not in stored]
+    plan_exercises = {position: row for position, row in stored.items() if position < len(rows)}
+
+    if len(plan_exercises) < len(stored):
+        await cursor.execute(
+            "DELETE FROM workout_plan_exercises WHERE plan_id = %s AND position >= %s",
+            (plan_id, len(rows)),
+        )
+
+    if changed:
+        update_query = sql.SQL(
+            """
+            UPDATE workout_plan_exercises wpe
+            SET exercise_id = v.exercise_id, sets = v.sets, reps = v.reps,
+            weight = v.weight, comments = v.comments
+            FROM {values}
+            WHERE wpe.plan_id = %s AND wpe.position = v.position
+            RETURNING wpe.position, wpe.exercise_id, wpe.sets, wpe.reps, wpe.weight, wpe.comments;
+            """
+        ).format(values=plan_exercise_values)
+
+        await cursor.execute(update_query, (*_plan_exercise_columns(changed), plan_id))
+        plan_exercises.update({row["position"]: row for row in await cursor.fetchall()})
+
+    for row in await insert_plan_exercises(plan_id, added, cursor):
+        plan_exercises[row["position"]] = row
+
+    return [plan_exercises[position] for position in sorted(plan_exercises)]
+
+
+# Joined laterally onto workout_plans (aliased `p`): the plan's exercises aggregated into a
+# single JSON array. Their names, descriptions and categories come from the exercise catalog.
+plan_exercises_lateral = sql.SQL(
+    """
+    LEFT JOIN LATERAL (
+        SELECT json_agg(
+            json_build_object(
+                'exercise_id', wpe.exercise_id,
+                'sets', wpe.sets,
+                'reps', wpe.reps,
+                'weight', wpe.weight,
+                'comments', wpe.comments
+            )
+            ORDER BY wpe.position
+        ) AS exercises
+        FROM workout_plan_exercises wpe
+        WHERE wpe.plan_id = p.plan_id
+    ) pe ON TRUE
+    """
+)
+
+
+async def complete_plan(plan: dict, cursor) -> dict:
+    """Fills in the details of a plan's exercises from the exercise catalog and adds the
+    plan's metadata. A plan without exercises gets an empty list.
+    """
+    exercises = await exercise_catalog.enrich(plan["exercises"] or [], cursor)
+    plan.update({"exercises": exercises})
+    plan.update({"metadata": {"exercise_count": len(exercises)}})
+    return plan
+
+
+# The IDs go in as a single array, so the statement is the same however many plans are asked for
+plans_with_exercises_statement = statements.Statement(
+    "plans_with_exercises",
+    sql.SQL(
+        """
+        SELECT p.plan_id, p.user_id, p.name AS plan_name, p.description, p.created_at,
+        p.updated_at, pe.exercises
+        FROM workout_plans p
+        {plan_exercises}
+        WHERE p.user_id = %s AND p.plan_id = ANY(%s::uuid[]);
         """
+    ).format(plan_exercises=plan_exercises_lateral),
+)
+
+
+async def fetch_plans_with_exercises(plan_ids, user_id: str, cursor) -> dict:
+    """Fetches the user's workout plans with the given IDs, with their exercises and metadata,
+    in a single query. Returns them keyed by plan_id; plans that weren't found are left out.
+    """
+    await plans_with_exercises_statement.execute(
+        cursor, (user_id, [str(plan_id) for plan_id in plan_ids])
     )
+    plans = await cursor.fetchall()
+
+    for plan in plans:
+        await complete_plan(plan, cursor)
+
+    return {plan["plan_id"]: plan for plan in plans}
 
+
+async def fetch_plan_with_exercises(plan_id: str, user_id: str, cursor) -> dict:
     try:
-        # Execute the query to fetch the workout plan
-        cursor.execute(select_plan_query, (user_id, plan_id))
-        plan = cursor.fetchone()
+        # Fetch the workout plan together with its exercises
+        plans = await fetch_plans_with_exercises([plan_id], user_id, cursor)
     except Exception as error:
         logger.error(f"Error occurred: {str(error)}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(error)
         )
 
-    if not plan:
+    if not plans:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No workout plans found for the user.",
         )
 
-    try:
-        # Fetch the exercises related to the plan
-        cursor.execute(select_plan_exercises_query, (plan["plan_id"],))
-        exercises = cursor.fetchall()
-
-        for x, exercise in enumerate(exercises):
-            # Fetch additional exercise details
-            select_query = sql.SQL(
-                """SELECT name AS exercise_name, description, category 
-                FROM exercises WHERE exercise_id = %s"""
-            )
-            cursor.execute(select_query, (exercise["exercise_id"],))
+    return next(iter(plans.values()))
 
-            exercise_extra_info = dict(cursor.fetchone())
-            exercises[x].update(**exercise_extra_info)
 
-        # Add the exercises and metadata to the plan
-        plan.update({"exercises": exercises})
-        plan.update({"metadata": {"exercise_count": len(exercises)}})
+class PlanLoader:
+    """Loads workout plans with their exercises for the duration of a single request.
 
-    except Exception as error:
-        logger.error(f"Error occurred: {str(error)}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(error)
-        )
+    Every distinct plan is fetched at most once: `load_many` fetches all the plans it
+    hasn't seen yet in one query, so a page of rows pointing at a handful of plans costs
+    a single round trip, and later lookups of the same plan are served from memory.
+    """
 
-    return plan
+    def __init__(self, user_id: str, cursor):
+        self.user_id = user_id
+        self.cursor = cursor
+        self._plans = {}
+
+    async def load_many(self, plan_ids) -> dict:
+        """Returns the requested plans keyed by plan_id, leaving out any that weren't found."""
+        plan_ids = {str(plan_id) for plan_id in plan_ids}
+        missing = plan_ids - self._plans.keys()
+
+        if missing:
+            try:
+                fetched = await fetch_plans_with_exercises(missing, self.user_id, self.cursor)
+            except Exception as error:
+                logger.error(
+                    f"Error occurred while loading workout plans: {str(error)}",
+                    exc_info=True,
+                )
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+                )
+            # Remember the plans that weren't found too, so they aren't queried again
+            self._plans.update(dict.fromkeys(missing))
+            self._plans.update(fetched)
+
+        return {
+            plan_id: self._plans[plan_id]
+            for plan_id in plan_ids
+            if self._plans[plan_id] is not None
+        }
+
+    async def load(self, plan_id: str) -> dict | None:
+        """Returns a single plan, or None if it doesn't exist or belongs to another user."""
+        plans = await self.load_many([plan_id])
+        return plans.get(str(plan_id))
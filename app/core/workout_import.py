@@ -0,0 +1,81 @@
+import csv
+import io
+import itertools
+import json
+import uuid
+from typing import BinaryIO, Iterator
+
+from pydantic import ValidationError
+
+from app.schemas import logs_schemas
+
+# Rows validated (on a worker thread) and copied into the staging table at a time
+IMPORT_BATCH_SIZE = 5000
+
+# At most this many row errors are listed in the response; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+
+def read_records(
+    upload: BinaryIO, file_format: logs_schemas.LogFileFormat
+) -> Iterator[tuple[int, dict | str]]:
+    """Yields (line number, record) for every record of a CSV (with a header row) or NDJSON
+    upload, reading it as it goes. A line that isn't valid JSON is yielded as its error message.
+    """
+    text = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+
+    if file_format == logs_schemas.LogFileFormat.csv:
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            yield line_number, f"Invalid JSON: {error}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, "Each line must be a JSON object"
+            continue
+        yield line_number, record
+
+
+def validate_records(
+    records: Iterator[tuple[int, dict | str]]
+) -> Iterator[tuple[int, tuple | str]]:
+    """Validates records against WorkoutLogCreate, yielding (line number, row) for valid ones,
+    with the row in the staging table's column order, and (line number, message) otherwise.
+    """
+    for line_number, record in records:
+        if isinstance(record, str):
+            yield line_number, record
+            continue
+
+        try:
+            workout_log = logs_schemas.WorkoutLogCreate.model_validate(record)
+            scheduled_workout_id = uuid.UUID(workout_log.scheduled_workout_id)
+        except ValidationError as error:
+            yield line_number, "; ".join(
+                f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+                for detail in error.errors()
+            )
+            continue
+        except ValueError:
+            yield line_number, "scheduled_workout_id: Input should be a valid UUID"
+            continue
+
+        yield line_number, (
+            line_number,
+            scheduled_workout_id,
+            workout_log.completed_at,
+            workout_log.total_time,
+            workout_log.notes,
+        )
+
+
+def next_batch(rows: Iterator, size: int = IMPORT_BATCH_SIZE) -> list:
+    return list(itertools.islice(rows, size))
@@ -1,33 +1,158 @@
 import time
-from contextlib import contextmanager
+import weakref
+from contextlib import contextmanager, asynccontextmanager
+import psycopg
 import psycopg2
-from psycopg2.extras import RealDictCursor
+import psycopg_pool
+from fastapi import HTTPException, status
+from psycopg.rows import dict_row
+from psycopg.adapt import Loader
+from psycopg.pq import TransactionStatus
 from app.core.config import settings
+from app.core.metrics import db_pool_acquire_seconds
+from app.db.cursors import InstrumentedAsyncCursor, InstrumentedRealDictCursor
+from app.db.pool import ConnectionPool, PoolTimeout
+
+
+def connect():
+    """Opens a new connection to the database."""
+    return psycopg2.connect(
+        database=settings.DATABASE_NAME,
+        user=settings.DATABASE_USERNAME,
+        password=settings.DATABASE_PASSWORD,
+        port=settings.DATABASE_PORT,
+        # Records query timings for /metrics; otherwise a plain RealDictCursor
+        cursor_factory=InstrumentedRealDictCursor,
+    )
+
+
+# Used by the scripts (migrations, seeders, rollups) through get_db; the endpoints use async_pool.
+# Connections are opened lazily on first use
+pool = ConnectionPool(
+    connect,
+    min_size=settings.DATABASE_POOL_MIN_SIZE,
+    max_size=settings.DATABASE_POOL_MAX_SIZE,
+    timeout=settings.DATABASE_POOL_TIMEOUT,
+    max_idle=settings.DATABASE_POOL_MAX_IDLE,
+    max_lifetime=settings.DATABASE_POOL_MAX_LIFETIME,
+    check_interval=settings.DATABASE_POOL_CHECK_INTERVAL,
+)
+
+# When each async connection was last handed back, so idle ones can be health-checked
+_returned_at = weakref.WeakKeyDictionary()
+
+
+class _UUIDStrLoader(Loader):
+    # psycopg2 hands UUIDs back as strings, which is what the endpoints and schemas expect
+    def load(self, data):
+        return bytes(data).decode()
+
+
+async def _configure_async_connection(conn):
+    conn.adapters.register_loader("uuid", _UUIDStrLoader)
+
+
+async def _check_async_connection(conn):
+    # Only pay for a round trip when the connection has been sitting idle for a while
+    idle_for = time.monotonic() - _returned_at.get(conn, 0.0)
+    if idle_for >= settings.DATABASE_POOL_CHECK_INTERVAL:
+        await psycopg_pool.AsyncConnectionPool.check_connection(conn)
+
+
+async def _reset_async_connection(conn):
+    # RESET ALL must run outside a transaction, otherwise the rollback would undo it
+    await conn.set_autocommit(True)
+    await conn.execute("RESET ALL")
+    await conn.set_autocommit(False)
+    _returned_at[conn] = time.monotonic()
+
+
+async_connect_kwargs = {
+    "dbname": settings.DATABASE_NAME,
+    "user": settings.DATABASE_USERNAME,
+    "password": settings.DATABASE_PASSWORD,
+    "port": settings.DATABASE_PORT,
+    "row_factory": dict_row,
+    "cursor_factory": InstrumentedAsyncCursor,
+    # Without prepared statements nothing is prepared, not even queries run over and over
+    "prepare_threshold": (
+        settings.DATABASE_PREPARE_THRESHOLD if settings.DATABASE_PREPARED_STATEMENTS else None
+    ),
+}
+
+
+async def connect_async(**kwargs):
+    """Opens a new AsyncConnection outside the pool, for long-lived work such as LISTEN."""
+    conn = await psycopg.AsyncConnection.connect(**{**async_connect_kwargs, **kwargs})
+    await _configure_async_connection(conn)
+    return conn
+
+
+# Used by the async endpoints; opened and closed by the application's lifespan
+async_pool = psycopg_pool.AsyncConnectionPool(
+    kwargs=async_connect_kwargs,
+    min_size=settings.DATABASE_POOL_MIN_SIZE,
+    max_size=settings.DATABASE_POOL_MAX_SIZE,
+    timeout=settings.DATABASE_POOL_TIMEOUT,
+    max_idle=settings.DATABASE_POOL_MAX_IDLE,
+    max_lifetime=settings.DATABASE_POOL_MAX_LIFETIME,
+    configure=_configure_async_connection,
+    check=_check_async_connection,
+    reset=_reset_async_connection,
+    open=False,
+)
 
 
 @contextmanager
 def get_db():
     """Yields conn, cursor
     The Connection and the cursor used to execute commands.
+    The connection is borrowed from the pool and handed back (rolled back and reset) on exit.
     """
     try:
-        while True:
-            try:
-                conn = psycopg2.connect(
-                    database=settings.DATABASE_NAME,
-                    user=settings.DATABASE_USERNAME,
-                    password=settings.DATABASE_PASSWORD,
-                    port=settings.DATABASE_PORT,
-                    cursor_factory=RealDictCursor,
-                )
-                cursor = conn.cursor()
-                break
-            except Exception as error:
-                print(f"Connecting to database Failed.\nERROR: {error}")
-                time.sleep(2)
+        with db_pool_acquire_seconds.labels("sync").time():
+            conn = pool.getconn()
+    except PoolTimeout as error:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(error)
+        )
 
+    cursor = conn.cursor()
+    try:
         yield conn, cursor
 
     finally:
         cursor.close()
-        conn.close()
+        pool.putconn(conn)
+
+
+@asynccontextmanager
+async def get_async_db():
+    """Yields conn, cursor
+    The async counterpart of get_db: an AsyncConnection from the async pool and an
+    AsyncCursor whose execute/fetch calls must be awaited. Writes must be committed inside the
+    block. If the block raises, anything left uncommitted is rolled back; if it exits normally,
+    the transaction still open (holding only reads) is committed instead, because psycopg drops
+    a connection's prepared statements (see app.db.statements) on every rollback.
+    """
+    try:
+        with db_pool_acquire_seconds.labels("async").time():
+            conn = await async_pool.getconn()
+    except psycopg_pool.PoolTimeout as error:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(error)
+        )
+
+    try:
+        async with conn.cursor() as cursor:
+            yield conn, cursor
+        if conn.info.transaction_status == TransactionStatus.INTRANS:
+            await conn.commit()
+
+    finally:
+        if conn.info.transaction_status != TransactionStatus.IDLE:
+            try:
+                await conn.rollback()
+            except Exception:
+                pass
+        await async_pool.putconn(conn)
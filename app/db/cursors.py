@@ -0,0 +1,39 @@
+import time
+
+import psycopg
+from psycopg2.extras import RealDictCursor
+
+from app.core import metrics, query_stats
+
+
+def _record(name: str, started: float, rows: int):
+    duration = time.perf_counter() - started
+    metrics.observe_query(name, duration, rows)
+    query_stats.record_query(name, duration)
+
+
+class InstrumentedAsyncCursor(psycopg.AsyncCursor):
+    """An AsyncCursor that records each query's execution time and row count, named after
+    the function that ran it or `query_name` (see metrics.query_name), for /metrics and the
+    current request's query stats.
+    """
+
+    async def execute(self, query, params=None, *, query_name: str | None = None, **kwargs):
+        name = metrics.query_name(query, query_name)
+        started = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            _record(name, started, self.rowcount)
+
+
+class InstrumentedRealDictCursor(RealDictCursor):
+    """The psycopg2 counterpart of InstrumentedAsyncCursor, for get_db connections."""
+
+    def execute(self, query, vars=None):
+        name = metrics.query_name(query)
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _record(name, started, self.rowcount)
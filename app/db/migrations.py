@@ -0,0 +1,40 @@
+import logging
+from pathlib import Path
+from app.db import connection
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent / "scripts" / "migrations"
+
+# Arbitrary key for the advisory lock that stops two processes migrating at the same time
+MIGRATIONS_LOCK_KEY = 7_452_118
+
+
+def apply_migrations():
+    """Applies, in order, every script in scripts/migrations that hasn't been applied yet.
+    Expects the base schema from scripts/create_schema.sql to be in place already.
+    """
+    with connection.get_db() as (conn, cursor):
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATIONS_LOCK_KEY,))
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name VARCHAR(255) PRIMARY KEY,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        cursor.execute("SELECT name FROM schema_migrations")
+        applied = {row["name"] for row in cursor.fetchall()}
+
+        for script in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            if script.name in applied:
+                continue
+
+            cursor.execute(script.read_text())
+            cursor.execute(
+                "INSERT INTO schema_migrations (name) VALUES (%s)", (script.name,)
+            )
+            logger.info(f"Applied migration {script.name}")
+
+        conn.commit()
@@ -0,0 +1,260 @@
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out before the timeout expired."""
+
+
+class ConnectionPool:
+    """A thread-safe pool of psycopg2 connections.
+
+    Connections are opened lazily up to `max_size`, handed out most-recently-used first
+    and reset before they go back in the pool, so session state never leaks between requests.
+    Idle connections above `min_size` are closed after `max_idle` seconds and every
+    connection is recycled once it is older than `max_lifetime` seconds.
+    """
+
+    def __init__(
+        self,
+        connect,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        max_idle: float = 300.0,
+        max_lifetime: float = 3600.0,
+        check_interval: float = 30.0,
+        reconnect_delay: float = 2.0,
+    ):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_interval = check_interval
+        self.reconnect_delay = reconnect_delay
+
+        self._cond = threading.Condition()
+        # Idle connections as (conn, returned_at); the right end is the most recently used
+        self._idle = deque()
+        self._created_at = {}
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._connections_opened = 0
+        self._connections_closed = 0
+        self._checkout_time_total = 0.0
+        self._checkout_time_max = 0.0
+
+    def open(self):
+        """Pre-opens `min_size` connections so the first requests don't pay for the handshake."""
+        with self._cond:
+            self._closed = False
+            missing = self.min_size - self._size
+            self._size += max(missing, 0)
+
+        for _ in range(max(missing, 0)):
+            try:
+                conn = self._open(deadline=time.monotonic() + self.timeout)
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def close(self):
+        """Closes every idle connection; connections in use are closed when they are returned."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def getconn(self):
+        """Checks out a healthy connection, waiting up to `timeout` seconds for one to free up."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        stale = []
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("The connection pool is closed")
+
+                conn, returned_at = self._pop_idle(stale)
+                if conn is not None:
+                    break
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"Timed out after {self.timeout}s waiting for a database connection"
+                    )
+
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        for stale_conn in stale:
+            self._discard(stale_conn)
+
+        try:
+            if conn is None or not self._is_healthy(conn, started - returned_at):
+                if conn is not None:
+                    self._discard(conn)
+                conn = self._open(deadline)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        elapsed = time.monotonic() - started
+        with self._cond:
+            self._in_use += 1
+            self._checkouts += 1
+            self._checkout_time_total += elapsed
+            self._checkout_time_max = max(self._checkout_time_max, elapsed)
+
+        return conn
+
+    def putconn(self, conn, close: bool = False):
+        """Returns a connection to the pool, rolling back and resetting its session first."""
+        now = time.monotonic()
+        expired = now - self._created_at.get(conn, now) > self.max_lifetime
+
+        if not (close or expired or conn.closed):
+            try:
+                conn.reset()
+            except Exception as error:
+                logger.warning(f"Discarding connection that failed to reset: {error}")
+                close = True
+
+        with self._cond:
+            self._in_use -= 1
+            keep = not (close or expired or conn.closed or self._closed)
+            if keep:
+                self._idle.append((conn, now))
+            else:
+                self._size -= 1
+            self._cond.notify()
+
+        if not keep:
+            self._discard(conn)
+
+    def get_stats(self) -> dict:
+        """A snapshot of the pool's size, usage and checkout latency for monitoring."""
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "waiting": self._waiting,
+                "checkouts": checkouts,
+                "timeouts": self._timeouts,
+                "connections_opened": self._connections_opened,
+                "connections_closed": self._connections_closed,
+                "checkout_ms_avg": round(self._checkout_time_total / checkouts * 1000, 3)
+                if checkouts
+                else 0.0,
+                "checkout_ms_max": round(self._checkout_time_max * 1000, 3),
+            }
+
+    def _pop_idle(self, stale: list):
+        """Pops the most recently used idle connection and the time it was returned,
+        moving expired ones to `stale`.
+
+        Must be called with the condition held.
+        """
+        now = time.monotonic()
+
+        # The oldest idle connections sit on the left; close them while we're above min_size
+        while self._idle and self._size > self.min_size:
+            conn, returned_at = self._idle[0]
+            if now - returned_at <= self.max_idle:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            stale.append(conn)
+
+        while self._idle:
+            conn, returned_at = self._idle.pop()
+            if now - self._created_at.get(conn, now) <= self.max_lifetime:
+                return conn, returned_at
+            self._size -= 1
+            stale.append(conn)
+
+        return None, None
+
+    def _is_healthy(self, conn, idle_for: float) -> bool:
+        if conn.closed:
+            return False
+
+        # Only pay for a round trip when the connection has been sitting idle for a while
+        if idle_for < self.check_interval:
+            return True
+
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+        except Exception as error:
+            logger.warning(f"Discarding connection that failed its health check: {error}")
+            return False
+        return True
+
+    def _open(self, deadline: float):
+        while True:
+            try:
+                conn = self._connect()
+                break
+            except Exception as error:
+                if time.monotonic() + self.reconnect_delay > deadline:
+                    raise PoolTimeout(
+                        f"Could not connect to the database within {self.timeout}s: {error}"
+                    ) from error
+                logger.error(f"Connecting to database Failed. ERROR: {error}")
+                time.sleep(self.reconnect_delay)
+
+        with self._cond:
+            self._created_at[conn] = time.monotonic()
+            self._connections_opened += 1
+        return conn
+
+    def _discard(self, conn):
+        with self._cond:
+            self._created_at.pop(conn, None)
+            self._connections_closed += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
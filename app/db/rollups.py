@@ -0,0 +1,133 @@
+import argparse
+
+from app.db import connection
+
+# Recomputed totals for a batch of users, straight from their workout logs
+recompute_daily_query = """
+    SELECT user_id, completed_at::DATE AS day, COUNT(*) AS total_workouts,
+    COUNT(total_time) AS timed_workouts, COALESCE(SUM(total_time), 0) AS total_time_spent
+    FROM workout_logs
+    WHERE user_id = ANY(%(user_ids)s::uuid[]) AND completed_at IS NOT NULL
+    GROUP BY user_id, completed_at::DATE
+"""
+
+recompute_totals_query = """
+    SELECT user_id, COUNT(*) AS total_workouts, COUNT(total_time) AS timed_workouts,
+    COALESCE(SUM(total_time), 0) AS total_time_spent
+    FROM workout_logs
+    WHERE user_id = ANY(%(user_ids)s::uuid[])
+    GROUP BY user_id
+"""
+
+
+def rebuild_progress_rollups(batch_size: int = 1000, check_only: bool = False) -> int:
+    """Recomputes user_progress and user_daily_progress from workout_logs, `batch_size` users
+    per transaction, and returns how many users' rollups were out of date.
+
+    Each batch holds a SHARE lock on workout_logs while it runs, so logs written meanwhile wait
+    for the batch instead of being counted twice or missed. With `check_only`, the rollups are
+    compared against the recomputed totals but left untouched.
+    """
+    out_of_date = 0
+    last_user_id = None
+
+    while True:
+        with connection.get_db() as (conn, cursor):
+            cursor.execute(
+                """
+                SELECT user_id FROM users
+                WHERE %(after)s::uuid IS NULL OR user_id > %(after)s::uuid
+                ORDER BY user_id
+                LIMIT %(limit)s
+                """,
+                {"after": last_user_id, "limit": batch_size},
+            )
+            user_ids = [str(row["user_id"]) for row in cursor.fetchall()]
+            if not user_ids:
+                break
+            params = {"user_ids": user_ids}
+
+            cursor.execute("LOCK TABLE workout_logs IN SHARE MODE")
+
+            # Users whose stored totals differ from the recomputed ones, day by day or overall
+            cursor.execute(
+                f"""
+                SELECT DISTINCT user_id FROM (
+                    (SELECT user_id, day, total_workouts, timed_workouts, total_time_spent
+                    FROM user_daily_progress WHERE user_id = ANY(%(user_ids)s::uuid[])
+                    EXCEPT ALL {recompute_daily_query})
+                    UNION ALL
+                    ({recompute_daily_query} EXCEPT ALL
+                    SELECT user_id, day, total_workouts, timed_workouts, total_time_spent
+                    FROM user_daily_progress WHERE user_id = ANY(%(user_ids)s::uuid[]))
+                    UNION ALL
+                    (SELECT user_id, NULL::DATE, total_workouts, timed_workouts, total_time_spent
+                    FROM user_progress
+                    WHERE user_id = ANY(%(user_ids)s::uuid[]) AND total_workouts <> 0
+                    EXCEPT ALL SELECT user_id, NULL::DATE, total_workouts, timed_workouts,
+                    total_time_spent FROM ({recompute_totals_query}) totals)
+                    UNION ALL
+                    (SELECT user_id, NULL::DATE, total_workouts, timed_workouts, total_time_spent
+                    FROM ({recompute_totals_query}) totals EXCEPT ALL
+                    SELECT user_id, NULL::DATE, total_workouts, timed_workouts, total_time_spent
+                    FROM user_progress WHERE user_id = ANY(%(user_ids)s::uuid[]))
+                ) differences
+                """,
+                params,
+            )
+            stale = [str(row["user_id"]) for row in cursor.fetchall()]
+            out_of_date += len(stale)
+
+            if stale and not check_only:
+                stale_params = {"user_ids": stale}
+                cursor.execute(
+                    "DELETE FROM user_daily_progress WHERE user_id = ANY(%(user_ids)s::uuid[])",
+                    stale_params,
+                )
+                cursor.execute(
+                    "DELETE FROM user_progress WHERE user_id = ANY(%(user_ids)s::uuid[])",
+                    stale_params,
+                )
+                cursor.execute(
+                    f"""
+                    INSERT INTO user_daily_progress
+                    (user_id, day, total_workouts, timed_workouts, total_time_spent)
+                    {recompute_daily_query}
+                    """,
+                    stale_params,
+                )
+                cursor.execute(
+                    f"""
+                    INSERT INTO user_progress
+                    (user_id, total_workouts, timed_workouts, total_time_spent)
+                    {recompute_totals_query}
+                    """,
+                    stale_params,
+                )
+
+            conn.commit()
+            last_user_id = user_ids[-1]
+
+        action = "Found" if check_only else "Rebuilt"
+        print(f"Checked {len(user_ids)} users up to {last_user_id}: {action} {len(stale)} out of date")
+
+    return out_of_date
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Recompute the progress rollups (user_progress, user_daily_progress) "
+        "from workout_logs."
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=1000, help="users recomputed per transaction"
+    )
+    parser.add_argument(
+        "--check", action="store_true", help="only report users whose rollups are out of date"
+    )
+    args = parser.parse_args()
+
+    out_of_date = rebuild_progress_rollups(batch_size=args.batch_size, check_only=args.check)
+    print(f"{out_of_date} users had out of date progress rollups")
+    if args.check and out_of_date:
+        raise SystemExit(1)
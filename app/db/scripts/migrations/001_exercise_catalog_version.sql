@@ -0,0 +1,34 @@
+-- Every change to the exercises table bumps a version number and announces it on the
+-- exercise_catalog channel, so the in-memory exercise catalog of every worker can refresh itself.
+
+CREATE TABLE IF NOT EXISTS exercise_catalog_version (
+    singleton BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO exercise_catalog_version (singleton, version)
+VALUES (TRUE, 0)
+ON CONFLICT DO NOTHING;
+
+
+CREATE OR REPLACE FUNCTION bump_exercise_catalog_version()
+RETURNS TRIGGER AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    UPDATE exercise_catalog_version
+    SET version = version + 1
+    RETURNING version INTO new_version;
+
+    PERFORM pg_notify('exercise_catalog', new_version::TEXT);
+    RETURN NULL;
+END;
+$$ LANGUAGE 'plpgsql';
+
+
+DROP TRIGGER IF EXISTS exercise_catalog_changed ON exercises;
+
+CREATE TRIGGER exercise_catalog_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON exercises
+FOR EACH STATEMENT
+EXECUTE FUNCTION bump_exercise_catalog_version();
@@ -0,0 +1,17 @@
+-- Plan exercises remember their place in the plan, so plans read back in the order they were written
+-- and an update can tell which rows actually changed. Also indexes plan_id, which every plan read filters on.
+
+ALTER TABLE workout_plan_exercises ADD COLUMN IF NOT EXISTS position INT;
+
+UPDATE workout_plan_exercises wpe
+SET position = ordered.position
+FROM (
+    SELECT plan_exercise_id, ROW_NUMBER() OVER (PARTITION BY plan_id ORDER BY ctid) - 1 AS position
+    FROM workout_plan_exercises
+) ordered
+WHERE wpe.plan_exercise_id = ordered.plan_exercise_id AND wpe.position IS NULL;
+
+ALTER TABLE workout_plan_exercises ALTER COLUMN position SET NOT NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS workout_plan_exercises_plan_id_position_idx
+ON workout_plan_exercises (plan_id, position);
@@ -0,0 +1,11 @@
+-- Indexes matching the sort keys of the paginated list endpoints, so a page (at any depth)
+-- is a short index range scan.
+
+CREATE INDEX IF NOT EXISTS workout_plans_user_id_created_at_idx
+ON workout_plans (user_id, created_at, plan_id);
+
+CREATE INDEX IF NOT EXISTS scheduled_workouts_user_id_scheduled_at_idx
+ON scheduled_workouts (user_id, scheduled_date, scheduled_time, scheduled_workout_id);
+
+CREATE INDEX IF NOT EXISTS workout_logs_user_id_completed_at_idx
+ON workout_logs (user_id, completed_at, log_id);
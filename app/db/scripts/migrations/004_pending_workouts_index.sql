@@ -0,0 +1,6 @@
+-- Lets the missed workouts sweeper find overdue pending workouts without scanning the
+-- completed and missed ones, which make up most of the table.
+
+CREATE INDEX IF NOT EXISTS scheduled_workouts_pending_idx
+ON scheduled_workouts (scheduled_date, scheduled_time)
+WHERE status = 'pending';
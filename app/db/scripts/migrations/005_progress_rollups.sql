@@ -0,0 +1,137 @@
+-- Running totals of each user's workout logs, overall and per day, kept up to date by
+-- triggers on workout_logs so the progress report never has to scan a user's whole history.
+-- `timed_workouts` counts the logs with a total_time, so a user whose logs have none still
+-- reports no time spent (NULL) the way SUM() did.
+
+CREATE TABLE IF NOT EXISTS user_progress (
+    user_id UUID PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+    total_workouts BIGINT NOT NULL DEFAULT 0,
+    timed_workouts BIGINT NOT NULL DEFAULT 0,
+    total_time_spent BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS user_daily_progress (
+    user_id UUID NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    total_workouts BIGINT NOT NULL DEFAULT 0,
+    timed_workouts BIGINT NOT NULL DEFAULT 0,
+    total_time_spent BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day)
+);
+
+
+-- One log added to (workouts = 1) or taken away from (workouts = -1) the totals
+DO $$
+BEGIN
+    CREATE TYPE progress_change AS (
+        user_id UUID,
+        day DATE,
+        workouts INT,
+        total_time INT
+    );
+EXCEPTION
+    WHEN duplicate_object THEN NULL;
+END;
+$$;
+
+
+CREATE OR REPLACE FUNCTION apply_progress_changes(changes progress_change[])
+RETURNS VOID AS $$
+BEGIN
+    -- Rows are upserted in key order so concurrent statements lock them in the same order
+    INSERT INTO user_daily_progress AS p (user_id, day, total_workouts, timed_workouts, total_time_spent)
+    SELECT c.user_id, c.day, SUM(c.workouts),
+        COALESCE(SUM(c.workouts) FILTER (WHERE c.total_time IS NOT NULL), 0),
+        COALESCE(SUM(c.workouts * c.total_time::BIGINT), 0)
+    FROM unnest(changes) AS c
+    WHERE c.user_id IS NOT NULL AND c.day IS NOT NULL
+    GROUP BY c.user_id, c.day
+    ORDER BY c.user_id, c.day
+    ON CONFLICT (user_id, day) DO UPDATE
+    SET total_workouts = p.total_workouts + EXCLUDED.total_workouts,
+        timed_workouts = p.timed_workouts + EXCLUDED.timed_workouts,
+        total_time_spent = p.total_time_spent + EXCLUDED.total_time_spent;
+
+    DELETE FROM user_daily_progress p
+    USING unnest(changes) AS c
+    WHERE p.user_id = c.user_id AND p.day = c.day AND p.total_workouts = 0;
+
+    INSERT INTO user_progress AS p (user_id, total_workouts, timed_workouts, total_time_spent)
+    SELECT c.user_id, SUM(c.workouts),
+        COALESCE(SUM(c.workouts) FILTER (WHERE c.total_time IS NOT NULL), 0),
+        COALESCE(SUM(c.workouts * c.total_time::BIGINT), 0)
+    FROM unnest(changes) AS c
+    WHERE c.user_id IS NOT NULL
+    GROUP BY c.user_id
+    ORDER BY c.user_id
+    ON CONFLICT (user_id) DO UPDATE
+    SET total_workouts = p.total_workouts + EXCLUDED.total_workouts,
+        timed_workouts = p.timed_workouts + EXCLUDED.timed_workouts,
+        total_time_spent = p.total_time_spent + EXCLUDED.total_time_spent;
+END;
+$$ LANGUAGE 'plpgsql';
+
+
+CREATE OR REPLACE FUNCTION maintain_progress_rollups()
+RETURNS TRIGGER AS $$
+DECLARE
+    changes progress_change[] := '{}';
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        changes := changes || ARRAY(
+            SELECT ROW(user_id, completed_at::DATE, -1, total_time)::progress_change
+            FROM old_logs
+        );
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        changes := changes || ARRAY(
+            SELECT ROW(user_id, completed_at::DATE, 1, total_time)::progress_change
+            FROM new_logs
+        );
+    END IF;
+
+    PERFORM apply_progress_changes(changes);
+    RETURN NULL;
+END;
+$$ LANGUAGE 'plpgsql';
+
+
+DROP TRIGGER IF EXISTS workout_logs_progress_insert ON workout_logs;
+DROP TRIGGER IF EXISTS workout_logs_progress_update ON workout_logs;
+DROP TRIGGER IF EXISTS workout_logs_progress_delete ON workout_logs;
+
+CREATE TRIGGER workout_logs_progress_insert
+AFTER INSERT ON workout_logs
+REFERENCING NEW TABLE AS new_logs
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_progress_rollups();
+
+CREATE TRIGGER workout_logs_progress_update
+AFTER UPDATE ON workout_logs
+REFERENCING OLD TABLE AS old_logs NEW TABLE AS new_logs
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_progress_rollups();
+
+CREATE TRIGGER workout_logs_progress_delete
+AFTER DELETE ON workout_logs
+REFERENCING OLD TABLE AS old_logs
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_progress_rollups();
+
+
+-- Fill the rollups in from the logs written so far; `python -m app.db.rollups` can rebuild
+-- (or check) them again later
+TRUNCATE user_progress, user_daily_progress;
+
+INSERT INTO user_daily_progress (user_id, day, total_workouts, timed_workouts, total_time_spent)
+SELECT user_id, completed_at::DATE, COUNT(*), COUNT(total_time), COALESCE(SUM(total_time), 0)
+FROM workout_logs
+WHERE user_id IS NOT NULL AND completed_at IS NOT NULL
+GROUP BY user_id, completed_at::DATE;
+
+INSERT INTO user_progress (user_id, total_workouts, timed_workouts, total_time_spent)
+SELECT user_id, COUNT(*), COUNT(total_time), COALESCE(SUM(total_time), 0)
+FROM workout_logs
+WHERE user_id IS NOT NULL
+GROUP BY user_id;
@@ -0,0 +1,20 @@
+-- Refresh tokens let clients get a new access token without logging in again. Only a SHA-256
+-- hash of each token's secret is stored. Every token issued by rotating another one belongs to
+-- the same family as the token from the original login, so the whole chain can be revoked at once.
+
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+    token_id UUID PRIMARY KEY,
+    family_id UUID NOT NULL,
+    user_id UUID NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    token_hash BYTEA NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    -- Set when the token is exchanged for a new one; presenting it again means it was stolen
+    used_at TIMESTAMP,
+    revoked_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS refresh_tokens_family_id_idx ON refresh_tokens (family_id);
+
+CREATE INDEX IF NOT EXISTS refresh_tokens_user_id_expires_at_idx
+ON refresh_tokens (user_id, expires_at);
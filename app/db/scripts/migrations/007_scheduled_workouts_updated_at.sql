@@ -0,0 +1,21 @@
+-- Scheduled workouts record when they last changed, like workout plans do, so reads can answer
+-- conditional requests (ETag / Last-Modified) from a cheap version lookup.
+
+ALTER TABLE scheduled_workouts ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+
+UPDATE scheduled_workouts SET updated_at = created_at WHERE updated_at IS NULL;
+
+ALTER TABLE scheduled_workouts
+ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP,
+ALTER COLUMN updated_at SET NOT NULL;
+
+DROP TRIGGER IF EXISTS set_timestamp ON scheduled_workouts;
+
+CREATE TRIGGER set_timestamp
+BEFORE UPDATE ON scheduled_workouts
+FOR EACH ROW
+EXECUTE FUNCTION update_updated_at_column();
+
+-- A user's latest change and row count can then be read from the index alone
+CREATE INDEX IF NOT EXISTS scheduled_workouts_user_id_updated_at_idx
+ON scheduled_workouts (user_id, updated_at);
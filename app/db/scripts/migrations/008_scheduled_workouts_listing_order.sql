@@ -0,0 +1,7 @@
+-- Scheduled workouts are listed by date, latest time of day first (as they were before keyset
+-- pagination); the index follows that order so a page is still a short index range scan.
+
+DROP INDEX IF EXISTS scheduled_workouts_user_id_scheduled_at_idx;
+
+CREATE INDEX IF NOT EXISTS scheduled_workouts_user_id_listing_idx
+ON scheduled_workouts (user_id, scheduled_date, scheduled_time DESC, scheduled_workout_id DESC);
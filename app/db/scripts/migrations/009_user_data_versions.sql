@@ -0,0 +1,149 @@
+-- One row per user with version numbers that every change to their plans or scheduled workouts
+-- bumps, deletes included, so the list endpoints can answer conditional requests (ETag) by
+-- reading a single row instead of aggregating the user's rows on every request.
+-- Scheduled workouts embed their plan, so plan changes bump the schedules version too.
+-- next_pending_at is the user's earliest pending workout: once it has passed, a listing shows
+-- it as missed before the sweeper has marked it, which no version number reflects.
+
+CREATE TABLE IF NOT EXISTS user_data_versions (
+    user_id UUID PRIMARY KEY REFERENCES users (user_id) ON DELETE CASCADE,
+    plans_version BIGINT NOT NULL DEFAULT 0,
+    schedules_version BIGINT NOT NULL DEFAULT 0,
+    next_pending_at TIMESTAMP
+);
+
+-- Finds a user's earliest pending workout without going through their history
+CREATE INDEX IF NOT EXISTS scheduled_workouts_user_id_pending_idx
+ON scheduled_workouts (user_id, scheduled_date, scheduled_time)
+WHERE status = 'pending';
+
+
+CREATE OR REPLACE FUNCTION bump_user_data_versions(changed_users UUID[], plans_changed BOOLEAN)
+RETURNS VOID AS $$
+    -- Users are locked in a fixed order, so concurrent bumps can't deadlock. Users being
+    -- deleted (their rows going with them) are no longer in users and are skipped.
+    INSERT INTO user_data_versions AS v (user_id, plans_version, schedules_version, next_pending_at)
+    SELECT u.user_id, 1, 1, (
+        SELECT s.scheduled_date + s.scheduled_time
+        FROM scheduled_workouts s
+        WHERE s.user_id = u.user_id AND s.status = 'pending'
+        ORDER BY s.scheduled_date, s.scheduled_time
+        LIMIT 1
+    )
+    FROM users u
+    WHERE u.user_id = ANY (changed_users)
+    ORDER BY u.user_id
+    ON CONFLICT (user_id) DO UPDATE
+    SET plans_version = v.plans_version + plans_changed::INT,
+        schedules_version = v.schedules_version + 1,
+        next_pending_at = EXCLUDED.next_pending_at;
+$$ LANGUAGE sql;
+
+
+-- Statement-level, so a bulk write bumps each user once. A transition table can only belong to
+-- a trigger for a single event, hence a trigger per event, all naming their rows changed_rows.
+
+CREATE OR REPLACE FUNCTION workout_plans_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_user_data_versions(ARRAY(SELECT DISTINCT user_id FROM changed_rows), TRUE);
+    RETURN NULL;
+END;
+$$ LANGUAGE 'plpgsql';
+
+CREATE OR REPLACE FUNCTION workout_plan_exercises_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Exercises deleted along with their plan find no plan here; the plan's own trigger bumps
+    PERFORM bump_user_data_versions(
+        ARRAY(
+            SELECT DISTINCT p.user_id
+            FROM changed_rows c
+            JOIN workout_plans p ON p.plan_id = c.plan_id
+        ),
+        TRUE
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE 'plpgsql';
+
+CREATE OR REPLACE FUNCTION scheduled_workouts_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_user_data_versions(ARRAY(SELECT DISTINCT user_id FROM changed_rows), FALSE);
+    RETURN NULL;
+END;
+$$ LANGUAGE 'plpgsql';
+
+
+DROP TRIGGER IF EXISTS workout_plans_inserted ON workout_plans;
+DROP TRIGGER IF EXISTS workout_plans_updated ON workout_plans;
+DROP TRIGGER IF EXISTS workout_plans_deleted ON workout_plans;
+
+CREATE TRIGGER workout_plans_inserted
+AFTER INSERT ON workout_plans
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION workout_plans_changed();
+
+CREATE TRIGGER workout_plans_updated
+AFTER UPDATE ON workout_plans
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION workout_plans_changed();
+
+CREATE TRIGGER workout_plans_deleted
+AFTER DELETE ON workout_plans
+REFERENCING OLD TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION workout_plans_changed();
+
+
+DROP TRIGGER IF EXISTS workout_plan_exercises_inserted ON workout_plan_exercises;
+DROP TRIGGER IF EXISTS workout_plan_exercises_updated ON workout_plan_exercises;
+DROP TRIGGER IF EXISTS workout_plan_exercises_deleted ON workout_plan_exercises;
+
+CREATE TRIGGER workout_plan_exercises_inserted
+AFTER INSERT ON workout_plan_exercises
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION workout_plan_exercises_changed();
+
+CREATE TRIGGER workout_plan_exercises_updated
+AFTER UPDATE ON workout_plan_exercises
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION workout_plan_exercises_changed();
+
+CREATE TRIGGER workout_plan_exercises_deleted
+AFTER DELETE ON workout_plan_exercises
+REFERENCING OLD TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION workout_plan_exercises_changed();
+
+
+DROP TRIGGER IF EXISTS scheduled_workouts_inserted ON scheduled_workouts;
+DROP TRIGGER IF EXISTS scheduled_workouts_updated ON scheduled_workouts;
+DROP TRIGGER IF EXISTS scheduled_workouts_deleted ON scheduled_workouts;
+
+CREATE TRIGGER scheduled_workouts_inserted
+AFTER INSERT ON scheduled_workouts
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION scheduled_workouts_changed();
+
+CREATE TRIGGER scheduled_workouts_updated
+AFTER UPDATE ON scheduled_workouts
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION scheduled_workouts_changed();
+
+CREATE TRIGGER scheduled_workouts_deleted
+AFTER DELETE ON scheduled_workouts
+REFERENCING OLD TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION scheduled_workouts_changed();
+
+
+-- Existing users start at version 0
+INSERT INTO user_data_versions (user_id, next_pending_at)
+SELECT u.user_id, (
+    SELECT s.scheduled_date + s.scheduled_time
+    FROM scheduled_workouts s
+    WHERE s.user_id = u.user_id AND s.status = 'pending'
+    ORDER BY s.scheduled_date, s.scheduled_time
+    LIMIT 1
+)
+FROM users u
+ON CONFLICT (user_id) DO NOTHING;
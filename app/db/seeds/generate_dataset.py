@@ -0,0 +1,369 @@
+"""Generates a large synthetic dataset (users, workout plans, scheduled workouts and workout logs)
+and loads it with COPY, several chunks of users in parallel.
+
+Activity is skewed: each user gets a log-normally distributed share of the schedules and logs,
+so a few heavy users own a large part of them, as in real data. The rows only depend on the
+arguments (`--seed` and `--end-date` included), not on the number of workers, so datasets loaded
+into the same database need different seeds. Every user's password is SYNTHETIC_PASSWORD. Run from the repository root, after the exercises are seeded:
+
+    python -m app.db.seeds.generate_dataset --users 100000 --schedules 500000 --logs 10000000
+"""
+import argparse
+import datetime
+import io
+import multiprocessing
+import time
+import uuid
+
+import bcrypt
+import numpy as np
+
+from app.db import connection
+
+SYNTHETIC_PASSWORD = "1%0TmlkiA220"
+
+EMAIL_DOMAIN = "synthetic.example.com"
+
+# Fixed so the password hash, like the rest of the dataset, is the same on every run
+SYNTHETIC_PASSWORD_SALT = b"$2b$12$SyntheticDatasetSaltOe"
+
+NOTES = ("Felt strong", "Tough session", "Easy recovery day", "New personal best", "")
+
+TABLE_COLUMNS = {
+    "users": "user_id, email, password, first_name, last_name, created_date",
+    "workout_plans": "plan_id, user_id, name, description, created_at, updated_at",
+    "workout_plan_exercises": "plan_exercise_id, plan_id, exercise_id, sets, reps, weight, position",
+    "scheduled_workouts": "scheduled_workout_id, plan_id, user_id, scheduled_date, scheduled_time, "
+    "status, created_at",
+    "workout_logs": "log_id, user_id, scheduled_workout_id, completed_at, total_time, notes",
+}
+
+# With --defer-checks, workout_logs is loaded without its foreign keys, whose row-by-row checks
+# otherwise cost more than the COPY itself; they are then validated in one pass each
+DEFER_CHECKS = """
+    ALTER TABLE workout_logs
+    DROP CONSTRAINT workout_logs_user_id_fkey,
+    DROP CONSTRAINT workout_logs_scheduled_workout_id_fkey
+"""
+
+RESTORE_CHECKS = """
+    ALTER TABLE workout_logs
+    ADD CONSTRAINT workout_logs_user_id_fkey
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    ADD CONSTRAINT workout_logs_scheduled_workout_id_fkey
+    FOREIGN KEY (scheduled_workout_id) REFERENCES scheduled_workouts(scheduled_workout_id)
+    ON DELETE SET NULL
+"""
+
+
+def user_shares(n_users: int, skew: float, seed: int) -> np.ndarray:
+    """Each user's share of the activity; `skew` is the sigma of the log-normal distribution."""
+    rng = np.random.default_rng([seed, 0])
+    weights = rng.lognormal(mean=0.0, sigma=skew, size=n_users)
+    return weights / weights.sum()
+
+
+def allocate(total: int, shares: np.ndarray, seed: int, stream: int) -> np.ndarray:
+    """Splits `total` rows between the users according to their shares."""
+    rng = np.random.default_rng([seed, stream])
+    return rng.multinomial(total, shares)
+
+
+def synthetic_email(user_number: int, seed: int) -> str:
+    return f"user{user_number}.seed{seed}@{EMAIL_DOMAIN}"
+
+
+def uuids(rng: np.random.Generator, n: int) -> list[str]:
+    raw = rng.bytes(16 * n)
+    return [str(uuid.UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, 16 * n, 16)]
+
+
+def timestamps(base: datetime.datetime, seconds: np.ndarray) -> list[str]:
+    moments = np.datetime64(base, "s") + seconds.astype("timedelta64[s]")
+    return np.datetime_as_string(moments).tolist()
+
+
+def copy_rows(cursor, table: str, rows) -> int:
+    """COPYs tab-separated rows (with \\N for NULL) into `table`."""
+    buffer = io.StringIO()
+    count = 0
+    for row in rows:
+        buffer.write("\t".join(row))
+        buffer.write("\n")
+        count += 1
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({TABLE_COLUMNS[table]}) FROM STDIN", buffer)
+    return count
+
+
+def generate_chunk(task: dict) -> dict:
+    """Generates and loads the rows of one chunk of users, in a single transaction."""
+    seed, chunk = task["seed"], task["chunk"]
+    first_user = task["first_user"]
+    plans_per_user = np.asarray(task["plans"])
+    schedules_per_user = np.asarray(task["schedules"])
+    logs_per_user = np.asarray(task["logs"])
+    exercise_ids = np.asarray(task["exercise_ids"])
+    end = datetime.datetime.combine(task["end_date"], datetime.time())
+    start = end - datetime.timedelta(days=task["days"])
+    span = task["days"] * 86400
+    n_users = len(plans_per_user)
+
+    rng = np.random.default_rng([seed, 1000 + chunk])
+
+    # Users, created over the first half of the range
+    user_ids = uuids(rng, n_users)
+    user_created = timestamps(start, rng.integers(0, span // 2, n_users))
+    users = (
+        (
+            user_id,
+            synthetic_email(first_user + i, seed),
+            task["password_hash"],
+            "Synthetic",
+            f"User{first_user + i}",
+            user_created[i],
+        )
+        for i, user_id in enumerate(user_ids)
+    )
+
+    # Plans, each with 2 to 8 exercises
+    plan_users = np.repeat(np.arange(n_users), plans_per_user)
+    n_plans = len(plan_users)
+    plan_ids = uuids(rng, n_plans)
+    plan_created = timestamps(start, rng.integers(span // 2, span, n_plans))
+    plans = (
+        (plan_id, user_ids[plan_users[i]], f"Plan {i}", "Synthetic plan", plan_created[i], plan_created[i])
+        for i, plan_id in enumerate(plan_ids)
+    )
+
+    exercises_per_plan = rng.integers(2, 9, n_plans)
+    exercise_plans = np.repeat(np.arange(n_plans), exercises_per_plan)
+    n_plan_exercises = len(exercise_plans)
+    positions = np.arange(n_plan_exercises) - np.repeat(
+        np.cumsum(exercises_per_plan) - exercises_per_plan, exercises_per_plan
+    )
+    plan_exercise_ids = uuids(rng, n_plan_exercises)
+    plan_exercise_columns = zip(
+        plan_exercise_ids,
+        exercise_plans.tolist(),
+        rng.choice(exercise_ids, n_plan_exercises).tolist(),
+        rng.integers(1, 6, n_plan_exercises).tolist(),
+        rng.integers(5, 16, n_plan_exercises).tolist(),
+        rng.choice([-1, 10, 20, 40, 60, 80], n_plan_exercises).tolist(),
+        positions.tolist(),
+    )
+    plan_exercises = (
+        (
+            plan_exercise_id, plan_ids[plan], str(exercise_id), str(sets), str(reps),
+            r"\N" if weight < 0 else str(weight), str(position),
+        )
+        for plan_exercise_id, plan, exercise_id, sets, reps, weight, position in plan_exercise_columns
+    )
+
+    # Scheduled workouts: past ones mostly completed, the rest missed; the last month pending
+    plan_offsets = np.cumsum(plans_per_user) - plans_per_user
+    schedule_users = np.repeat(np.arange(n_users), schedules_per_user)
+    n_schedules = len(schedule_users)
+    schedule_ids = uuids(rng, n_schedules)
+    schedule_plans = plan_offsets[schedule_users] + (
+        rng.random(n_schedules) * plans_per_user[schedule_users]
+    ).astype(np.int64)
+    schedule_days = rng.integers(0, task["days"] + 30, n_schedules)
+    scheduled_dates = np.datetime_as_string(
+        np.datetime64(start.date(), "D") + schedule_days.astype("timedelta64[D]")
+    ).tolist()
+    schedule_statuses = np.where(
+        schedule_days >= task["days"],
+        "pending",
+        np.where(rng.random(n_schedules) < 0.75, "completed", "missed"),
+    ).tolist()
+    schedule_created = timestamps(start, schedule_days * 86400 - rng.integers(86400, 30 * 86400, n_schedules))
+    schedule_columns = zip(
+        schedule_ids,
+        schedule_plans.tolist(),
+        schedule_users.tolist(),
+        scheduled_dates,
+        rng.integers(6 * 4, 21 * 4, n_schedules).tolist(),
+        schedule_statuses,
+        schedule_created,
+    )
+    schedules = (
+        (
+            schedule_id, plan_ids[plan], user_ids[user], scheduled_date,
+            f"{quarter // 4:02d}:{quarter % 4 * 15:02d}:00", schedule_status, created,
+        )
+        for schedule_id, plan, user, scheduled_date, quarter, schedule_status, created in schedule_columns
+    )
+
+    # Workout logs, each for one of its user's scheduled workouts (a tenth for none)
+    schedule_offsets = np.cumsum(schedules_per_user) - schedules_per_user
+    log_users = np.repeat(np.arange(n_users), logs_per_user)
+    n_logs = len(log_users)
+    log_ids = uuids(rng, n_logs)
+    log_schedules = schedule_offsets[log_users] + (
+        rng.random(n_logs) * schedules_per_user[log_users]
+    ).astype(np.int64)
+    log_schedules = np.where(
+        (schedules_per_user[log_users] == 0) | (rng.random(n_logs) < 0.1), -1, log_schedules
+    )
+    log_columns = zip(
+        log_ids,
+        log_users.tolist(),
+        log_schedules.tolist(),
+        timestamps(start, rng.integers(0, span, n_logs)),
+        np.clip(rng.normal(50, 20, n_logs), 5, 180).astype(np.int64).tolist(),
+        rng.integers(0, len(NOTES), n_logs).tolist(),
+    )
+    logs = (
+        (
+            log_id, user_ids[user], r"\N" if schedule < 0 else schedule_ids[schedule],
+            completed_at, str(total_time), NOTES[note],
+        )
+        for log_id, user, schedule, completed_at, total_time, note in log_columns
+    )
+
+    conn = connection.connect()
+    try:
+        with conn.cursor() as cursor:
+            counts = {
+                "users": copy_rows(cursor, "users", users),
+                "workout_plans": copy_rows(cursor, "workout_plans", plans),
+                "workout_plan_exercises": copy_rows(cursor, "workout_plan_exercises", plan_exercises),
+                "scheduled_workouts": copy_rows(cursor, "scheduled_workouts", schedules),
+                "workout_logs": copy_rows(cursor, "workout_logs", logs),
+            }
+        conn.commit()
+    finally:
+        conn.close()
+    return counts
+
+
+def generate_dataset(
+    n_users: int,
+    n_schedules: int,
+    n_logs: int,
+    plans_per_user: float = 3.0,
+    days: int = 730,
+    end_date: datetime.date | None = None,
+    skew: float = 1.5,
+    seed: int = 1,
+    workers: int = 4,
+    chunk_size: int = 1000,
+    defer_checks: bool = False,
+) -> dict:
+    """Generates the dataset and returns how many rows went into each table.
+
+    `defer_checks` loads workout_logs faster (see DEFER_CHECKS) but takes the table's foreign
+    keys away while it runs, so it is only meant for a database nothing else is writing to.
+    """
+    end_date = end_date or datetime.date.today()
+
+    with connection.get_db() as (conn, cursor):
+        cursor.execute("SELECT exercise_id FROM exercises ORDER BY exercise_id")
+        exercise_ids = [row["exercise_id"] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM users WHERE email = %s)", (synthetic_email(0, seed),)
+        )
+        already_generated = cursor.fetchone()["exists"]
+    if not exercise_ids:
+        raise SystemExit("No exercises found; seed them first (app.db.seeds.seed_exercises)")
+    if already_generated:
+        # The same seed would generate the same ids again
+        raise SystemExit(f"A dataset with seed {seed} is already loaded; pass another --seed")
+
+    shares = user_shares(n_users, skew, seed)
+    # Every user has at least one plan; heavier users have more, up to 30
+    plans = np.clip(1 + allocate(int(n_users * (plans_per_user - 1)), shares, seed, 1), 1, 30)
+    schedules = allocate(n_schedules, shares, seed, 2)
+    logs = allocate(n_logs, shares, seed, 3)
+    password_hash = bcrypt.hashpw(SYNTHETIC_PASSWORD.encode(), SYNTHETIC_PASSWORD_SALT).decode()
+
+    tasks = [
+        {
+            "seed": seed,
+            "chunk": chunk,
+            "first_user": first_user,
+            "plans": plans[first_user:first_user + chunk_size].tolist(),
+            "schedules": schedules[first_user:first_user + chunk_size].tolist(),
+            "logs": logs[first_user:first_user + chunk_size].tolist(),
+            "exercise_ids": exercise_ids,
+            "end_date": end_date,
+            "days": days,
+            "password_hash": password_hash,
+        }
+        for chunk, first_user in enumerate(range(0, n_users, chunk_size))
+    ]
+
+    if defer_checks:
+        with connection.get_db() as (conn, cursor):
+            cursor.execute(DEFER_CHECKS)
+            conn.commit()
+
+    totals = dict.fromkeys(TABLE_COLUMNS, 0)
+    started = time.perf_counter()
+    try:
+        # Spawned rather than forked, so no worker inherits the parent's pooled connections
+        with multiprocessing.get_context("spawn").Pool(workers) as worker_pool:
+            chunks = worker_pool.imap_unordered(generate_chunk, tasks)
+            for done, counts in enumerate(chunks, start=1):
+                for table, count in counts.items():
+                    totals[table] += count
+                rows = sum(totals.values())
+                elapsed = time.perf_counter() - started
+                print(
+                    f"Loaded chunk {done}/{len(tasks)}: {rows} rows in {elapsed:.1f}s "
+                    f"({rows / elapsed:,.0f} rows/s)"
+                )
+    finally:
+        if defer_checks:
+            print("Validating foreign keys of workout_logs")
+            with connection.get_db() as (conn, cursor):
+                cursor.execute(RESTORE_CHECKS)
+                conn.commit()
+
+    # Fresh statistics, so the planner knows how big the tables have become
+    with connection.get_db() as (conn, cursor):
+        cursor.execute(f"ANALYZE {', '.join(TABLE_COLUMNS)}")
+        conn.commit()
+
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--schedules", type=int, default=200_000, help="scheduled workouts in total")
+    parser.add_argument("--logs", type=int, default=1_000_000, help="workout logs in total")
+    parser.add_argument("--plans-per-user", type=float, default=3.0, help="average plans per user")
+    parser.add_argument("--days", type=int, default=730, help="days of history, ending at --end-date")
+    parser.add_argument("--end-date", type=datetime.date.fromisoformat, default=None)
+    parser.add_argument(
+        "--skew", type=float, default=1.5, help="spread of activity between users (log-normal sigma)"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=4, help="chunks loaded in parallel")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="users per chunk")
+    parser.add_argument(
+        "--defer-checks",
+        action="store_true",
+        help="drop workout_logs' foreign keys while loading (idle databases only)",
+    )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    totals = generate_dataset(
+        n_users=args.users,
+        n_schedules=args.schedules,
+        n_logs=args.logs,
+        plans_per_user=args.plans_per_user,
+        days=args.days,
+        end_date=args.end_date,
+        skew=args.skew,
+        seed=args.seed,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        defer_checks=args.defer_checks,
+    )
+    for table, count in totals.items():
+        print(f"{table}: {count} rows")
+    print(f"Done in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,76 @@
+from psycopg import sql
+
+from app.core.config import settings
+
+# Every Statement, by name
+registry = {}
+
+
+class Statement:
+    """A hot query, run as a server-side prepared statement.
+
+    Postgres parses and plans a prepared statement once per connection; later executions only
+    send the parameters. psycopg keeps the prepared statements of each pooled connection, so a
+    statement is prepared lazily the first time a connection runs it, and again on whichever
+    connection replaces it after a reconnect. They outlast each request because
+    connection.get_async_db commits a request's reads rather than rolling them back (psycopg
+    drops them on rollback). With DATABASE_PREPARED_STATEMENTS off (e.g. behind a pooler in
+    transaction mode, which can't keep them) it is sent as plain SQL every time.
+    """
+
+    def __init__(self, name: str, query):
+        if name in registry:
+            raise ValueError(f"A statement named {name!r} is already registered")
+        self.name = name
+        self.query = query
+        registry[name] = self
+
+    async def execute(self, cursor, params=None):
+        return await cursor.execute(
+            self.query,
+            params,
+            prepare=settings.DATABASE_PREPARED_STATEMENTS,
+            query_name=f"{__name__}.{self.name}",
+        )
+
+    def __repr__(self):
+        return f"Statement({self.name!r})"
+
+
+USER_BY_EMAIL = Statement(
+    "user_by_email",
+    sql.SQL(
+        """
+        SELECT * FROM users WHERE email = %s
+        """
+    ),
+)
+
+PLAN_VERSION = Statement(
+    "plan_version",
+    sql.SQL("SELECT updated_at FROM workout_plans WHERE plan_id = %s AND user_id = %s"),
+)
+
+USER_DATA_VERSION = Statement(
+    "user_data_version",
+    sql.SQL(
+        """
+        SELECT plans_version, schedules_version, next_pending_at < LOCALTIMESTAMP AS overdue
+        FROM user_data_versions
+        WHERE user_id = %s
+        """
+    ),
+)
+
+REFRESH_TOKEN = Statement(
+    "refresh_token",
+    sql.SQL(
+        """
+        SELECT token_id, family_id, user_id, token_hash, expires_at < CURRENT_TIMESTAMP AS expired,
+        used_at, revoked_at
+        FROM refresh_tokens
+        WHERE token_id = %s
+        FOR UPDATE;
+        """
+    ),
+)
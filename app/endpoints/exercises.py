@@ -1,10 +1,9 @@
 import logging
-from fastapi import HTTPException, status, APIRouter, Depends, Path
+from fastapi import HTTPException, status, APIRouter, Path, Request, Response
 from app.schemas import exercises_schemas
-from app.db import connection
-from app.core import docs
+from app.core import docs, conditional
+from app.core.catalog import exercise_catalog
 from app.db.seeds.seed_exercises import num_exercises
-from psycopg2 import sql
 
 # Create an APIRouter and setup logging
 router = APIRouter(tags=["Exercises"])
@@ -18,20 +17,15 @@ logger = logging.getLogger(__name__)
     response_model=list[exercises_schemas.ExerciseModel],
     description=docs.get_exercises,
 )
-async def get_exercises(database_access: list = Depends(connection.get_db)):
-    with database_access as (conn, cursor):
-        try:
-            # Fetches all exercises and return them
-            insert_query = sql.SQL(""" SELECT * FROM exercises """)
-            cursor.execute(insert_query)
-            exercises = cursor.fetchall()
-            return exercises
-        except Exception as error:
-            # Log error and raise HTTP exception if something goes wrong
-            logger.exception(str(error))
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
-            )
+async def get_exercises(request: Request, response: Response):
+    # The catalog's version changes whenever any exercise does
+    etag = conditional.make_etag("exercises", exercise_catalog.version)
+    not_modified = conditional.conditional_response(request, response, etag)
+    if not_modified:
+        return not_modified
+
+    # Served from the in-memory exercise catalog, no database round trip needed
+    return exercise_catalog.all()
 
 
 @router.get(
@@ -42,31 +36,27 @@ async def get_exercises(database_access: list = Depends(connection.get_db)):
     description=docs.get_exercise_by_id
 )
 async def get_exercise(
+    request: Request,
+    response: Response,
     exercise_id: int = Path(
         ..., description="The ID of the exercise to retrieve", ge=1, le=num_exercises
     ),
-    database_access: list = Depends(connection.get_db),
 ):
-    with database_access as (conn, cursor):
-        try:
-            # Fetches and retrieves a specific exercise using the id
-            select_query = sql.SQL("""SELECT * FROM exercises WHERE exercise_id = %s""")
-            cursor.execute(select_query, (exercise_id,))
-            exercise = cursor.fetchone()
-        except Exception as error:
-            # Log error and raise HTTP exception if something goes wrong
-            logger.error(f"Error retrieving exercise: {error}", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
-            )
-        else:
-            if exercise:
-                # Return the exercise details if found
-                logger.info(f"Exercise retrieved: {exercise}")
-                return exercise
-            else:
-                # Raise HTTP 404 if exercise not found
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="No Exercise with that ID",
-                )
+    # Fetches a specific exercise from the exercise catalog using the id
+    exercise = exercise_catalog.get(exercise_id)
+
+    if exercise:
+        etag = conditional.make_etag("exercise", exercise_id, exercise_catalog.version)
+        not_modified = conditional.conditional_response(request, response, etag)
+        if not_modified:
+            return not_modified
+
+        # Return the exercise details if found
+        logger.debug(f"Exercise {exercise_id} retrieved")
+        return exercise
+    else:
+        # Raise HTTP 404 if exercise not found
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No Exercise with that ID",
+        )
@@ -2,10 +2,9 @@ import logging
 from fastapi import APIRouter, status, HTTPException, Depends
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 from app.schemas import users_schemas
-from app.db import connection
+from app.db import connection, statements
 from app.core import utils, docs
 from app.core import security
-from psycopg2 import sql
 
 # Create an APIRouter and setup logging
 router = APIRouter(tags=["Login"])
@@ -23,22 +22,16 @@ cred_error = "Invalid Credentials"
 )
 async def login(
     user_credentials: OAuth2PasswordRequestForm = Depends(),  # Get user credentials from request form
-    database_access: list = Depends(connection.get_db),  # Get database connection
+    database_access: list = Depends(connection.get_async_db),  # Get database connection
 ):
     user_email = str(user_credentials.username)  # Extract email from credentials
 
-    query = sql.SQL(
-        """
-            SELECT * FROM users WHERE email = %s
-        """
-    )
-
-    with database_access as (conn, cursor):
+    async with database_access as (conn, cursor):
 
         try:
             # Fetch user data from the database
-            cursor.execute(query, (user_email,))
-            user = cursor.fetchone()
+            await statements.USER_BY_EMAIL.execute(cursor, (user_email,))
+            user = await cursor.fetchone()
         except Exception as error:
             # Log and raise exception if error occurs during query execution
             logger.error(f"There was an error logging in: {error}")
@@ -52,7 +45,9 @@ async def login(
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail=cred_error
             )
-        # Verify Login password
+        # Verify Login password; the lookup's transaction is ended first so the connection
+        # doesn't sit idle in a transaction while the hash is checked
+        await conn.commit()
         if not await utils.verify_login_details(
             user_credentials.password, user["password"]
         ):
@@ -62,15 +57,104 @@ async def login(
                 status_code=status.HTTP_404_NOT_FOUND, detail=cred_error
             )
 
-        # Create JWT token for the user
-        access_token = await security.create_access_token(
-            data={"user_id": user["user_id"]}
+        # Issue a refresh token so the client can renew the access token without logging in again
+        try:
+            # Clear out the user's expired refresh tokens while we're here
+            await cursor.execute(
+                "DELETE FROM refresh_tokens WHERE user_id = %s AND expires_at < CURRENT_TIMESTAMP",
+                (user["user_id"],),
+            )
+            refresh_token = await security.create_refresh_token(user["user_id"], cursor)
+        except Exception as error:
+            logger.error(f"There was an error issuing a refresh token: {error}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+            )
+        await conn.commit()
+
+    # Create JWT token for the user
+    access_token = await security.create_access_token(
+        data={"user_id": user["user_id"]}
+    )
+
+    logger.info(f'User {user["user_id"]} logged in')
+
+    # Return token information
+    token = users_schemas.Token(
+        access_token=access_token, token_type="bearer", refresh_token=refresh_token
+    )
+    return token
+
+
+@router.post(
+    "/token/refresh",
+    summary="Exchange a refresh token for a new access token",
+    status_code=status.HTTP_200_OK,
+    response_model=users_schemas.Token,
+    description=docs.refresh_token,
+)
+async def refresh_access_token(
+    token_request: users_schemas.RefreshTokenRequest,
+    database_access: list = Depends(connection.get_async_db),
+):
+    invalid_token = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token"
+    )
+
+    async with database_access as (conn, cursor):
+        token_row = await security.find_refresh_token(token_request.refresh_token, cursor)
+
+        if not token_row or token_row["revoked_at"] or token_row["expired"]:
+            raise invalid_token
+
+        if token_row["used_at"]:
+            # This token was already exchanged, so someone else has a copy of it. Revoke every
+            # token descended from the same login, so whoever holds the newest one is logged out too
+            await security.revoke_refresh_token_family(token_row["family_id"], cursor)
+            await conn.commit()
+            logger.warning(
+                f'Refresh token reuse detected for user {token_row["user_id"]}, '
+                f'revoked token family {token_row["family_id"]}'
+            )
+            raise invalid_token
+
+        # Rotate: the presented token is spent and a new one from the same family replaces it
+        await cursor.execute(
+            "UPDATE refresh_tokens SET used_at = CURRENT_TIMESTAMP WHERE token_id = %s",
+            (token_row["token_id"],),
         )
-        logger.info(f'User {user["user_id"]} logged in')
+        refresh_token = await security.create_refresh_token(
+            token_row["user_id"], cursor, family_id=token_row["family_id"]
+        )
+        await conn.commit()
+
+    access_token = await security.create_access_token(
+        data={"user_id": token_row["user_id"]}
+    )
+    return users_schemas.Token(
+        access_token=access_token, token_type="bearer", refresh_token=refresh_token
+    )
+
+
+@router.post(
+    "/token/revoke",
+    summary="Revoke a refresh token (log out)",
+    status_code=status.HTTP_200_OK,
+    description=docs.revoke_token,
+)
+async def revoke_refresh_token(
+    token_request: users_schemas.RefreshTokenRequest,
+    database_access: list = Depends(connection.get_async_db),
+):
+    async with database_access as (conn, cursor):
+        token_row = await security.find_refresh_token(token_request.refresh_token, cursor)
+
+        # Unknown tokens get the same answer, so this can't be used to probe for valid ones
+        if token_row:
+            await security.revoke_refresh_token_family(token_row["family_id"], cursor)
+            await conn.commit()
 
-        # Return token information
-        token = users_schemas.Token(access_token=access_token, token_type="bearer")
-        return token
+    return {"message": "Refresh token revoked."}
 
 
 @router.get(
@@ -0,0 +1,55 @@
+import os
+from fastapi import APIRouter, Response, status
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest, multiprocess
+from app.db import connection
+from app.core import docs
+from app.core.hashing import password_hasher
+from app.core.token_cache import token_cache
+
+router = APIRouter(tags=["Monitoring"])
+
+
+@router.get(
+    "/monitoring/db-pool",
+    status_code=status.HTTP_200_OK,
+    summary="Database connection pool statistics",
+    description=docs.db_pool_stats,
+)
+async def get_db_pool_stats():
+    return {"async": connection.async_pool.get_stats()}
+
+
+@router.get(
+    "/monitoring/password-hashing",
+    status_code=status.HTTP_200_OK,
+    summary="Password hashing worker pool statistics",
+    description=docs.password_hashing_stats,
+)
+async def get_password_hashing_stats():
+    return password_hasher.get_stats()
+
+
+@router.get(
+    "/monitoring/token-cache",
+    status_code=status.HTTP_200_OK,
+    summary="Verified access token cache statistics",
+    description=docs.token_cache_stats,
+)
+async def get_token_cache_stats():
+    return token_cache.get_stats()
+
+
+@router.get(
+    "/metrics",
+    status_code=status.HTTP_200_OK,
+    summary="Prometheus metrics",
+    description=docs.prometheus_metrics,
+    response_class=Response,
+)
+async def get_metrics():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # Several workers (see app/serve.py): add up the metrics every one of them wrote out
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,8 +1,9 @@
+import datetime
 import logging
 from fastapi import HTTPException, status, APIRouter, Depends
-from app.schemas import users_schemas
+from app.schemas import users_schemas, reports_schemas
 from app.db import connection
-from app.core import security
+from app.core import security, docs, analytics
 
 logger = logging.getLogger(__name__)
 
@@ -15,22 +16,25 @@ router = APIRouter(tags=["Reports"])
     summary="Generate reports on past workouts and progress",
 )
 async def generate_progress_report(
-    database_access: list = Depends(connection.get_db),
+    database_access: list = Depends(connection.get_async_db),
     current_user: users_schemas.TokenData = Depends(security.get_current_user),
 ):
 
     user_id = current_user.user_id
-    with database_access as (conn, cursor):
+    async with database_access as (conn, cursor):
         try:
-            cursor.execute(
+            # The totals are kept up to date by triggers on workout_logs (see
+            # migrations/005_progress_rollups.sql), so this is a single-row lookup
+            await cursor.execute(
                 """
-                SELECT COUNT(*) AS total_workouts, SUM(total_time) AS total_time_spent 
-                FROM workout_logs
+                SELECT COALESCE(MAX(total_workouts), 0) AS total_workouts,
+                MAX(total_time_spent) FILTER (WHERE timed_workouts > 0) AS total_time_spent
+                FROM user_progress
                 WHERE user_id = %s
             """,
                 (user_id,),
             )
-            workout_logs = cursor.fetchall()
+            workout_logs = await cursor.fetchall()
         except Exception as error:
             logger.error(f"Error generating report: {error}", exc_info=True)
             raise HTTPException(
@@ -38,3 +42,75 @@ async def generate_progress_report(
             )
 
         return workout_logs
+
+
+@router.get(
+    "/reports/progress/series",
+    status_code=status.HTTP_200_OK,
+    summary="Weekly or monthly progress over a date range",
+    response_model=reports_schemas.ProgressSeriesOut,
+    description=docs.progress_series,
+)
+async def generate_progress_series(
+    database_access: list = Depends(connection.get_async_db),
+    current_user: users_schemas.TokenData = Depends(security.get_current_user),
+    period: reports_schemas.PeriodChoice = reports_schemas.PeriodChoice.week,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+):
+
+    user_id = current_user.user_id
+    end = end or datetime.date.today()
+    start = start or end - datetime.timedelta(days=365)
+
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be on or before end",
+        )
+
+    # Fetch the logs in the range and the exercises of their plans in one go, as parallel
+    # arrays (one element per log or plan exercise) ready to load into NumPy
+    series_query = """
+        WITH logs AS (
+            SELECT l.completed_at::DATE - %(start)s::DATE AS day,
+            COALESCE(l.total_time, 0) AS total_time, s.plan_id
+            FROM workout_logs l
+            LEFT JOIN scheduled_workouts s ON s.scheduled_workout_id = l.scheduled_workout_id
+            WHERE l.user_id = %(user_id)s
+            AND l.completed_at >= %(start)s::DATE AND l.completed_at < %(end)s::DATE + 1
+        ),
+        plans AS (
+            SELECT plan_id, (ROW_NUMBER() OVER (ORDER BY plan_id) - 1)::INT AS plan_index
+            FROM (SELECT DISTINCT plan_id FROM logs WHERE plan_id IS NOT NULL) logged_plans
+        )
+        SELECT log_columns.*, exercise_columns.*
+        FROM (
+            SELECT COALESCE(array_agg(l.day), '{}') AS log_days,
+            COALESCE(array_agg(l.total_time), '{}') AS log_times,
+            COALESCE(array_agg(COALESCE(p.plan_index, -1)), '{}') AS log_plans
+            FROM logs l
+            LEFT JOIN plans p ON p.plan_id = l.plan_id
+        ) log_columns,
+        (
+            SELECT COALESCE(array_agg(p.plan_index), '{}') AS exercise_plans,
+            COALESCE(array_agg((wpe.sets * wpe.reps * COALESCE(wpe.weight, 0))::FLOAT8), '{}')
+            AS exercise_volumes
+            FROM plans p
+            JOIN workout_plan_exercises wpe ON wpe.plan_id = p.plan_id
+        ) exercise_columns;
+    """
+
+    async with database_access as (conn, cursor):
+        try:
+            await cursor.execute(
+                series_query, {"user_id": user_id, "start": start, "end": end}
+            )
+            columns = await cursor.fetchone()
+        except Exception as error:
+            logger.error(f"Error generating progress series: {error}", exc_info=True)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+            )
+
+    return analytics.progress_series(start, end, period.value, **columns)
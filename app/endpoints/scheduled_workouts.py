@@ -1,12 +1,12 @@
 import logging
 from typing import Annotated
 
-from fastapi import HTTPException, status, APIRouter, Depends, Request, Query, Body
-from app.core.utils import fetch_plan_with_exercises
+from fastapi import HTTPException, status, APIRouter, Depends, Request, Query, Body, Response
 from app.schemas import users_schemas, scheduled_workouts_schemas
 from app.db import connection
-from app.core import security, utils, examples, docs
-from psycopg2 import sql
+from app.core import security, utils, examples, docs, pagination, responses, conditional
+from app.core.catalog import exercise_catalog
+from psycopg import sql
 
 # Setup router and logging
 router = APIRouter(tags=["Scheduled Workout Management"])
@@ -23,50 +23,34 @@ logger = logging.getLogger(__name__)
 async def create_workout_schedule(
     scheduled_workout: Annotated[scheduled_workouts_schemas.ScheduledWorkoutCreate,Body
         (openapi_examples=examples.workout_schedule_examples)],
-    database_access: list = Depends(connection.get_db),
+    database_access: list = Depends(connection.get_async_db),
     current_user: users_schemas.TokenData = Depends(security.get_current_user),
 ):
     user_id = current_user.user_id
 
-    # SQL query to verify if the workout plan exists for the user
-    plan_id_check_query = sql.SQL(
-        """
-        SELECT plan_id
-        FROM workout_plans
-        WHERE user_id = %s AND plan_id = %s
-        """
-    )
-
     # SQL query to insert the scheduled workout into the database
     insert_schedule_query = sql.SQL(
-        """
+        f"""
         INSERT INTO scheduled_workouts (plan_id, user_id, scheduled_date, scheduled_time, status)
         VALUES (%s, %s, %s, %s, %s)
-        RETURNING *;
+        RETURNING {utils.scheduled_workout_columns};
         """
     )
 
-    with database_access as (conn, cursor):
-        try:
-            # Check if the workout plan exists and belongs to the user
-            cursor.execute(plan_id_check_query, (user_id, scheduled_workout.plan_id))
-            plan_id_verification = cursor.fetchone()
-        except Exception as error:
-            logger.error(
-                f"Error occurred while checking plan_id: {str(error)}", exc_info=True
-            )
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
-            )
+    async with database_access as (conn, cursor):
+        plan_loader = utils.PlanLoader(user_id, cursor)
 
-        if not plan_id_verification:
+        # Load the workout plan, which also checks that it exists and belongs to the user
+        plan_details = await plan_loader.load(scheduled_workout.plan_id)
+
+        if not plan_details:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Workout Plan Not Found"
             )
 
         try:
             # Insert the scheduled workout into the database
-            cursor.execute(
+            await cursor.execute(
                 insert_schedule_query,
                 (
                     scheduled_workout.plan_id,
@@ -76,7 +60,7 @@ async def create_workout_schedule(
                     scheduled_workout.status,
                 ),
             )
-            workout_schedule_out = cursor.fetchone()
+            workout_schedule_out = await cursor.fetchone()
         except Exception as error:
             logger.error(
                 f"Error occurred while scheduling the workout: {str(error)}",
@@ -86,15 +70,10 @@ async def create_workout_schedule(
                 status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
             )
 
-        # Fetch the details of the workout plan including the exercises
-        plan_details = await fetch_plan_with_exercises(
-            scheduled_workout.plan_id, user_id, cursor
-        )
-
         # Attach the plan details to the scheduled workout output
         workout_schedule_out.update({"plan_details": plan_details})
 
-        conn.commit()
+        await conn.commit()
 
         return workout_schedule_out
 
@@ -108,42 +87,78 @@ async def create_workout_schedule(
 )
 async def get_workout_schedules(
     workout_status: scheduled_workouts_schemas.StatusChoice,
-    database_access: list = Depends(connection.get_db),
+    request: Request,
+    response: Response,
+    database_access: list = Depends(connection.get_async_db),
     current_user: users_schemas.TokenData = Depends(security.get_current_user),
     limit: int = 10,
     skip: int = 0,
+    after: str | None = None,
 ):
 
     user_id = current_user.user_id
 
-    # Conditionally add the status filter if it's not set to 'all'
-    all_or_something = "AND status = %s" if workout_status != "all" else " "
+    # Conditionally add the status filter if it's not set to 'all'; overdue pending workouts
+    # count as missed even if the sweeper hasn't marked them yet
+    all_or_something = f"AND {utils.effective_status} = %s" if workout_status != "all" else " "
+
+    # Continue after the last scheduled workout of the previous page when a cursor was given.
+    # Dates ascend but times (and IDs) descend, so the comparison is split on the date; the
+    # redundant lower bound on the date lets the index scan start at the cursor
+    keyset_condition = (
+        """AND scheduled_date >= %s::date AND (scheduled_date > %s::date OR (scheduled_date = %s::date
+        AND (scheduled_time, scheduled_workout_id) < (%s::time, %s::uuid)))"""
+        if after
+        else " "
+    )
 
-    # SQL query to retrieve scheduled workouts with optional status filtering
+    # SQL query to retrieve scheduled workouts with optional status filtering,
+    # with one extra row to tell whether there is a next page
     workout_schedule_query = f"""
-        SELECT *
+        SELECT {utils.scheduled_workout_columns}
         FROM scheduled_workouts
-        WHERE user_id = %s {all_or_something}
-        ORDER BY scheduled_date, scheduled_time DESC
+        WHERE user_id = %s {all_or_something} {keyset_condition}
+        ORDER BY scheduled_date, scheduled_time DESC, scheduled_workout_id DESC
         LIMIT %s
         OFFSET %s;
     """
 
-    with database_access as (conn, cursor):
-        # Update missed workouts before retrieving the schedule
-        await utils.update_missed_workouts(user_id=user_id, conn=conn, cursor=cursor)
-
-        # Prepare parameters based on the status filter
-        params = (
-            (user_id, workout_status, limit, skip)
-            if workout_status != "all"
-            else (user_id, limit, skip)
-        )
+    async with database_access as (conn, cursor):
+        try:
+            # Any change to the user's schedules or to the plans they show, deletes included,
+            # bumps their version
+            version = await utils.user_data_version(user_id, cursor)
+        except Exception as error:
+            logger.error(
+                f"Error occurred while checking the workout schedules' version: {str(error)}",
+                exc_info=True,
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+            )
+        # A pending workout that has become overdue reads as missed before the sweeper marks
+        # it (and bumps the version), so until then the listing is always sent in full
+        if not version["overdue"]:
+            etag = conditional.make_etag(
+                "schedules", user_id, version["schedules_version"], exercise_catalog.version
+            )
+            not_modified = conditional.conditional_response(request, response, etag)
+            if not_modified:
+                return not_modified
+
+        # Prepare parameters based on the status filter and the cursor
+        params = [user_id]
+        if workout_status != "all":
+            params.append(workout_status)
+        if after:
+            scheduled_date, scheduled_time, scheduled_workout_id = pagination.decode_cursor(after, 3)
+            params.extend([scheduled_date] * 3 + [scheduled_time, scheduled_workout_id])
+        params.extend([limit + 1, skip])
 
         try:
             # Execute the query to get the scheduled workouts
-            cursor.execute(workout_schedule_query, params)
-            workout_schedule_out = cursor.fetchall()
+            await cursor.execute(workout_schedule_query, params)
+            workout_schedule_out = await cursor.fetchall()
         except Exception as error:
             logger.error(
                 f"Error occurred while trying to retrieve workout schedules: {str(error)}",
@@ -153,19 +168,33 @@ async def get_workout_schedules(
                 status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
             )
 
-        # Fetch and attach plan details for each scheduled workout
-        for x, schedule in enumerate(workout_schedule_out):
-            plan_details = await fetch_plan_with_exercises(
-                schedule["plan_id"], user_id, cursor
-            )
-            workout_schedule_out[x].update({"plan_details": plan_details})
+        workout_schedule_out = pagination.paginate(
+            workout_schedule_out,
+            limit,
+            lambda schedule: (
+                schedule["scheduled_date"].isoformat(),
+                schedule["scheduled_time"].isoformat(),
+                schedule["scheduled_workout_id"],
+            ),
+            response,
+        )
+
+        # Fetch the plans for the whole page at once, then attach them to each scheduled workout
+        plan_loader = utils.PlanLoader(user_id, cursor)
+        plans = await plan_loader.load_many(
+            schedule["plan_id"] for schedule in workout_schedule_out
+        )
+        for schedule in workout_schedule_out:
+            schedule.update({"plan_details": plans.get(schedule["plan_id"])})
 
         if not workout_schedule_out:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Schedule Not Found"
             )
 
-        return workout_schedule_out
+        return responses.validated_response(
+            scheduled_workouts_schemas.scheduled_workout_list_adapter, workout_schedule_out, response
+        )
 
 
 @router.get(
@@ -177,7 +206,9 @@ async def get_workout_schedules(
 )
 async def get_workout_schedule(
     scheduled_workout_id: str,
-    database_access: list = Depends(connection.get_db),
+    request: Request,
+    response: Response,
+    database_access: list = Depends(connection.get_async_db),
     current_user: users_schemas.TokenData = Depends(security.get_current_user),
 ):
 
@@ -185,20 +216,60 @@ async def get_workout_schedule(
 
     # SQL query to retrieve a specific scheduled workout by its ID
     workout_schedule_query = f"""
-        SELECT *
+        SELECT {utils.scheduled_workout_columns}
         FROM scheduled_workouts
         WHERE user_id = %s AND scheduled_workout_id = %s
         ORDER BY scheduled_date, scheduled_time
     """
 
-    with database_access as (conn, cursor):
-        # Update missed workouts before retrieving the specific schedule
-        await utils.update_missed_workouts(user_id, conn, cursor)
+    async with database_access as (conn, cursor):
+        try:
+            # The scheduled workout's and its plan's latest updates, and whether it is overdue
+            await cursor.execute(
+                f"""
+                SELECT s.updated_at, {utils.effective_status} AS status,
+                p.updated_at AS plan_updated_at
+                FROM scheduled_workouts s
+                LEFT JOIN workout_plans p ON p.plan_id = s.plan_id
+                WHERE s.user_id = %s AND s.scheduled_workout_id = %s
+                """,
+                (user_id, scheduled_workout_id),
+            )
+            version = await cursor.fetchone()
+        except Exception as error:
+            logger.error(
+                f"Error occurred while checking a workout schedule's version: {str(error)}",
+                exc_info=True,
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+            )
+
+        if version:
+            # A pending workout turns missed when its time passes, which moves no timestamp
+            last_modified = None
+            if version["status"] != "pending":
+                last_modified = max(
+                    filter(None, (version["updated_at"], version["plan_updated_at"]))
+                )
+            etag = conditional.make_etag(
+                "schedule",
+                scheduled_workout_id,
+                version["updated_at"],
+                version["status"],
+                version["plan_updated_at"],
+                exercise_catalog.version,
+            )
+            not_modified = conditional.conditional_response(
+                request, response, etag, last_modified
+            )
+            if not_modified:
+                return not_modified
 
         try:
             # Execute the query to get the specific scheduled workout
-            cursor.execute(workout_schedule_query, (user_id, scheduled_workout_id))
-            workout_schedule_out = cursor.fetchone()
+            await cursor.execute(workout_schedule_query, (user_id, scheduled_workout_id))
+            workout_schedule_out = await cursor.fetchone()
         except Exception as error:
             logger.error(
                 f"Error occurred while getting a specific workout schedule: {str(error)}",
@@ -214,12 +285,13 @@ async def get_workout_schedule(
             )
 
         # Fetch and attach plan details to the workout schedule
-        plan_details = await fetch_plan_with_exercises(
-            workout_schedule_out["plan_id"], user_id, cursor
-        )
+        plan_loader = utils.PlanLoader(user_id, cursor)
+        plan_details = await plan_loader.load(workout_schedule_out["plan_id"])
         workout_schedule_out.update({"plan_details": plan_details})
 
-        return workout_schedule_out
+        return responses.validated_response(
+            scheduled_workouts_schemas.scheduled_workout_adapter, workout_schedule_out, response
+        )
 
 
 @router.patch(
@@ -232,36 +304,18 @@ async def get_workout_schedule(
 async def update_workout_plan(
     scheduled_workout_id: str,
     scheduled_workout_update: Annotated[scheduled_workouts_schemas.ScheduledWorkoutUpdate,Body(openapi_examples=examples.workout_schedule_examples)],
-    database_access: list = Depends(connection.get_db),
+    database_access: list = Depends(connection.get_async_db),
     current_user: users_schemas.TokenData = Depends(security.get_current_user),
 ):
 
     user_id = current_user.user_id
 
-    plan_id_check_query = sql.SQL(
-        """
-                        SELECT plan_id
-                        FROM workout_plans
-                        WHERE user_id = %s AND plan_id = %s
-                    """
-    )
+    async with database_access as (conn, cursor):
+        plan_loader = utils.PlanLoader(user_id, cursor)
 
-    with database_access as (conn, cursor):
         if scheduled_workout_update.plan_id:
-
-            try:
-                cursor.execute(
-                    plan_id_check_query, (user_id, scheduled_workout_update.plan_id)
-                )
-                plan_id_verification = cursor.fetchone()
-            except Exception as error:
-                logger.error(
-                    f"Error occurred while checking plan_id: {str(error)}",
-                    exc_info=True,
-                )
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
-                )
+            # Load the new workout plan, which also checks that it exists and belongs to the user
+            plan_id_verification = await plan_loader.load(scheduled_workout_update.plan_id)
 
             if not plan_id_verification:
                 raise HTTPException(
@@ -269,7 +323,6 @@ async def update_workout_plan(
                     detail="Workout Plan Not found",
                 )
 
-        await utils.update_missed_workouts(user_id, conn, cursor)
         updated_data = scheduled_workout_update.model_dump(exclude_unset=True)
 
         update_plan_query = """ UPDATE scheduled_workouts SET """
@@ -279,13 +332,13 @@ async def update_workout_plan(
 
         update_plan_query = update_plan_query[0 : len(update_plan_query) - 2]
         update_plan_query += " WHERE scheduled_workout_id = %s AND user_id = %s "
-        update_plan_query += " RETURNING *"
+        update_plan_query += f" RETURNING {utils.scheduled_workout_columns}"
 
         params = list(updated_data.values())
         params.extend([scheduled_workout_id, user_id])
 
         try:
-            cursor.execute(update_plan_query, params)
+            await cursor.execute(update_plan_query, params)
         except Exception as error:
             logger.error(
                 f"An error occurred while updating the workout_schedules: {str(error)}",
@@ -295,14 +348,13 @@ async def update_workout_plan(
                 status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
             )
 
-        updated_workout_schedule = cursor.fetchone()
+        updated_workout_schedule = await cursor.fetchone()
 
-        plan_details = await fetch_plan_with_exercises(
-            updated_workout_schedule["plan_id"], user_id, cursor
-        )
+        # Served from the loader when the plan was loaded for the check above
+        plan_details = await plan_loader.load(updated_workout_schedule["plan_id"])
         updated_workout_schedule.update({"plan_details": plan_details})
 
-        conn.commit()
+        await conn.commit()
 
         return updated_workout_schedule
 
@@ -315,7 +367,7 @@ async def update_workout_plan(
 )
 async def delete_scheduled_workout(
     scheduled_workout_id: str,
-    database_access: list = Depends(connection.get_db),
+    database_access: list = Depends(connection.get_async_db),
     current_user: users_schemas.TokenData = Depends(security.get_current_user),
 ):
     user_id = current_user.user_id
@@ -325,11 +377,11 @@ async def delete_scheduled_workout(
             WHERE scheduled_workout_id = %s AND user_id = %s
             RETURNING *;
             """
-    with database_access as (conn, cursor):
+    async with database_access as (conn, cursor):
 
         try:
-            cursor.execute(delete_workout_query, (scheduled_workout_id, user_id))
-            deleted_schedule = cursor.fetchone()
+            await cursor.execute(delete_workout_query, (scheduled_workout_id, user_id))
+            deleted_schedule = await cursor.fetchone()
         except Exception as error:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -342,6 +394,6 @@ async def delete_scheduled_workout(
                 detail="Workout Schedule not found",
             )
 
-        conn.commit()
+        await conn.commit()
 
         return {"message": "Scheduled workout deleted successfully."}
@@ -2,11 +2,11 @@ import logging
 from typing import Annotated
 
 from fastapi import HTTPException, status, APIRouter, Depends, Body
-import psycopg2
+import psycopg
 from app.schemas import users_schemas
 from app.db import connection
 from app.core import utils, docs, examples
-from psycopg2 import sql
+from psycopg import sql
 
 # Create an APIRouter and setup logging
 router = APIRouter(tags=["Users"])
@@ -22,12 +22,12 @@ logger = logging.getLogger(__name__)
 )
 async def create_user(
     user_data: Annotated[users_schemas.UserCreate, Body(openapi_examples=examples.register_examples)],
-    database_access: list = Depends(connection.get_db),
+    database_access: list = Depends(connection.get_async_db),
 ):
-    with database_access as (conn, cursor):
-        # Hash the user's password before storing it
-        user_data.password = await utils.bcrypt_hash(user_data.password)
+    # Hash the user's password before storing it, without holding a database connection
+    user_data.password = await utils.bcrypt_hash(user_data.password)
 
+    async with database_access as (conn, cursor):
         try:
             user_data = user_data.model_dump()
 
@@ -53,10 +53,10 @@ async def create_user(
                 ),
             )
 
-            cursor.execute(insert_query, user_data)  #
-            new_user = cursor.fetchone()  # Retrieve the newly created user
+            await cursor.execute(insert_query, user_data)  #
+            new_user = await cursor.fetchone()  # Retrieve the newly created user
 
-        except psycopg2.errors.UniqueViolation as error:
+        except psycopg.errors.UniqueViolation as error:
             # Handle duplicate emails
             logger.warning(
                 f"Attempt to create user with duplicate email: {user_data['email']}",
@@ -78,10 +78,9 @@ async def create_user(
                 status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
             )
 
-        conn.commit()
+        await conn.commit()
         logger.info(
             f"User created successfully: {new_user['user_id']}",
-            exc_info=True,
             extra={"user_email": user_data["email"]},
         )
         # Return the newly created user
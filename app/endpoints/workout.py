@@ -1,12 +1,22 @@
 import logging
 from typing import Annotated
-import psycopg2
-from fastapi import HTTPException, status, APIRouter, Depends, Body, Path
-from app.core.utils import fetch_plan_with_exercises
+import psycopg
+from fastapi import HTTPException, status, APIRouter, Depends, Body, Path, Request, Response
+from app.core.catalog import exercise_catalog
+from app.core.utils import (
+    fetch_plan_with_exercises,
+    complete_plan,
+    plan_exercises_lateral,
+    check_exercises_exist,
+    plan_exercise_rows,
+    insert_plan_exercises,
+    replace_plan_exercises,
+    user_data_version,
+)
 from app.schemas import users_schemas, workout_schemas
-from app.db import connection
-from app.core import security, docs, examples
-from psycopg2 import sql
+from app.db import connection, statements
+from app.core import security, docs, examples, pagination, responses, conditional
+from psycopg import sql
 
 router = APIRouter(tags=["Workout Management"])
 logger = logging.getLogger(__name__)
@@ -24,7 +34,7 @@ async def create_workout_plan(
         workout_schemas.WorkoutPlanCreate,
         Body(openapi_examples=examples.workout_examples),
     ],
-    database_access: list = Depends(connection.get_db),
+    database_access: list = Depends(connection.get_async_db),
     current_user: users_schemas.TokenData = Depends(security.get_current_user),
 ):
     user_id = current_user.user_id  # Extract user ID from token data
@@ -38,30 +48,17 @@ async def create_workout_plan(
         """
     )
 
-    # SQL query to insert exercises into the workout_plan_exercises table
-    insert_exercise_query = sql.SQL(
-        """
-        INSERT INTO workout_plan_exercises (plan_id, exercise_id, sets, reps, weight,comments)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        RETURNING plan_exercise_id, exercise_id, sets, reps, weight,comments;
-        """
-    )
-
-    # SQL query to retrieve exercise details by exercise ID
-    select_query = sql.SQL(
-        """SELECT name AS exercise_name,description,
-                              category FROM exercises WHERE exercise_id = %s"""
-    )
-
-    with database_access as (conn, cursor):
+    async with database_access as (conn, cursor):
+        # Make sure every exercise exists before writing anything
+        await check_exercises_exist(workout_plan.exercises, cursor)
 
         try:
             # Insert the workout plan and retrieve the inserted plan
-            cursor.execute(
+            await cursor.execute(
                 insert_plan_query,
                 (user_id, workout_plan.plan_name, workout_plan.description),
             )
-            plan = cursor.fetchone()
+            plan = await cursor.fetchone()
         except Exception as error:
             logger.error(
                 f"An error occurred while inserting workout plan: {str(error)}",
@@ -72,46 +69,19 @@ async def create_workout_plan(
             )
 
         plan_id = plan["plan_id"]
-        exercises_out = []
 
         try:
-            for exercise in workout_plan.exercises:
-                # Insert each exercise into the workout plan and retrieve tit
-                cursor.execute(
-                    insert_exercise_query,
-                    (
-                        plan_id,
-                        exercise.exercise_id,
-                        exercise.sets,
-                        exercise.reps,
-                        exercise.weight,
-                        exercise.comments,
-                    ),
-                )
-                exercise_data = cursor.fetchone()
-
-                if exercise_data:
-                    # Fetch additional exercise info from the exercises table
-                    cursor.execute(select_query, (exercise.exercise_id,))
-                    exercise_extra_info = dict(cursor.fetchone())
-
-                    exercise_data = dict(exercise_data)
-                    exercise_data.update(**exercise_extra_info)
-
-                    # Append the exercise data to the output list
-                    exercises_out.append(
-                        workout_schemas.ExercisePlanOut(**exercise_data)
-                    )
-                else:
-                    logger.warning(
-                        f"Exercise data retrieval returned no results for exercise: {exercise.exercise_id}"
-                    )
-        except psycopg2.errors.ForeignKeyViolation as error:
-            # Handle error where the exercise ID does not exist
+            # Insert all the plan's exercises at once and add their details from the catalog
+            exercises_out = await insert_plan_exercises(
+                plan_id, plan_exercise_rows(workout_plan.exercises), cursor
+            )
+            await exercise_catalog.enrich(exercises_out, cursor)
+        except psycopg.errors.ForeignKeyViolation as error:
+            # Handle error where an exercise was removed since it was checked
             logger.error(f"Foreign key violation: {str(error)}", exc_info=True)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Exercise id {exercise.exercise_id} does not exist",
+                detail=f"Exercise does not exist: {error.diag.message_detail}",
             )
         except Exception as error:
             # Handle other exceptions
@@ -127,15 +97,21 @@ async def create_workout_plan(
         plan = dict(plan)
         plan.update({"exercises": exercises_out})
 
-        conn.commit()
+        await conn.commit()
 
-        return workout_schemas.WorkoutPlanOut(**plan)  # Return the final workout plan
+        # Return the final workout plan, already validated by building it
+        return responses.validated_response(
+            workout_schemas.workout_plan_out_adapter,
+            workout_schemas.WorkoutPlanOut(**plan),
+            status_code=status.HTTP_201_CREATED,
+            validate=False,
+        )
 
     # The function first inserts a new workout plan (check workout_schemas.WorkoutPlanCreate)
     # into the workout_plans table and retrieves details
     # like plan_id, user_id, name, description,and created_at from the inserted record.
-    # It then processes each exercise from the workout plan(check workout_schemas.WorkoutPlanCreate),
-    # executing SQL queries to add them to the workout_plan_exercises table.
+    # It then adds every exercise from the workout plan(check workout_schemas.WorkoutPlanCreate)
+    # to the workout_plan_exercises table in a single statement.
     # After completing these operations,
     # the function saves this information to the database, and returns the created workout plan
     # along with its associated exercises
@@ -154,7 +130,7 @@ async def update_workout_plan(
         workout_schemas.WorkoutPlanCreate,
         Body(openapi_examples=examples.workout_examples),
     ],
-    database_access: list = Depends(connection.get_db),
+    database_access: list = Depends(connection.get_async_db),
     current_user: users_schemas.TokenData = Depends(security.get_current_user),
 ):
     user_id = current_user.user_id  # Extract user ID from token data
@@ -169,24 +145,13 @@ async def update_workout_plan(
         """
     )
 
-    # SQL query to delete all exercises associated with the workout plan from workout_plan_exercises
-    delete_exercises_query = sql.SQL(
-        """DELETE FROM workout_plan_exercises WHERE plan_id = %s"""
-    )
-
-    # SQL query to insert exercises into the workout_plan_exercises table
-    insert_exercise_query = sql.SQL(
-        """
-        INSERT INTO workout_plan_exercises (plan_id, exercise_id, sets, reps, weight, comments)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        RETURNING plan_exercise_id, plan_id, exercise_id, sets, reps, weight, comments;
-        """
-    )
+    async with database_access as (conn, cursor):
+        # Make sure every exercise exists before writing anything
+        await check_exercises_exist(workout_plan.exercises, cursor)
 
-    with database_access as (conn, cursor):
         try:
             # Update the workout plan's details
-            cursor.execute(
+            await cursor.execute(
                 update_plan_query,
                 (
                     workout_plan.plan_name,
@@ -195,7 +160,7 @@ async def update_workout_plan(
                     user_id,
                 ),
             )
-            updated_plan = cursor.fetchone()  # Retrieve the updated plan
+            updated_plan = await cursor.fetchone()  # Retrieve the updated plan
             # If the updated_plan is None, Then return a 404 error
             if not updated_plan:
                 raise HTTPException(
@@ -203,9 +168,6 @@ async def update_workout_plan(
                     detail="Workout plan not found or not owned by user",
                 )
 
-            # Delete existing exercises for the plan
-            cursor.execute(delete_exercises_query, (plan_id,))
-
         except Exception as error:
             logger.error(
                 f"An error occurred while updating the workout plan: {str(error)}",
@@ -215,44 +177,21 @@ async def update_workout_plan(
                 status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
             )
 
-        exercises_out = []
         try:
-            for exercise in workout_plan.exercises:
-                # Insert each exercise into the updated workout plan
-                cursor.execute(
-                    insert_exercise_query,
-                    (
-                        plan_id,
-                        exercise.exercise_id,
-                        exercise.sets,
-                        exercise.reps,
-                        exercise.weight,
-                        exercise.comments,
-                    ),
-                )
-                exercise_data = dict(cursor.fetchone())
-
-                # Retrieve additional exercise details
-                select_query = sql.SQL(
-                    """SELECT name AS exercise_name, description, category
-                    FROM exercises WHERE exercise_id = %s"""
-                )
-                cursor.execute(select_query, (exercise.exercise_id,))
-
-                exercise_extra_info = dict(cursor.fetchone())
-                exercise_data.update(**exercise_extra_info)
-
-                # Append the exercise data to the output list
-                exercises_out.append(workout_schemas.ExercisePlanOut(**exercise_data))
-        except psycopg2.errors.ForeignKeyViolation as error:
-            # Handle cases where the exercise ID does not exist
+            # Only write the exercises that changed, then add their details from the catalog
+            exercises_out = await replace_plan_exercises(
+                plan_id, plan_exercise_rows(workout_plan.exercises), cursor
+            )
+            await exercise_catalog.enrich(exercises_out, cursor)
+        except psycopg.errors.ForeignKeyViolation as error:
+            # Handle cases where an exercise was removed since it was checked
             logger.error(
                 f"An error occurred while updating the workout plan: {str(error)}",
                 exc_info=True,
             )
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Exercise id {exercise.exercise_id} does not exist",
+                detail=f"Exercise does not exist: {error.diag.message_detail}",
             )
         except Exception as error:
             # Handle other exceptions
@@ -268,11 +207,14 @@ async def update_workout_plan(
         updated_plan = dict(updated_plan)
         updated_plan.update({"exercises": exercises_out})
 
-        conn.commit()
+        await conn.commit()
 
-        return workout_schemas.WorkoutPlanOut(
-            **updated_plan
-        )  # Return the updated workout plan
+        # Return the updated workout plan, already validated by building it
+        return responses.validated_response(
+            workout_schemas.workout_plan_out_adapter,
+            workout_schemas.WorkoutPlanOut(**updated_plan),
+            validate=False,
+        )
 
 
 @router.get(
@@ -283,44 +225,68 @@ async def update_workout_plan(
     description=docs.list_workout_plans,
 )
 async def list_workout_plans(
-    database_access: list = Depends(connection.get_db),
+    request: Request,
+    response: Response,
+    database_access: list = Depends(connection.get_async_db),
     current_user: users_schemas.TokenData = Depends(security.get_current_user),
     limit: int = 10,
     skip: int = 0,
+    after: str | None = None,
 ):
     user_id = current_user.user_id
 
-    # SQL query to select workout plans for the current user and adjust it using limit and offset
-    select_plans_query = sql.SQL(
-        """
-        SELECT plan_id, user_id, name AS plan_name, description, created_at, updated_at
-        FROM workout_plans
-        WHERE user_id = %s
-        LIMIT %s
-        OFFSET %s;
-        """
-    )
+    # Continue after the last plan of the previous page when a cursor was given
+    keyset_condition = sql.SQL("")
+    params = [user_id]
+    if after:
+        keyset_condition = sql.SQL("AND (created_at, plan_id) > (%s::timestamp, %s::uuid)")
+        params.extend(pagination.decode_cursor(after, 2))
+    params.extend([limit + 1, skip])
 
-    # SQL query to select exercises associated with a specific workout plan from the workout_plan_exercises table
-    select_plans_exercises_query = sql.SQL(
+    # SQL query to select a page of workout plans for the current user, each with its exercises,
+    # plus one extra plan to tell whether there is a next page
+    select_plans_query = sql.SQL(
         """
-        SELECT *
-        FROM workout_plan_exercises
-        WHERE plan_id = %s;
+        SELECT p.plan_id, p.user_id, p.plan_name, p.description, p.created_at, p.updated_at,
+        pe.exercises
+        FROM (
+            SELECT plan_id, user_id, name AS plan_name, description, created_at, updated_at
+            FROM workout_plans
+            WHERE user_id = %s {keyset_condition}
+            ORDER BY created_at, plan_id
+            LIMIT %s
+            OFFSET %s
+        ) p
+        {plan_exercises}
+        ORDER BY p.created_at, p.plan_id;
         """
-    )
+    ).format(keyset_condition=keyset_condition, plan_exercises=plan_exercises_lateral)
 
-    # SQL query to select additional exercise details
-    select_exercises_query = sql.SQL(
-        """SELECT name AS exercise_name, description, category 
-        FROM exercises WHERE exercise_id = %s"""
-    )
+    async with database_access as (conn, cursor):
+        try:
+            # Any change to the user's plans, deletes included, bumps their version; exercise
+            # details come from the catalog, so its version counts too
+            version = await user_data_version(user_id, cursor)
+        except Exception as error:
+            logger.error(
+                f"Error occurred while checking the workout plans' version: {str(error)}",
+                exc_info=True,
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+            )
+        etag = conditional.make_etag(
+            "plans", user_id, version["plans_version"], exercise_catalog.version
+        )
+        # No Last-Modified: deleting a plan leaves nothing whose timestamp could move
+        not_modified = conditional.conditional_response(request, response, etag)
+        if not_modified:
+            return not_modified
 
-    with database_access as (conn, cursor):
         try:
             # Retrieve the workout plans for the current user
-            cursor.execute(select_plans_query, (user_id, limit, skip))
-            plans = cursor.fetchall()
+            await cursor.execute(select_plans_query, params)
+            plans = await cursor.fetchall()
         except Exception as error:
             logger.error(
                 f"Error occurred while getting a list of all workout plans: {str(error)}",
@@ -329,6 +295,10 @@ async def list_workout_plans(
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
             )
+        plans = pagination.paginate(
+            plans, limit, lambda plan: (plan["created_at"].isoformat(), plan["plan_id"]), response
+        )
+
         # If there are no workout return a 404 error
         if not plans:
             raise HTTPException(
@@ -336,36 +306,13 @@ async def list_workout_plans(
                 detail="No workout plans found for the user.",
             )
 
-        try:
-            for i, plan in enumerate(plans):
-                # Retrieve exercises associated with each workout plan
-                cursor.execute(select_plans_exercises_query, (plan["plan_id"],))
-                exercises = cursor.fetchall()
-
-                for x, exercise in enumerate(exercises):
-                    # Retrieve additional exercise details
-                    cursor.execute(select_exercises_query, (exercise["exercise_id"],))
-                    exercise_data = dict(cursor.fetchone())
-
-                    exercises[x].update(
-                        **exercise_data
-                    )  # Update exercise data with extra details
-
-                plans[i].update({"exercises": exercises})  # Add exercises to the plan
-                plans[i].update(
-                    {"metadata": {"exercise_count": len(exercises)}}
-                )  # Add metadata to the plan
-
-        except Exception as error:
-            logger.error(
-                f"Error occurred while getting a specific workout plan: {str(error)}",
-                exc_info=True,
-            )
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
-            )
+        for plan in plans:
+            await complete_plan(plan, cursor)  # Add exercise details and metadata to the plan
 
-        return plans  # Return the list of workout plans
+        # Return the list of workout plans
+        return responses.validated_response(
+            workout_schemas.workout_plan_list_adapter, plans, response
+        )
 
 
 @router.get(
@@ -377,16 +324,41 @@ async def list_workout_plans(
 )
 async def get_workout_plan(
     plan_id: Annotated[str,Path()],
-    database_access: list = Depends(connection.get_db),
+    request: Request,
+    response: Response,
+    database_access: list = Depends(connection.get_async_db),
     current_user: users_schemas.TokenData = Depends(security.get_current_user),
 ):
 
     user_id = current_user.user_id
 
-    with database_access as (conn, cursor):
+    async with database_access as (conn, cursor):
+        try:
+            # Updating a plan always touches its row, exercises included
+            await statements.PLAN_VERSION.execute(cursor, (plan_id, user_id))
+            version = await cursor.fetchone()
+        except Exception as error:
+            logger.error(
+                f"Error occurred while checking a workout plan's version: {str(error)}",
+                exc_info=True,
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+            )
+
+        if version:
+            etag = conditional.make_etag(
+                "plan", plan_id, version["updated_at"], exercise_catalog.version
+            )
+            not_modified = conditional.conditional_response(
+                request, response, etag, version["updated_at"]
+            )
+            if not_modified:
+                return not_modified
+
         plan = await fetch_plan_with_exercises(plan_id, user_id, cursor)
 
-        return plan
+        return responses.validated_response(workout_schemas.workout_plan_adapter, plan, response)
 
 
 @router.delete(
@@ -397,7 +369,7 @@ async def get_workout_plan(
 )
 async def delete_workout_plan(
     plan_id: Annotated[str,Path()],
-    database_access: list = Depends(connection.get_db),
+    database_access: list = Depends(connection.get_async_db),
     current_user: users_schemas.TokenData = Depends(security.get_current_user),
 ):
     user_id = current_user.user_id  # Extract user ID from token data
@@ -411,11 +383,11 @@ async def delete_workout_plan(
         """
     )
 
-    with database_access as (conn, cursor):
+    async with database_access as (conn, cursor):
         try:
             # Execute the delete query
-            cursor.execute(delete_plan_query, (plan_id, user_id))
-            deleted_plan = cursor.fetchone()
+            await cursor.execute(delete_plan_query, (plan_id, user_id))
+            deleted_plan = await cursor.fetchone()
         except Exception as error:
             logger.error(
                 f"An error occurred while deleting the workout plan: {str(error)}",
@@ -432,6 +404,6 @@ async def delete_workout_plan(
                 detail="Workout plan not found or you do not have permission to delete it",
             )
 
-        conn.commit()
+        await conn.commit()
 
         return {"message": "Workout plan deleted successfully"}  # Confirm deletion
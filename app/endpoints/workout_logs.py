@@ -1,15 +1,36 @@
+import csv
+import io
 import logging
 from typing import Annotated
-import psycopg2
-from fastapi import HTTPException, status, APIRouter, Depends, Request, Query, Body
+import orjson
+import psycopg
+from fastapi import (
+    HTTPException,
+    status,
+    APIRouter,
+    Depends,
+    Request,
+    Query,
+    Body,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from app.schemas import users_schemas, logs_schemas
 from app.db import connection
-from app.core import security, docs, examples
-from psycopg2 import sql
+from app.core import security, docs, examples, pagination, responses, utils, workout_import
+from psycopg import sql
 
 router = APIRouter(tags=["Workout Logs"])
 logger = logging.getLogger(__name__)
 
+# Rows pulled from the server-side cursor (and written to the client) at a time by the export
+EXPORT_FETCH_SIZE = 1000
+
+# How the export writes each NDJSON line
+NDJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_APPEND_NEWLINE
+
 
 @router.post(
     "/workout-logs",
@@ -20,7 +41,7 @@ logger = logging.getLogger(__name__)
 )
 async def create_workout_log(
     workout_log: Annotated[logs_schemas.WorkoutLogCreate, Body(openapi_examples=examples.workout_log_examples)],
-    database_access: list = Depends(connection.get_db),
+    database_access: list = Depends(connection.get_async_db),
     current_user: users_schemas.TokenData = Depends(security.get_current_user),
 ):
 
@@ -34,10 +55,10 @@ async def create_workout_log(
     """
     )
 
-    with database_access as (conn, cursor):
+    async with database_access as (conn, cursor):
 
         try:
-            cursor.execute(
+            await cursor.execute(
                 insert_log_query,
                 (
                     user_id,
@@ -47,9 +68,9 @@ async def create_workout_log(
                     workout_log.notes,
                 ),
             )
-            log_out = cursor.fetchone()
+            log_out = await cursor.fetchone()
 
-        except psycopg2.errors.ForeignKeyViolation as error:
+        except psycopg.errors.ForeignKeyViolation as error:
             logger.error(
                 f"Error occurred while logging a scheduled workout: {str(error)}",
                 exc_info=True,
@@ -71,10 +92,10 @@ async def create_workout_log(
 
         logger.info(
             "Workout Log successfully Created",
-            exc_info=True,
+            extra={"log_id": log_out["log_id"]},
         )
 
-        conn.commit()
+        await conn.commit()
         return log_out
 
 
@@ -86,28 +107,40 @@ async def create_workout_log(
     description=docs.list_workout_logs
 )
 async def list_workout_logs(
-    database_access: list = Depends(connection.get_db),
+    response: Response,
+    database_access: list = Depends(connection.get_async_db),
     current_user: users_schemas.TokenData = Depends(security.get_current_user),
     limit: int = 10,
     skip: int = 0,
+    after: str | None = None,
 ):
 
     user_id = current_user.user_id
 
+    # Continue after the last log of the previous page when a cursor was given
+    keyset_condition = sql.SQL("")
+    params = [user_id]
+    if after:
+        keyset_condition = sql.SQL("AND (completed_at, log_id) < (%s::timestamp, %s::uuid)")
+        params.extend(pagination.decode_cursor(after, 2))
+
+    # Newest first; one extra row tells us whether there is a next page
     select_logs_query = sql.SQL(
         """
         SELECT log_id, user_id, scheduled_workout_id, completed_at, total_time, notes
         FROM workout_logs
-        WHERE user_id = %s
+        WHERE user_id = %s {keyset_condition}
+        ORDER BY completed_at DESC, log_id DESC
         LIMIT %s
         OFFSET %s;
     """
-    )
+    ).format(keyset_condition=keyset_condition)
+    params.extend([limit + 1, skip])
 
-    with database_access as (conn, cursor):
+    async with database_access as (conn, cursor):
         try:
-            cursor.execute(select_logs_query, (user_id, limit, skip))
-            logs = cursor.fetchall()
+            await cursor.execute(select_logs_query, params)
+            logs = await cursor.fetchall()
         except Exception as error:
             logger.error(
                 f"Error occurred while getting a list of all workout logs: {str(error)}",
@@ -117,13 +150,204 @@ async def list_workout_logs(
                 status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
             )
 
+        logs = pagination.paginate(
+            logs, limit, lambda log: (log["completed_at"].isoformat(), log["log_id"]), response
+        )
+
         if not logs:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="No workout logs found for the user.",
             )
 
-        return logs
+        return responses.validated_response(logs_schemas.workout_log_list_adapter, logs, response)
+
+
+@router.get(
+    "/workout-logs/export",
+    status_code=status.HTTP_200_OK,
+    summary="Export all workout logs.",
+    response_class=StreamingResponse,
+    description=docs.export_workout_logs,
+)
+async def export_workout_logs(
+    current_user: users_schemas.TokenData = Depends(security.get_current_user),
+    export_format: logs_schemas.LogFileFormat = Query(logs_schemas.LogFileFormat.ndjson, alias="format"),
+    include_schedule: bool = False,
+):
+
+    user_id = current_user.user_id
+
+    # The scheduled workout and plan each log belongs to, when asked for
+    schedule_columns = sql.SQL(
+        """, s.plan_id, p.name AS plan_name, s.scheduled_date, s.scheduled_time,
+        {effective_status} AS status"""
+    ).format(effective_status=sql.SQL(utils.effective_status))
+    schedule_join = sql.SQL(
+        """LEFT JOIN scheduled_workouts s ON s.scheduled_workout_id = l.scheduled_workout_id
+        LEFT JOIN workout_plans p ON p.plan_id = s.plan_id"""
+    )
+
+    export_query = sql.SQL(
+        """
+        SELECT l.log_id, l.scheduled_workout_id, l.completed_at, l.total_time, l.notes
+        {schedule_columns}
+        FROM workout_logs l
+        {schedule_join}
+        WHERE l.user_id = %s
+        ORDER BY l.completed_at, l.log_id;
+    """
+    ).format(
+        schedule_columns=schedule_columns if include_schedule else sql.SQL(""),
+        schedule_join=schedule_join if include_schedule else sql.SQL(""),
+    )
+
+    async def stream_logs():
+        # The connection is borrowed here rather than through Depends so it stays checked out
+        # for as long as the response is streaming, and no longer
+        async with connection.get_async_db() as (conn, cursor):
+            # A named (server-side) cursor keeps the result set in Postgres and hands it over
+            # EXPORT_FETCH_SIZE rows at a time, so memory use doesn't grow with the history
+            async with conn.cursor(name="export_workout_logs") as export_cursor:
+                try:
+                    await export_cursor.execute(export_query, (user_id,))
+                    fieldnames = [column.name for column in export_cursor.description]
+
+                    if export_format == logs_schemas.LogFileFormat.csv:
+                        yield ",".join(fieldnames) + "\r\n"
+
+                    while rows := await export_cursor.fetchmany(EXPORT_FETCH_SIZE):
+                        if export_format == logs_schemas.LogFileFormat.csv:
+                            buffer = io.StringIO()
+                            csv.DictWriter(buffer, fieldnames=fieldnames).writerows(rows)
+                            yield buffer.getvalue()
+                        else:
+                            # Timestamps come out in ISO 8601, UTC as Z, as in the JSON responses
+                            yield b"".join(orjson.dumps(row, option=NDJSON_OPTIONS) for row in rows)
+                except Exception as error:
+                    # The status line has already gone out, so all we can do is stop the stream
+                    logger.error(
+                        f"Error occurred while exporting workout logs: {str(error)}",
+                        exc_info=True,
+                    )
+                    raise
+
+    media_type = "text/csv" if export_format == logs_schemas.LogFileFormat.csv else "application/x-ndjson"
+    return StreamingResponse(
+        stream_logs(),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="workout-logs.{export_format.value}"'
+        },
+    )
+
+
+@router.post(
+    "/workout-logs/import",
+    status_code=status.HTTP_201_CREATED,
+    summary="Import workout logs in bulk.",
+    response_model=logs_schemas.WorkoutLogImportOut,
+    description=docs.import_workout_logs,
+)
+async def import_workout_logs(
+    file: UploadFile,
+    database_access: list = Depends(connection.get_async_db),
+    current_user: users_schemas.TokenData = Depends(security.get_current_user),
+    file_format: logs_schemas.LogFileFormat | None = Query(None, alias="format"),
+    all_or_nothing: bool = False,
+):
+
+    user_id = current_user.user_id
+
+    if file_format is None:
+        is_csv = (file.filename or "").lower().endswith(".csv")
+        file_format = logs_schemas.LogFileFormat.csv if is_csv else logs_schemas.LogFileFormat.ndjson
+
+    # Validated rows are staged first so their scheduled workouts can be checked in one query
+    create_staging_query = """
+        CREATE TEMP TABLE workout_log_import (
+            line INT NOT NULL,
+            scheduled_workout_id UUID NOT NULL,
+            completed_at TIMESTAMPTZ NOT NULL,
+            total_time INT NOT NULL,
+            notes TEXT NOT NULL
+        ) ON COMMIT DROP;
+    """
+
+    copy_staging_query = """
+        COPY workout_log_import (line, scheduled_workout_id, completed_at, total_time, notes)
+        FROM STDIN
+    """
+
+    unresolved_query = """
+        SELECT i.line
+        FROM workout_log_import i
+        LEFT JOIN scheduled_workouts s
+        ON s.scheduled_workout_id = i.scheduled_workout_id AND s.user_id = %s
+        WHERE s.scheduled_workout_id IS NULL
+        ORDER BY i.line;
+    """
+
+    insert_logs_query = """
+        INSERT INTO workout_logs (user_id, scheduled_workout_id, completed_at, total_time, notes)
+        SELECT %s, i.scheduled_workout_id, i.completed_at, i.total_time, i.notes
+        FROM workout_log_import i
+        JOIN scheduled_workouts s
+        ON s.scheduled_workout_id = i.scheduled_workout_id AND s.user_id = %s
+        ORDER BY i.line;
+    """
+
+    rows = workout_import.validate_records(workout_import.read_records(file.file, file_format))
+    errors = []
+
+    async with database_access as (conn, cursor):
+        try:
+            await cursor.execute(create_staging_query)
+
+            # Parse and validate the upload a batch at a time on a worker thread, streaming
+            # the valid rows into the staging table as they come
+            async with cursor.copy(copy_staging_query) as copy:
+                while batch := await run_in_threadpool(workout_import.next_batch, rows):
+                    for line_number, row in batch:
+                        if isinstance(row, str):
+                            errors.append({"line": line_number, "error": row})
+                        else:
+                            await copy.write_row(row)
+
+            await cursor.execute(unresolved_query, (user_id,))
+            errors.extend(
+                {"line": row["line"], "error": "Scheduled workout not found"}
+                for row in await cursor.fetchall()
+            )
+
+            if errors and all_or_nothing:
+                imported = 0
+            else:
+                await cursor.execute(insert_logs_query, (user_id, user_id))
+                imported = cursor.rowcount
+        except UnicodeDecodeError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The file must be UTF-8 encoded",
+            )
+        except Exception as error:
+            logger.error(
+                f"Error occurred while importing workout logs: {str(error)}",
+                exc_info=True,
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+            )
+
+        if imported:
+            await conn.commit()
+
+    errors.sort(key=lambda error: error["line"])
+    return {
+        "imported": imported,
+        "failed": len(errors),
+        "errors": errors[: workout_import.MAX_REPORTED_ERRORS],
+    }
 
 
 @router.get(
@@ -135,7 +359,7 @@ async def list_workout_logs(
 )
 async def list_workout_logs(
     log_id: str,
-    database_access: list = Depends(connection.get_db),
+    database_access: list = Depends(connection.get_async_db),
     current_user: users_schemas.TokenData = Depends(security.get_current_user),
 ):
 
@@ -149,10 +373,10 @@ async def list_workout_logs(
     """
     )
 
-    with database_access as (conn, cursor):
+    async with database_access as (conn, cursor):
         try:
-            cursor.execute(select_logs_query, (user_id, log_id))
-            logs = cursor.fetchone()
+            await cursor.execute(select_logs_query, (user_id, log_id))
+            logs = await cursor.fetchone()
         except Exception as error:
             logger.error(
                 f"Error occurred while getting a specific of workout log: {str(error)}",
@@ -1,4 +1,7 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.endpoints import (
     users,
@@ -8,18 +11,52 @@ from app.endpoints import (
     scheduled_workouts,
     workout_logs,
     reports,
+    monitoring,
 )
+from app.db import connection
+from app.core.catalog import exercise_catalog
+from app.core.hashing import password_hasher
+from app.core.sweeper import missed_workout_sweeper
+from app.core import pagination
+from app.core.metrics import MetricsMiddleware, monitor_event_loop_lag
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from app.core.log_config import setup_logging
 import logging
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler(), logging.FileHandler("app.log")],
-)
+# Log records are queued and written out by a background thread (see app/core/log_config.py)
+setup_logging()
 
 logger = logging.getLogger(__name__)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up the connection pool and close its connections on shutdown. The psycopg2 pool
+    # behind get_db is only for the scripts (migrations, seeders), which open it on first use
+    await connection.async_pool.open(wait=True)
+
+    # Load the exercise catalog and keep it in sync with the exercises table
+    await exercise_catalog.load()
+    catalog_watcher = asyncio.create_task(exercise_catalog.watch())
+
+    # Mark overdue pending workouts as missed in the background rather than on every read
+    sweeper = asyncio.create_task(missed_workout_sweeper.run())
+
+    # Feeds the event loop lag histogram on /metrics
+    loop_monitor = asyncio.create_task(monitor_event_loop_lag())
+
+    yield
+
+    for task in (catalog_watcher, sweeper, loop_monitor):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await connection.async_pool.close()
+    password_hasher.shutdown()
+
+
 app = FastAPI(
     title="Workout Tracker",
     version="0.2.0",
@@ -27,6 +64,9 @@ app = FastAPI(
     description="A Workout Tracker where users can"
     " Based on https://roadmap.sh/projects/image-processing-service",
     # dependencies=[Depends(utils.validate_api_key)]
+    lifespan=lifespan,
+    # orjson encodes responses several times faster than the standard library's json
+    default_response_class=ORJSONResponse,
 )
 
 origins = [""]
@@ -37,6 +77,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[pagination.NEXT_CURSOR_HEADER],
+)
+
+# Counts and times every request by route for /metrics
+app.add_middleware(MetricsMiddleware)
+# Counts each request's queries, warning about ones that run too many
+app.add_middleware(QueryStatsMiddleware)
+# Outermost, so every response (errors included) can be compressed
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    level=settings.COMPRESSION_LEVEL,
+    cached_paths=[
+        path.strip() for path in settings.COMPRESSION_CACHED_PATHS.split(",") if path.strip()
+    ],
 )
 
 app.include_router(users.router)
@@ -46,6 +101,7 @@ app.include_router(workout.router)
 app.include_router(scheduled_workouts.router)
 app.include_router(workout_logs.router)
 app.include_router(reports.router)
+app.include_router(monitoring.router)
 
 
 @app.get("/", summary="Root Endpoint", description="Returns a simple message.")
@@ -1,9 +1,13 @@
 import logging
 import uvicorn
+from app.db.migrations import apply_migrations
 from app.db.seeds.seed_exercises import seed_exercise_data
+from app.core.log_config import setup_logging
 logger = logging.getLogger(__name__)
 
 if __name__ == "__main__":
+    setup_logging()
     logger.info('Application Starting')
+    apply_migrations()
     seed_exercise_data()
     uvicorn.run('app.main:app', host="127.0.0.1", port=8000,reload=True)
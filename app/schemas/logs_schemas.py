@@ -1,6 +1,12 @@
 import datetime
+from enum import Enum
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
+
+
+class LogFileFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
 
 
 class WorkoutLogBase(BaseModel):
@@ -18,3 +24,18 @@ class WorkoutLogOut(WorkoutLogBase):
     scheduled_workout_id: str | None
     log_id: UUID
     user_id: UUID
+
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+
+class WorkoutLogImportOut(BaseModel):
+    imported: int
+    failed: int
+    errors: list[ImportRowError]
+
+
+# For responses.validated_response in GET /workout-logs
+workout_log_list_adapter = TypeAdapter(list[WorkoutLogOut])
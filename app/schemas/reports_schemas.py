@@ -0,0 +1,34 @@
+import datetime
+from enum import Enum
+from pydantic import BaseModel
+
+
+class PeriodChoice(str, Enum):
+    week = "week"
+    month = "month"
+
+
+class ProgressPeriod(BaseModel):
+    period_start: datetime.date
+    sessions: int
+    total_time: int
+    volume: float
+    active_days: int
+    sessions_rolling_avg: float
+    total_time_rolling_avg: float
+    volume_rolling_avg: float
+
+
+class ProgressStreaks(BaseModel):
+    longest_days: int
+    current_days: int
+    longest_periods: int
+    current_periods: int
+
+
+class ProgressSeriesOut(BaseModel):
+    period: PeriodChoice
+    start: datetime.date
+    end: datetime.date
+    series: list[ProgressPeriod]
+    streaks: ProgressStreaks
@@ -1,7 +1,7 @@
 import datetime
 from uuid import UUID
 from enum import Enum
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 
 from app.schemas.workout_schemas import WorkoutPlanOutV3
 
@@ -42,3 +42,8 @@ class ScheduledWorkoutOut(ScheduledWorkoutBase):
     user_id: UUID
     created_at: datetime.datetime
     plan_details: WorkoutPlanOutV3
+
+
+# For responses.validated_response in the scheduled workout GET endpoints
+scheduled_workout_adapter = TypeAdapter(ScheduledWorkoutOut)
+scheduled_workout_list_adapter = TypeAdapter(list[ScheduledWorkoutOut])
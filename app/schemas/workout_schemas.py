@@ -1,7 +1,7 @@
 import datetime
 from uuid import UUID
 from fastapi import Body
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 
 
 class ExercisePlanBase(BaseModel):
@@ -64,3 +64,9 @@ class WorkoutPlanUpdate(BaseModel):
     plan_name: str
     description: str
     exercises: list[ExercisePlanCreate]
+
+
+# For responses.validated_response in the workout plan endpoints
+workout_plan_out_adapter = TypeAdapter(WorkoutPlanOut)
+workout_plan_adapter = TypeAdapter(WorkoutPlanOutV2)
+workout_plan_list_adapter = TypeAdapter(list[WorkoutPlanOutV2])
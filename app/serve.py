@@ -0,0 +1,123 @@
+"""Runs the API in production: a gunicorn master process managing pre-forked uvicorn workers.
+
+The master applies the migrations and seeds the exercises once, before forking. Each worker then
+runs the app with its own connection pools and background tasks. Workers are replaced after
+serving about SERVER_MAX_REQUESTS requests, and on SIGTERM they stop accepting connections and
+get SERVER_GRACEFUL_TIMEOUT seconds to finish the requests in flight. Run from the repository root:
+
+    python -m app.serve --workers 4 --bind 0.0.0.0:8000
+
+For development, with reloading on code changes, use app/run.py instead.
+"""
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+
+from gunicorn.app.base import BaseApplication
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# The metrics directory made for this run, removed again on exit
+_temporary_metrics_dir = None
+
+
+def on_starting(server):
+    """Runs once in the master, before any worker is forked."""
+    # Imported here so prometheus_client is only loaded once its multiprocess directory is set
+    from app.core.log_config import setup_logging, shutdown_logging
+    from app.db import connection
+    from app.db.migrations import apply_migrations
+    from app.db.seeds.seed_exercises import seed_exercise_data
+
+    setup_logging()
+    logger.info("Application Starting")
+    apply_migrations()
+    seed_exercise_data()
+
+    # Forked workers must not share the master's database connections or its logging thread,
+    # which wouldn't exist in them; each worker opens its own when it starts the app
+    connection.pool.close()
+    shutdown_logging()
+
+
+def child_exit(server, worker):
+    """Runs in the master when a worker exits, so its metrics stop counting as live."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    """Runs in the master after the last worker has stopped."""
+    if _temporary_metrics_dir:
+        shutil.rmtree(_temporary_metrics_dir, ignore_errors=True)
+
+
+def prepare_metrics_dir(workers: int):
+    """With several workers, /metrics has to add up every worker's metrics, which prometheus_client
+    does through files in PROMETHEUS_MULTIPROC_DIR. Uses a temporary directory unless one is set,
+    and empties it, since files left by an earlier run would be counted too.
+    """
+    global _temporary_metrics_dir
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+    elif workers > 1:
+        _temporary_metrics_dir = tempfile.mkdtemp(prefix="workout-tracker-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = _temporary_metrics_dir
+
+
+class Server(BaseApplication):
+    """Runs app.main:app under gunicorn with the given gunicorn settings."""
+
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # Only called in the workers, after the fork
+        from app.main import app
+
+        return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bind", default=settings.SERVER_BIND, help="host:port to listen on")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.SERVER_WORKERS,
+        help="worker processes (0 = one per CPU core)",
+    )
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count() or 1
+    prepare_metrics_dir(workers)
+
+    Server(
+        {
+            "bind": args.bind,
+            "workers": workers,
+            "worker_class": "uvicorn.workers.UvicornWorker",
+            "backlog": settings.SERVER_BACKLOG,
+            "keepalive": settings.SERVER_KEEPALIVE,
+            "timeout": settings.SERVER_TIMEOUT,
+            "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+            "max_requests": settings.SERVER_MAX_REQUESTS,
+            "max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER,
+            "on_starting": on_starting,
+            "child_exit": child_exit,
+            "on_exit": on_exit,
+        }
+    ).run()
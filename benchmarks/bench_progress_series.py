@@ -0,0 +1,63 @@
+"""Times app.core.analytics.progress_series on synthetic users with many logs.
+
+The arrays are built as Python lists, the way psycopg hands them over, so the timings include
+loading them into NumPy. Run from the repository root:
+
+    python -m benchmarks.bench_progress_series --logs 10000 20000 50000
+"""
+import argparse
+import datetime
+import random
+import statistics
+import time
+
+from app.core import analytics
+
+# The endpoint should answer within this many milliseconds for a user with 10k+ logs
+BUDGET_MS = 50.0
+
+
+def make_columns(n_logs: int, n_days: int, n_plans: int, exercises_per_plan: int, seed: int):
+    rng = random.Random(seed)
+    n_exercises = n_plans * exercises_per_plan
+    return {
+        "log_days": sorted(rng.randrange(n_days) for _ in range(n_logs)),
+        "log_times": [rng.randint(10, 120) for _ in range(n_logs)],
+        "log_plans": [rng.randrange(-1, n_plans) for _ in range(n_logs)],
+        "exercise_plans": [i // exercises_per_plan for i in range(n_exercises)],
+        "exercise_volumes": [
+            float(rng.randint(1, 5) * rng.randint(1, 15) * rng.choice((0, 10, 20, 40, 60)))
+            for _ in range(n_exercises)
+        ],
+    }
+
+
+def bench(n_logs: int, period: str, days: int, repeat: int) -> float:
+    end = datetime.date(2024, 12, 31)
+    start = end - datetime.timedelta(days=days - 1)
+    columns = make_columns(n_logs, days, n_plans=50, exercises_per_plan=8, seed=n_logs)
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        analytics.progress_series(start, end, period, **columns)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logs", type=int, nargs="+", default=[10_000, 20_000, 50_000])
+    parser.add_argument("--days", type=int, default=5 * 365, help="length of the date range")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    over_budget = False
+    for n_logs in args.logs:
+        for period in ("week", "month"):
+            median_ms = bench(n_logs, period, args.days, args.repeat)
+            over_budget |= n_logs <= 10_000 and median_ms > BUDGET_MS
+            print(f"{n_logs:>7} logs  {period:<5}  median {median_ms:7.2f} ms")
+
+    if over_budget:
+        raise SystemExit(f"progress_series took longer than {BUDGET_MS} ms for 10k logs")
@@ -0,0 +1,129 @@
+"""Compares the CPU cost of turning a page of GET /scheduled-workouts rows into a response.
+
+Three ways of producing the same JSON are timed on synthetic rows shaped like the endpoint's
+(each scheduled workout with its plan and the plan's exercises):
+
+- stdlib: FastAPI's own handling; response_model validation, conversion to plain Python and
+  the standard library's json encoder, as before ORJSONResponse was the default
+- orjson: the same, but encoded by ORJSONResponse
+- validated: app.core.responses.validated_response, validating and encoding in one pass
+
+Run from the repository root:
+
+    python -m benchmarks.bench_responses --rows 10 50 200
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import time
+import uuid
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+
+from app.core import responses
+from app.main import app
+from app.schemas import scheduled_workouts_schemas
+
+
+def make_rows(n_rows: int, exercises_per_plan: int, seed: int) -> list[dict]:
+    """Rows as the endpoint has them just before returning: dicts with str UUIDs."""
+    rng = random.Random(seed)
+    user_id = str(uuid.UUID(int=rng.getrandbits(128)))
+    created = datetime.datetime(2024, 1, 1, 8, 30)
+    plans = [
+        {
+            "plan_name": f"Plan {number}",
+            "description": "A synthetic plan",
+            "created_at": created,
+            "updated_at": created,
+            "exercises": [
+                {
+                    "exercise_id": rng.randint(1, 16),
+                    "sets": rng.randint(1, 5),
+                    "reps": rng.randint(5, 15),
+                    "weight": rng.choice((None, 10, 20.5, 40)),
+                    "comments": None,
+                    "exercise_name": "Push Up",
+                    "description": "A basic push-up.",
+                    "category": "strength",
+                }
+                for _ in range(exercises_per_plan)
+            ],
+        }
+        for number in range(5)
+    ]
+    return [
+        {
+            "scheduled_workout_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "plan_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "user_id": user_id,
+            "scheduled_date": datetime.date(2024, 1, 1) + datetime.timedelta(days=number),
+            "scheduled_time": datetime.time(7, 30),
+            "status": "pending",
+            "created_at": created,
+            "plan_details": rng.choice(plans),
+        }
+        for number in range(n_rows)
+    ]
+
+
+def list_route():
+    return next(
+        route for route in app.routes
+        if getattr(route, "path", None) == "/scheduled-workouts" and "GET" in route.methods
+    )
+
+
+async def fastapi_body(route, rows: list[dict], response_class) -> bytes:
+    content = await serialize_response(
+        field=route.response_field, response_content=rows, is_coroutine=True
+    )
+    return response_class(content).body
+
+
+async def bench(n_rows: int, repeat: int) -> dict:
+    route = list_route()
+    rows = make_rows(n_rows, exercises_per_plan=6, seed=n_rows)
+    adapter = scheduled_workouts_schemas.scheduled_workout_list_adapter
+
+    async def stdlib():
+        return await fastapi_body(route, rows, JSONResponse)
+
+    async def orjson():
+        return await fastapi_body(route, rows, ORJSONResponse)
+
+    async def validated():
+        return responses.validated_response(adapter, rows).body
+
+    modes = {"stdlib": stdlib, "orjson": orjson, "validated": validated}
+
+    # All three must produce the same document
+    documents = [json.loads(await produce()) for produce in modes.values()]
+    assert all(document == documents[0] for document in documents), "responses differ"
+
+    timings = {}
+    for name, produce in modes.items():
+        started = time.process_time()
+        for _ in range(repeat):
+            await produce()
+        timings[name] = (time.process_time() - started) / repeat * 1000
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'rows':>6} {'stdlib':>10} {'orjson':>10} {'validated':>10} {'saving':>8}  (CPU ms per response)")
+    for n_rows in args.rows:
+        timings = asyncio.run(bench(n_rows, args.repeat))
+        saving = 1 - timings["validated"] / timings["stdlib"]
+        print(
+            f"{n_rows:>6} {timings['stdlib']:>10.3f} {timings['orjson']:>10.3f} "
+            f"{timings['validated']:>10.3f} {saving:>8.0%}"
+        )
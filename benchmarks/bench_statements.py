@@ -0,0 +1,88 @@
+"""Compares the hot statements of app.db.statements sent as plain SQL and as prepared statements.
+
+Each statement runs `--repeat` times on its own connection in each mode, with parameters taken
+from the database's own rows, so load some data first (e.g. app.db.seeds.generate_dataset).
+Run from the repository root:
+
+    python -m benchmarks.bench_statements --repeat 2000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from app.core import utils  # noqa: F401 (registers the statements defined next to their queries)
+from app.db import connection, statements
+
+
+async def sample_params(conn) -> dict:
+    """Parameters for each statement, taken from an existing user, plan and refresh token."""
+    cursor = await conn.execute(
+        """
+        SELECT u.email, p.user_id, p.plan_id
+        FROM workout_plans p JOIN users u USING (user_id)
+        ORDER BY p.created_at DESC
+        LIMIT 1
+        """
+    )
+    row = await cursor.fetchone()
+    if row is None:
+        raise SystemExit("No workout plans to benchmark with; load some data first")
+
+    cursor = await conn.execute("SELECT token_id FROM refresh_tokens LIMIT 1")
+    token = await cursor.fetchone()
+    await conn.commit()
+
+    return {
+        "user_by_email": (row["email"],),
+        "plan_version": (row["plan_id"], row["user_id"]),
+        "refresh_token": (token["token_id"] if token else uuid.uuid4(),),
+        "plans_with_exercises": (row["user_id"], [row["plan_id"]]),
+    }
+
+
+async def bench(statement: statements.Statement, params, prepare: bool, repeat: int) -> float:
+    """Median milliseconds per execution, round trip included."""
+    # A threshold that's never reached keeps psycopg from preparing the plain SQL by itself
+    # (None would turn off prepare=True as well)
+    conn = await connection.connect_async(prepare_threshold=repeat + 1)
+    try:
+        timings = []
+        async with conn.cursor() as cursor:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                await cursor.execute(statement.query, params, prepare=prepare)
+                await cursor.fetchall()
+                timings.append(time.perf_counter() - started)
+                # Not rollback(): psycopg deallocates the prepared statements on rollback
+                await conn.commit()
+
+            cursor = await conn.execute("SELECT count(*) AS prepared FROM pg_prepared_statements")
+            prepared = (await cursor.fetchone())["prepared"]
+            assert prepared == (1 if prepare else 0), f"{prepared} statements were prepared"
+    finally:
+        await conn.close()
+    return statistics.median(timings) * 1000
+
+
+async def main(repeat: int):
+    conn = await connection.connect_async()
+    try:
+        params = await sample_params(conn)
+    finally:
+        await conn.close()
+
+    print(f"{'statement':<22} {'plain':>9} {'prepared':>9} {'saving':>8}  (median ms per execution)")
+    for name, statement in statements.registry.items():
+        plain = await bench(statement, params[name], prepare=False, repeat=repeat)
+        prepared = await bench(statement, params[name], prepare=True, repeat=repeat)
+        print(f"{name:<22} {plain:>9.3f} {prepared:>9.3f} {1 - prepared / plain:>8.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.repeat))
@@ -0,0 +1,587 @@
+"""Load tests the API with a mixed workload and reports throughput and latency per endpoint.
+
+Seeds a synthetic dataset through the API itself (users, workout plans, scheduled workouts and
+workout logs, the logs through the bulk import), then drives every router with a weighted mix
+of requests from `--concurrency` concurrent clients for `--duration` seconds. Throughput and
+p50/p95/p99 latency per endpoint are printed and written to a JSON file; with `--baseline`,
+the run is compared against an earlier one and fails if any endpoint's p95 got worse by more
+than `--tolerance`.
+
+Against a running server (`uvicorn app.main:app`), from the repository root:
+
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000 --users 20 --duration 60
+
+Or in-process, with the app and the clients sharing one event loop (no network, but the
+clients' own overhead counts against the app):
+
+    python -m benchmarks.load_test --in-process --output bench.json --baseline previous.json
+
+The dataset and the sequence of requests each client makes only depend on `--seed`.
+"""
+import argparse
+import asyncio
+import datetime
+import io
+import json
+import random
+import statistics
+import subprocess
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+PASSWORD = "1%0TmlkiA220"
+
+# Seeding requests in flight at once
+SEED_CONCURRENCY = 8
+
+
+class UserState:
+    """A seeded user's tokens and the ids of what they own, as the workload sees them."""
+
+    def __init__(self, email: str):
+        self.email = email
+        self.access_token = None
+        self.refresh_token = None
+        self.plan_ids = []
+        self.schedule_ids = []
+        self.log_ids = []
+        # Plans and schedules created during the run, which the workload may delete again
+        self.created_plan_ids = []
+        self.created_schedule_ids = []
+        # Refreshing a token twice at once would look like reuse and revoke the whole family
+        self.refresh_lock = asyncio.Lock()
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.access_token}"}
+
+
+class Recorder:
+    """Collects the latency and status of every request, by endpoint."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.failures = defaultdict(int)
+
+    def record(self, endpoint: str, latency: float, status_code: int | None):
+        self.latencies[endpoint].append(latency)
+        if status_code is None:
+            self.failures[endpoint] += 1
+        else:
+            self.statuses[endpoint][status_code] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint in sorted(self.latencies):
+            latencies = self.latencies[endpoint]
+            statuses = self.statuses[endpoint]
+            server_errors = sum(count for code, count in statuses.items() if code >= 500)
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "throughput_rps": round(len(latencies) / elapsed, 2),
+                "errors": server_errors + self.failures[endpoint],
+                "statuses": {str(code): count for code, count in sorted(statuses.items())},
+                **latency_stats(latencies),
+            }
+
+        all_latencies = [latency for values in self.latencies.values() for latency in values]
+        totals = {
+            "requests": len(all_latencies),
+            "throughput_rps": round(len(all_latencies) / elapsed, 2),
+            "errors": sum(endpoint["errors"] for endpoint in endpoints.values()),
+            **latency_stats(all_latencies),
+        }
+        return {"totals": totals, "endpoints": endpoints}
+
+
+def latency_stats(latencies: list[float]) -> dict:
+    """Mean, max and p50/p95/p99 latency, in milliseconds."""
+    if not latencies:
+        return {}
+    milliseconds = [latency * 1000 for latency in latencies]
+    if len(milliseconds) > 1:
+        cuts = statistics.quantiles(milliseconds, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = milliseconds[0]
+    return {
+        "mean_ms": round(statistics.fmean(milliseconds), 2),
+        "p50_ms": round(p50, 2),
+        "p95_ms": round(p95, 2),
+        "p99_ms": round(p99, 2),
+        "max_ms": round(max(milliseconds), 2),
+    }
+
+
+def plan_payload(rng: random.Random, exercise_ids: list[int], name: str) -> dict:
+    return {
+        "plan_name": name,
+        "description": "Load test plan",
+        "exercises": [
+            {
+                "exercise_id": exercise_id,
+                "sets": rng.randint(1, 5),
+                "reps": rng.randint(5, 15),
+                "weight": rng.choice((None, 10, 20, 40, 60)),
+                "comments": None,
+            }
+            for exercise_id in rng.sample(exercise_ids, rng.randint(2, 6))
+        ],
+    }
+
+
+def schedule_payload(rng: random.Random, plan_id: str) -> dict:
+    day = datetime.date.today() + datetime.timedelta(days=rng.randint(-180, 60))
+    return {
+        "plan_id": plan_id,
+        "scheduled_date": day.isoformat(),
+        "scheduled_time": f"{rng.randint(6, 21):02d}:{rng.choice((0, 15, 30, 45)):02d}:00",
+    }
+
+
+def logs_csv(rng: random.Random, schedule_ids: list[str], n_logs: int) -> bytes:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    lines = ["scheduled_workout_id,completed_at,total_time,notes"]
+    for _ in range(n_logs):
+        completed_at = now - datetime.timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+        lines.append(
+            f"{rng.choice(schedule_ids)},{completed_at.isoformat()},{rng.randint(10, 120)},Load test"
+        )
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def login(client: httpx.AsyncClient, user: UserState) -> httpx.Response:
+    response = await client.post("/login", data={"username": user.email, "password": PASSWORD})
+    if response.status_code == 202:
+        tokens = response.json()
+        user.access_token = tokens["access_token"]
+        user.refresh_token = tokens.get("refresh_token")
+    return response
+
+
+def check(response: httpx.Response, expected: int):
+    if response.status_code != expected:
+        raise SystemExit(
+            f"Seeding failed: {response.request.method} {response.request.url.path} "
+            f"returned {response.status_code}: {response.text[:500]}"
+        )
+
+
+async def seed_user(
+    client: httpx.AsyncClient, user: UserState, args, exercise_ids: list[int], seed: int
+):
+    rng = random.Random(seed)
+    check(
+        await client.post(
+            "/register",
+            json={"email": user.email, "first_name": "Load", "last_name": "Test", "password": PASSWORD},
+        ),
+        201,
+    )
+    check(await login(client, user), 202)
+
+    for number in range(args.plans):
+        response = await client.post(
+            "/workout-plans",
+            json=plan_payload(rng, exercise_ids, f"Plan {number}"),
+            headers=user.headers,
+        )
+        check(response, 201)
+        user.plan_ids.append(response.json()["plan_id"])
+
+    for _ in range(args.schedules):
+        response = await client.post(
+            "/scheduled-workouts",
+            json=schedule_payload(rng, rng.choice(user.plan_ids)),
+            headers=user.headers,
+        )
+        check(response, 201)
+        user.schedule_ids.append(response.json()["scheduled_workout_id"])
+
+    if args.logs and user.schedule_ids:
+        response = await client.post(
+            "/workout-logs/import",
+            files={"file": ("logs.csv", logs_csv(rng, user.schedule_ids, args.logs), "text/csv")},
+            headers=user.headers,
+        )
+        check(response, 201)
+        response = await client.get("/workout-logs", params={"limit": 50}, headers=user.headers)
+        check(response, 200)
+        user.log_ids = [log["log_id"] for log in response.json()]
+
+
+async def seed(client: httpx.AsyncClient, args) -> list[UserState]:
+    response = await client.get("/exercises")
+    check(response, 200)
+    exercise_ids = [exercise["exercise_id"] for exercise in response.json()]
+
+    # Emails are unique per run so the same database can be seeded again
+    run_id = uuid.uuid4().hex[:8]
+    users = [UserState(f"load-{run_id}-{number}@example.com") for number in range(args.users)]
+
+    semaphore = asyncio.Semaphore(SEED_CONCURRENCY)
+
+    async def seed_one(number: int, user: UserState):
+        async with semaphore:
+            await seed_user(client, user, args, exercise_ids, seed=args.seed * 100_003 + number)
+
+    await asyncio.gather(*(seed_one(number, user) for number, user in enumerate(users)))
+    return users
+
+
+class Workload:
+    """The weighted mix of requests each client makes. Every operation returns the endpoint
+    (method and route template) it is reported under and the response.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, exercise_ids: list[int]):
+        self.client = client
+        self.exercise_ids = exercise_ids
+        self.operations = [
+            (10, self.list_exercises),
+            (5, self.get_exercise),
+            (4, self.me),
+            (12, self.list_plans),
+            (10, self.get_plan),
+            (3, self.create_plan),
+            (2, self.update_plan),
+            (1, self.delete_plan),
+            (12, self.list_schedules),
+            (8, self.get_schedule),
+            (4, self.create_schedule),
+            (3, self.update_schedule),
+            (1, self.delete_schedule),
+            (10, self.list_logs),
+            (4, self.get_log),
+            (4, self.create_log),
+            (1, self.import_logs),
+            (1, self.export_logs),
+            (4, self.progress_report),
+            (3, self.progress_series),
+            (1, self.refresh_token),
+            (1, self.login),
+            (1, self.monitoring),
+        ]
+        self.weights = [weight for weight, _ in self.operations]
+
+    def pick(self, rng: random.Random):
+        return rng.choices(self.operations, weights=self.weights)[0][1]
+
+    async def list_exercises(self, rng, user):
+        return "GET /exercises", await self.client.get("/exercises")
+
+    async def get_exercise(self, rng, user):
+        exercise_id = rng.choice(self.exercise_ids)
+        return "GET /exercises/{exercise_id}", await self.client.get(f"/exercises/{exercise_id}")
+
+    async def me(self, rng, user):
+        return "GET /me", await self.client.get("/me", headers=user.headers)
+
+    async def list_plans(self, rng, user):
+        response = await self.client.get(
+            "/workout-plans", params={"limit": rng.choice((10, 20, 50))}, headers=user.headers
+        )
+        return "GET /workout-plans", response
+
+    async def get_plan(self, rng, user):
+        plan_id = rng.choice(user.plan_ids)
+        return "GET /workout-plans/{plan_id}", await self.client.get(
+            f"/workout-plans/{plan_id}", headers=user.headers
+        )
+
+    async def create_plan(self, rng, user):
+        response = await self.client.post(
+            "/workout-plans",
+            json=plan_payload(rng, self.exercise_ids, "Load test plan"),
+            headers=user.headers,
+        )
+        if response.status_code == 201:
+            user.created_plan_ids.append(response.json()["plan_id"])
+        return "POST /workout-plans", response
+
+    async def update_plan(self, rng, user):
+        plan_id = rng.choice(user.plan_ids)
+        return "PUT /workout-plans/{plan_id}", await self.client.put(
+            f"/workout-plans/{plan_id}",
+            json=plan_payload(rng, self.exercise_ids, "Updated load test plan"),
+            headers=user.headers,
+        )
+
+    async def delete_plan(self, rng, user):
+        if not user.created_plan_ids:
+            return await self.create_plan(rng, user)
+        plan_id = user.created_plan_ids.pop()
+        return "DELETE /workout-plans/{plan_id}", await self.client.delete(
+            f"/workout-plans/{plan_id}", headers=user.headers
+        )
+
+    async def list_schedules(self, rng, user):
+        response = await self.client.get(
+            "/scheduled-workouts",
+            params={
+                "workout_status": rng.choice(("all", "all", "pending", "missed", "completed")),
+                "limit": rng.choice((10, 20, 50)),
+            },
+            headers=user.headers,
+        )
+        return "GET /scheduled-workouts", response
+
+    async def get_schedule(self, rng, user):
+        schedule_id = rng.choice(user.schedule_ids)
+        return "GET /scheduled-workouts/{scheduled_workout_id}", await self.client.get(
+            f"/scheduled-workouts/{schedule_id}", headers=user.headers
+        )
+
+    async def create_schedule(self, rng, user):
+        response = await self.client.post(
+            "/scheduled-workouts",
+            json=schedule_payload(rng, rng.choice(user.plan_ids)),
+            headers=user.headers,
+        )
+        if response.status_code == 201:
+            user.created_schedule_ids.append(response.json()["scheduled_workout_id"])
+        return "POST /scheduled-workouts", response
+
+    async def update_schedule(self, rng, user):
+        schedule_id = rng.choice(user.schedule_ids)
+        day = datetime.date.today() + datetime.timedelta(days=rng.randint(1, 60))
+        return "PATCH /scheduled-workouts/{scheduled_workout_id}", await self.client.patch(
+            f"/scheduled-workouts/{schedule_id}",
+            json={"scheduled_date": day.isoformat()},
+            headers=user.headers,
+        )
+
+    async def delete_schedule(self, rng, user):
+        if not user.created_schedule_ids:
+            return await self.create_schedule(rng, user)
+        schedule_id = user.created_schedule_ids.pop()
+        return "DELETE /scheduled-workouts/{scheduled_workout_id}", await self.client.delete(
+            f"/scheduled-workouts/{schedule_id}", headers=user.headers
+        )
+
+    async def list_logs(self, rng, user):
+        response = await self.client.get(
+            "/workout-logs", params={"limit": rng.choice((10, 20, 50))}, headers=user.headers
+        )
+        return "GET /workout-logs", response
+
+    async def get_log(self, rng, user):
+        if not user.log_ids:
+            return await self.list_logs(rng, user)
+        log_id = rng.choice(user.log_ids)
+        return "GET /workout-logs/{log_id}", await self.client.get(
+            f"/workout-logs/{log_id}", headers=user.headers
+        )
+
+    async def create_log(self, rng, user):
+        completed_at = datetime.datetime.now(datetime.timezone.utc)
+        return "POST /workout-logs", await self.client.post(
+            "/workout-logs",
+            json={
+                "scheduled_workout_id": rng.choice(user.schedule_ids),
+                "completed_at": completed_at.isoformat(),
+                "total_time": rng.randint(10, 120),
+                "notes": "Load test",
+            },
+            headers=user.headers,
+        )
+
+    async def import_logs(self, rng, user):
+        upload = io.BytesIO(logs_csv(rng, user.schedule_ids, 20))
+        return "POST /workout-logs/import", await self.client.post(
+            "/workout-logs/import",
+            files={"file": ("logs.csv", upload, "text/csv")},
+            headers=user.headers,
+        )
+
+    async def export_logs(self, rng, user):
+        params = {"format": rng.choice(("ndjson", "csv"))}
+        return "GET /workout-logs/export", await self.client.get(
+            "/workout-logs/export", params=params, headers=user.headers
+        )
+
+    async def progress_report(self, rng, user):
+        return "GET /reports/progress", await self.client.get(
+            "/reports/progress", headers=user.headers
+        )
+
+    async def progress_series(self, rng, user):
+        return "GET /reports/progress/series", await self.client.get(
+            "/reports/progress/series",
+            params={"period": rng.choice(("week", "month"))},
+            headers=user.headers,
+        )
+
+    async def refresh_token(self, rng, user):
+        async with user.refresh_lock:
+            response = await self.client.post(
+                "/token/refresh", json={"refresh_token": user.refresh_token}
+            )
+            if response.status_code == 200:
+                tokens = response.json()
+                user.access_token = tokens["access_token"]
+                user.refresh_token = tokens["refresh_token"]
+        return "POST /token/refresh", response
+
+    async def login(self, rng, user):
+        async with user.refresh_lock:
+            response = await login(self.client, user)
+        return "POST /login", response
+
+    async def monitoring(self, rng, user):
+        path = rng.choice(("/monitoring/db-pool", "/monitoring/token-cache", "/metrics"))
+        return f"GET {path}", await self.client.get(path)
+
+
+async def run_client(
+    workload: Workload, users: list[UserState], recorder: Recorder, seed: int, deadline: float
+):
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        user = rng.choice(users)
+        operation = workload.pick(rng)
+        started = time.perf_counter()
+        try:
+            endpoint, response = await operation(rng, user)
+            status_code = response.status_code
+        except httpx.HTTPError:
+            endpoint, status_code = operation.__name__, None
+        recorder.record(endpoint, time.perf_counter() - started, status_code)
+
+
+async def drive(client: httpx.AsyncClient, users: list[UserState], args) -> dict:
+    response = await client.get("/exercises")
+    workload = Workload(client, [exercise["exercise_id"] for exercise in response.json()])
+
+    if args.warmup:
+        deadline = time.perf_counter() + args.warmup
+        await asyncio.gather(
+            *(
+                run_client(workload, users, Recorder(), -number - 1, deadline)
+                for number in range(args.concurrency)
+            )
+        )
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(
+        *(
+            run_client(workload, users, recorder, args.seed * 1009 + number, deadline)
+            for number in range(args.concurrency)
+        )
+    )
+    return recorder.summary(time.perf_counter() - started)
+
+
+async def run(args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency + SEED_CONCURRENCY)
+    timeout = httpx.Timeout(args.timeout)
+
+    if args.in_process:
+        from app.main import app
+
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://load-test", timeout=timeout
+            ) as client:
+                users = await seed(client, args)
+                return await drive(client, users, args)
+
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+        users = await seed(client, args)
+        return await drive(client, users, args)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Endpoints whose p95 latency is more than `tolerance` (a fraction) above the baseline's."""
+    regressions = []
+    for endpoint, stats in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(endpoint)
+        if not previous or not previous.get("p95_ms"):
+            continue
+        if stats["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{endpoint}: p95 {previous['p95_ms']} ms -> {stats['p95_ms']} ms"
+            )
+    return regressions
+
+
+def print_table(results: dict):
+    print(f"{'endpoint':<52} {'reqs':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errs':>5}")
+    rows = list(results["endpoints"].items()) + [("TOTAL", results["totals"])]
+    for endpoint, stats in rows:
+        print(
+            f"{endpoint:<52} {stats['requests']:>6} {stats['throughput_rps']:>8} "
+            f"{stats.get('p50_ms', 0):>8} {stats.get('p95_ms', 0):>8} "
+            f"{stats.get('p99_ms', 0):>8} {stats['errors']:>5}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--base-url", default="http://127.0.0.1:8000")
+    target.add_argument(
+        "--in-process", action="store_true", help="run the app in this process instead"
+    )
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--plans", type=int, default=5, help="workout plans per user")
+    parser.add_argument("--schedules", type=int, default=20, help="scheduled workouts per user")
+    parser.add_argument("--logs", type=int, default=200, help="workout logs per user")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds measured")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds run before measuring")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="load_test_results.json")
+    parser.add_argument("--baseline", help="results of an earlier run to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="allowed p95 increase over the baseline"
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    results = {
+        "run": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "target": "in-process" if args.in_process else args.base_url,
+            "dataset": {
+                "users": args.users,
+                "plans_per_user": args.plans,
+                "schedules_per_user": args.schedules,
+                "logs_per_user": args.logs,
+            },
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "seed": args.seed,
+        },
+        **results,
+    }
+
+    print_table(results)
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        if regressions:
+            raise SystemExit("Latency regressions:\n  " + "\n  ".join(regressions))
+        print(f"No endpoint's p95 regressed by more than {args.tolerance:.0%}")
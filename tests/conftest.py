@@ -0,0 +1,60 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+import pytest
+
+# The app reads its settings at import; these let the tests run without a .env or a database
+os.environ.setdefault("DATABASE_HOSTNAME", "localhost")
+os.environ.setdefault("DATABASE_PORT", "5432")
+os.environ.setdefault("DATABASE_PASSWORD", "postgres")
+os.environ.setdefault("DATABASE_USERNAME", "postgres")
+os.environ.setdefault("DATABASE_NAME", "workout_test")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRES_MINUTES", "30")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("LOG_FILE", "")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core import security  # noqa: E402
+from app.core.catalog import exercise_catalog  # noqa: E402
+from app.db import connection  # noqa: E402
+from app.main import app  # noqa: E402
+from app.schemas import users_schemas  # noqa: E402
+from tests.fakes import EXERCISES, USER_ID, FakeConnection, FakeCursor  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def loaded_catalog():
+    """Fills the exercise catalog the way the lifespan would, from a fake cursor."""
+
+    def respond(query, params):
+        if "exercise_catalog_version" in query:
+            return [{"version": 1}]
+        return EXERCISES
+
+    asyncio.run(exercise_catalog.load(FakeCursor(respond)))
+
+
+@pytest.fixture
+def fake_db():
+    """Serves get_async_db from a FakeCursor (returned; set its `respond`) and logs in a test user."""
+    cursor = FakeCursor()
+
+    @asynccontextmanager
+    async def get_fake_db():
+        yield FakeConnection(), cursor
+
+    app.dependency_overrides[connection.get_async_db] = get_fake_db
+    app.dependency_overrides[security.get_current_user] = lambda: users_schemas.TokenData(
+        user_id=USER_ID
+    )
+    yield cursor
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def client():
+    # Not used as a context manager, so the lifespan (pools, background tasks) never runs
+    return TestClient(app)
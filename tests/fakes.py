@@ -0,0 +1,167 @@
+"""Stand-ins for the database, so the endpoints can be tested without one."""
+import copy
+import datetime
+import uuid
+
+from app.core import metrics, query_stats
+
+USER_ID = str(uuid.UUID(int=1))
+UPDATED_AT = datetime.datetime(2024, 1, 1, 8, 30)
+
+EXERCISES = [
+    {"exercise_id": exercise_id, "name": f"Exercise {exercise_id}",
+     "description": "A test exercise.", "category": "strength"}
+    for exercise_id in range(1, 17)
+]
+
+
+class FakeConnection:
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+class FakeCursor:
+    """Stands in for the instrumented AsyncCursor of get_async_db, without a database.
+
+    Each statement is answered by `respond(query, params)`, with the query's whitespace
+    collapsed, and counted in the current request's query stats as taking `duration` seconds,
+    the way the real cursor records it.
+    """
+
+    def __init__(self, respond=None, duration: float = 0.0):
+        self.respond = respond or (lambda query, params: [])
+        self.duration = duration
+        self.rowcount = -1
+        self._rows = []
+
+    async def execute(self, query, params=None, **kwargs):
+        if not isinstance(query, str):
+            query = query.as_string(None)
+        self._rows = list(self.respond(" ".join(query.split()), params))
+        self.rowcount = len(self._rows)
+        query_stats.record_query(f"tests:{metrics.sql_verb(query)}", self.duration)
+
+    async def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    async def fetchall(self):
+        return self._rows
+
+
+def make_plan(number: int, exercises_per_plan: int) -> dict:
+    """A row as the plan queries return it, exercises aggregated into a list."""
+    return {
+        "plan_id": str(uuid.UUID(int=1000 + number)),
+        "user_id": USER_ID,
+        "plan_name": f"Plan {number}",
+        "description": "A test plan",
+        "created_at": UPDATED_AT + datetime.timedelta(minutes=number),
+        "updated_at": UPDATED_AT,
+        "exercises": [
+            {"exercise_id": position % 16 + 1, "sets": 3, "reps": 10, "weight": None,
+             "comments": None}
+            for position in range(exercises_per_plan)
+        ],
+    }
+
+
+def plans_responder(n_plans: int, exercises_per_plan: int):
+    """Answers the workout plan endpoints' statements for a user with `n_plans` plans."""
+    plans = [make_plan(number, exercises_per_plan) for number in range(n_plans)]
+
+    def respond(query, params):
+        if query.startswith("SELECT plans_version"):
+            return [{"plans_version": 1, "schedules_version": 1, "overdue": False}]
+        if query.startswith("SELECT updated_at FROM workout_plans"):
+            return [{"updated_at": UPDATED_AT}] if plans else []
+        if "FROM workout_plans" in query:
+            # The endpoints fill the rows in, so every query gets its own copies
+            return copy.deepcopy(plans)
+        raise AssertionError(f"Unexpected query: {query}")
+
+    return respond
+
+
+# A plan with a single exercise, as sent to create or update one
+PLAN_BODY = {"plan_name": "Plan 0", "description": "A test plan",
+             "exercises": [{"exercise_id": 1, "sets": 3, "reps": 10}]}
+
+
+def plan_writes_responder():
+    """Answers creating, updating or deleting the plan of make_plan(0, 1), with PLAN_BODY's
+    exercise stored as sent.
+    """
+    plan = {key: value for key, value in make_plan(0, 1).items() if key != "exercises"}
+    stored = [{"position": 0, "exercise_id": 1, "sets": 3, "reps": 10, "weight": None,
+               "comments": None}]
+
+    def respond(query, params):
+        if query.startswith("SELECT version FROM exercise_catalog_version"):
+            return [{"version": 1}]
+        if query.startswith(
+            ("INSERT INTO workout_plans", "UPDATE workout_plans", "DELETE FROM workout_plans")
+        ):
+            return [dict(plan)]
+        if query.startswith(("INSERT INTO workout_plan_exercises", "SELECT position")):
+            return [dict(row) for row in stored]
+        raise AssertionError(f"Unexpected query: {query}")
+
+    return respond
+
+
+def make_schedule(number: int, scheduled_date: datetime.date, scheduled_time: datetime.time) -> dict:
+    """A row as the scheduled workout queries return it, for the plan of make_plan(0, ...)."""
+    return {
+        "scheduled_workout_id": str(uuid.UUID(int=2000 + number)),
+        "plan_id": make_plan(0, 1)["plan_id"],
+        "user_id": USER_ID,
+        "scheduled_date": scheduled_date,
+        "scheduled_time": scheduled_time,
+        "status": "pending",
+        "created_at": UPDATED_AT,
+    }
+
+
+def schedules_responder(schedules: list[dict]):
+    """Answers the scheduled workout listing's statements for a user with `schedules`.
+
+    The listing is served in the order and from the keyset cursor the query asks for (date
+    ascending, then time and ID descending), so pages can be followed from one to the next.
+    Each listing's parameters are appended to the responder's `listings`.
+    """
+    ordered = sorted(
+        schedules,
+        key=lambda s: (s["scheduled_time"], uuid.UUID(s["scheduled_workout_id"])),
+        reverse=True,
+    )
+    ordered.sort(key=lambda s: s["scheduled_date"])
+    plan = make_plan(0, 1)
+
+    def respond(query, params):
+        if query.startswith("SELECT plans_version"):
+            return [{"plans_version": 1, "schedules_version": 1, "overdue": False}]
+        if "FROM scheduled_workouts" in query:
+            respond.listings.append(params)
+            *keyset, limit, skip = params[1:]
+            rows = ordered
+            if keyset:
+                after_date, _, _, after_time, after_id = keyset
+                after_date = datetime.date.fromisoformat(after_date)
+                after = (datetime.time.fromisoformat(after_time), uuid.UUID(after_id))
+                rows = [
+                    s for s in rows
+                    if s["scheduled_date"] > after_date or (
+                        s["scheduled_date"] == after_date
+                        and (s["scheduled_time"], uuid.UUID(s["scheduled_workout_id"])) < after
+                    )
+                ]
+            return copy.deepcopy(rows[skip:skip + limit])
+        if "FROM workout_plans" in query:
+            return [copy.deepcopy(plan)]
+        raise AssertionError(f"Unexpected query: {query}")
+
+    respond.listings = []
+    return respond
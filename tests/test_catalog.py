@@ -0,0 +1,52 @@
+import asyncio
+
+from app.core.catalog import ExerciseCatalog
+
+from tests.fakes import EXERCISES, FakeCursor
+
+
+def catalog_db(state: dict):
+    """A FakeCursor over an exercises table at `state["version"]`, logging the queries it gets."""
+    queries = []
+
+    def respond(query, params):
+        queries.append(query)
+        if "exercise_catalog_version" in query:
+            return [{"version": state["version"]}]
+        return EXERCISES[: state["exercises"]]
+
+    return FakeCursor(respond), queries
+
+
+def test_unknown_exercise_only_checks_the_version():
+    state = {"version": 1, "exercises": 16}
+    cursor, queries = catalog_db(state)
+    catalog = ExerciseCatalog()
+    asyncio.run(catalog.load(cursor))
+    queries.clear()
+
+    for _ in range(3):
+        assert asyncio.run(catalog.lookup_many([1, 999], cursor)).keys() == {1}
+
+    assert queries == ["SELECT version FROM exercise_catalog_version"] * 3
+
+
+def test_unknown_exercise_reloads_a_stale_catalog():
+    state = {"version": 1, "exercises": 15}
+    cursor, queries = catalog_db(state)
+    catalog = ExerciseCatalog()
+    asyncio.run(catalog.load(cursor))
+
+    state.update(version=2, exercises=16)
+    assert asyncio.run(catalog.lookup_many([16], cursor)).keys() == {16}
+    assert catalog.version == 2
+
+
+def test_plan_with_unknown_exercise_is_rejected(client, fake_db):
+    fake_db.respond = lambda query, params: [{"version": 1}]
+    response = client.post(
+        "/workout-plans",
+        json={"plan_name": "P", "exercises": [{"exercise_id": 999, "sets": 3, "reps": 10}]},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Exercise id 999 does not exist"
@@ -0,0 +1,43 @@
+import gzip
+
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware
+
+
+def make_client(body: bytes):
+    """A client for an app serving `body` as JSON at /catalog (cached) and /other."""
+    api = FastAPI()
+
+    @api.get("/catalog")
+    @api.get("/other")
+    async def serve():
+        return Response(body, media_type="application/json")
+
+    middleware = CompressionMiddleware(api, minimum_size=1024, cached_paths=["/catalog"])
+    return middleware, TestClient(middleware)
+
+
+def test_compresses_large_bodies_only():
+    middleware, client = make_client(b"[" + b"1," * 1000 + b"1]")
+    response = client.get("/other", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json() == [1] * 1001
+
+    middleware.minimum_size = 10_000
+    response = client.get("/other", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_cache_ignores_the_query_string():
+    body = b"[" + b"1," * 1000 + b"1]"
+    middleware, client = make_client(body)
+
+    for number in range(20):
+        response = client.get(f"/catalog?junk={number}", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json() == [1] * 1001
+
+    assert list(middleware._cache) == [("/catalog", "gzip")]
+    assert gzip.decompress(middleware._cache[("/catalog", "gzip")][1]) == body
@@ -0,0 +1,132 @@
+import datetime
+
+import pytest
+
+from app.core.query_stats import assert_max_queries
+
+from tests.fakes import (
+    PLAN_BODY,
+    make_plan,
+    make_schedule,
+    plan_writes_responder,
+    plans_responder,
+    schedules_responder,
+)
+
+PLAN_PATH = f"/workout-plans/{make_plan(0, 1)['plan_id']}"
+SCHEDULES_PATH = "/scheduled-workouts?workout_status=all"
+
+
+def versioned(respond, version: dict):
+    """Answers the user data version lookup from `version`, and bumps it on every write to
+    the plans the way the triggers of migration 009 do.
+    """
+    write_responder = plan_writes_responder()
+
+    def answer(query, params):
+        if query.startswith("SELECT plans_version"):
+            return [dict(version)]
+        if query.startswith(("INSERT", "UPDATE", "DELETE")):
+            version["plans_version"] += 1
+            version["schedules_version"] += 1
+        if query.startswith(("INSERT", "UPDATE", "DELETE", "SELECT position", "SELECT version")):
+            return write_responder(query, params)
+        return respond(query, params)
+
+    return answer
+
+
+@pytest.fixture
+def version():
+    return {"plans_version": 3, "schedules_version": 5, "overdue": False}
+
+
+@pytest.fixture
+def plans_db(fake_db, version):
+    fake_db.respond = versioned(plans_responder(2, 1), version)
+    return fake_db
+
+
+@pytest.fixture
+def schedules_db(fake_db, version):
+    schedule = make_schedule(0, datetime.date(2030, 1, 1), datetime.time(7))
+    fake_db.respond = versioned(schedules_responder([schedule]), version)
+    return fake_db
+
+
+def revalidate(client, path: str, etag: str):
+    return client.get(path, headers={"If-None-Match": etag})
+
+
+def test_plan_list_is_not_modified_from_the_version_alone(client, plans_db):
+    first = client.get("/workout-plans")
+    assert first.status_code == 200
+    assert "last-modified" not in first.headers
+
+    with assert_max_queries(1):
+        again = revalidate(client, "/workout-plans", first.headers["etag"])
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == first.headers["etag"]
+
+
+@pytest.mark.parametrize(
+    "method, kwargs",
+    [("put", {"json": PLAN_BODY}), ("delete", {})],
+    ids=["update", "delete"],
+)
+def test_plan_list_changes_after_a_write(client, plans_db, method, kwargs):
+    etag = client.get("/workout-plans").headers["etag"]
+
+    assert client.request(method, PLAN_PATH, **kwargs).status_code in (200, 204)
+    response = revalidate(client, "/workout-plans", etag)
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_schedule_list_changes_after_its_plan_is_updated(client, schedules_db):
+    etag = client.get(SCHEDULES_PATH).headers["etag"]
+    assert revalidate(client, SCHEDULES_PATH, etag).status_code == 304
+
+    assert client.put(PLAN_PATH, json=PLAN_BODY).status_code == 200
+    assert revalidate(client, SCHEDULES_PATH, etag).status_code == 200
+
+
+def test_schedule_list_with_an_unswept_overdue_workout_is_sent_in_full(
+    client, schedules_db, version
+):
+    etag = client.get(SCHEDULES_PATH).headers["etag"]
+
+    version["overdue"] = True
+    response = revalidate(client, SCHEDULES_PATH, etag)
+
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+
+
+def test_plan_is_not_modified_since_its_last_update(client, plans_db):
+    last_modified = client.get(PLAN_PATH).headers["last-modified"]
+    assert last_modified == "Mon, 01 Jan 2024 08:30:00 GMT"
+
+    assert client.get(PLAN_PATH, headers={"If-Modified-Since": last_modified}).status_code == 304
+    earlier = "Mon, 01 Jan 2024 08:29:59 GMT"
+    assert client.get(PLAN_PATH, headers={"If-Modified-Since": earlier}).status_code == 200
+
+
+def test_plan_changed_this_second_has_no_last_modified(client, plans_db):
+    respond = plans_db.respond
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+    def recently_updated(query, params):
+        if query.startswith("SELECT updated_at FROM workout_plans"):
+            return [{"updated_at": now}]
+        return respond(query, params)
+
+    plans_db.respond = recently_updated
+    # A later change in this same second would have the same HTTP date
+    since = now.strftime("%a, %d %b %Y %H:%M:%S GMT")
+    response = client.get(PLAN_PATH, headers={"If-Modified-Since": since})
+
+    assert response.status_code == 200
+    assert "last-modified" not in response.headers
@@ -0,0 +1,85 @@
+import csv
+import datetime
+import io
+import uuid
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import orjson
+import pytest
+
+from app.db import connection
+
+from tests.fakes import USER_ID, FakeConnection
+
+LOGS = [
+    {
+        "log_id": str(uuid.UUID(int=3000 + number)),
+        "scheduled_workout_id": str(uuid.UUID(int=2000)),
+        "completed_at": datetime.datetime(2024, 9, 1 + number, 9, 0, 0, 250000, datetime.timezone.utc),
+        "total_time": 45,
+        "notes": f"Log {number}",
+    }
+    for number in range(3)
+]
+
+
+class ExportCursor:
+    """A named cursor over LOGS, handed out two rows at a time."""
+
+    description = [SimpleNamespace(name=name) for name in LOGS[0]]
+
+    def __init__(self):
+        self._rows = list(LOGS)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, query, params=None):
+        assert params == (USER_ID,)
+
+    async def fetchmany(self, size):
+        rows, self._rows = self._rows[:2], self._rows[2:]
+        return rows
+
+
+class ExportConnection(FakeConnection):
+    def cursor(self, name=None):
+        return ExportCursor()
+
+
+@pytest.fixture
+def export_db(fake_db, monkeypatch):
+    # The export borrows its connection directly rather than through Depends
+    @asynccontextmanager
+    async def get_export_db():
+        yield ExportConnection(), fake_db
+
+    monkeypatch.setattr(connection, "get_async_db", get_export_db)
+
+
+def test_ndjson_export_matches_the_json_responses(client, export_db):
+    response = client.get("/workout-logs/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert len(lines) == len(LOGS)
+    assert orjson.loads(lines[0]) == {
+        "log_id": LOGS[0]["log_id"],
+        "scheduled_workout_id": LOGS[0]["scheduled_workout_id"],
+        "completed_at": "2024-09-01T09:00:00.250000Z",
+        "total_time": 45,
+        "notes": "Log 0",
+    }
+
+
+def test_csv_export_has_a_header_and_every_row(client, export_db):
+    response = client.get("/workout-logs/export?format=csv")
+
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["notes"] for row in rows] == ["Log 0", "Log 1", "Log 2"]
@@ -0,0 +1,47 @@
+import asyncio
+
+from psycopg import sql
+
+from app.core import metrics
+from app.db import statements
+
+
+def execute(query):
+    """Stands in for a cursor's execute: query_name looks two frames up, past it."""
+    return metrics.query_name(query)
+
+
+def list_things():
+    return execute("\n  -- the things\n  select * from things")
+
+
+def test_names_queries_after_the_calling_function_and_verb():
+    assert list_things() == "tests.test_metrics.list_things:SELECT"
+    assert metrics.query_name(sql.SQL("DELETE FROM things"), "things.purge") == "things.purge:DELETE"
+
+
+def test_looks_up_each_call_site_once():
+    list_things()
+    cached = len(metrics._query_callers)
+
+    for _ in range(3):
+        assert list_things() == "tests.test_metrics.list_things:SELECT"
+    assert len(metrics._query_callers) == cached
+
+
+def test_sql_verb_of_composed_queries():
+    query = sql.SQL("UPDATE {} SET a = 1").format(sql.Identifier("things"))
+    assert metrics.sql_verb(query) == "UPDATE"
+    assert metrics.sql_verb(b"insert into things values (1)") == "INSERT"
+    assert metrics.sql_verb("-- nothing but a comment") == "?"
+
+
+def test_prepared_statements_are_named_after_the_statement():
+    class Cursor:
+        async def execute(self, query, params=None, **kwargs):
+            self.name = metrics.query_name(query, kwargs.get("query_name"))
+
+    cursor = Cursor()
+    asyncio.run(statements.USER_BY_EMAIL.execute(cursor, ("user@example.com",)))
+
+    assert cursor.name == "app.db.statements.user_by_email:SELECT"
@@ -0,0 +1,84 @@
+import datetime
+
+import pytest
+
+from app.core import pagination
+
+from tests.fakes import make_schedule, schedules_responder
+
+DAY = datetime.date(2030, 1, 1)
+SCHEDULES_PATH = "/scheduled-workouts?workout_status=all"
+
+
+def at(days: int, hour: int) -> tuple[datetime.date, datetime.time]:
+    return DAY + datetime.timedelta(days=days), datetime.time(hour)
+
+
+# Two days with three workouts each, and two at the same time on the second day
+SCHEDULES = [
+    make_schedule(number, *when)
+    for number, when in enumerate(
+        [at(1, 7), at(0, 18), at(1, 18), at(0, 7), at(0, 12), at(1, 18)]
+    )
+]
+
+
+@pytest.fixture
+def schedules_db(fake_db):
+    fake_db.respond = schedules_responder(SCHEDULES)
+    return fake_db
+
+
+def listed(response) -> list[tuple[str, str]]:
+    return [(s["scheduled_date"], s["scheduled_time"]) for s in response.json()]
+
+
+def test_cursor_round_trip():
+    token = pagination.encode_cursor(DAY, datetime.time(7, 30), "an-id")
+    assert pagination.decode_cursor(token, 3) == ["2030-01-01", "07:30:00", "an-id"]
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        "not-a-cursor",
+        pagination.encode_cursor("2030-01-01", "07:30:00"),
+        pagination.encode_cursor("2030-01-01", "07:30:00", "an-id")[:-2] + "xx",
+    ],
+)
+def test_tampered_cursor_is_rejected(token):
+    with pytest.raises(pagination.HTTPException) as raised:
+        pagination.decode_cursor(token, 3)
+    assert raised.value.status_code == 400
+
+
+def test_pages_follow_each_other_in_schedule_order(client, schedules_db):
+    pages, after = [], None
+    while True:
+        response = client.get(SCHEDULES_PATH + "&limit=2" + (f"&after={after}" if after else ""))
+        assert response.status_code == 200, response.text
+        pages.append(listed(response))
+        after = response.headers.get(pagination.NEXT_CURSOR_HEADER)
+        if not after:
+            break
+
+    # By date, latest time first within a day, each workout exactly once
+    assert pages == [
+        [("2030-01-01", "18:00:00"), ("2030-01-01", "12:00:00")],
+        [("2030-01-01", "07:00:00"), ("2030-01-02", "18:00:00")],
+        [("2030-01-02", "18:00:00"), ("2030-01-02", "07:00:00")],
+    ]
+    # Each page fetched one row beyond the limit to tell whether another page follows
+    assert [params[-2] for params in schedules_db.respond.listings] == [3, 3, 3]
+
+
+def test_next_cursor_only_when_more_rows_follow(client, schedules_db):
+    assert pagination.NEXT_CURSOR_HEADER in client.get(SCHEDULES_PATH + "&limit=5").headers
+    assert pagination.NEXT_CURSOR_HEADER not in client.get(SCHEDULES_PATH + "&limit=6").headers
+
+
+def test_tampered_after_is_a_bad_request(client, schedules_db):
+    response = client.get(SCHEDULES_PATH + "&after=not-a-cursor")
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid pagination cursor"}
@@ -0,0 +1,41 @@
+import asyncio
+from decimal import Decimal
+
+from app.core.utils import replace_plan_exercises
+
+from tests.fakes import FakeCursor
+
+PLAN_ID = "00000000-0000-0000-0000-000000000001"
+
+
+def stored_row(position: int, weight) -> dict:
+    return {"position": position, "exercise_id": 1, "sets": 3, "reps": 10, "weight": weight,
+            "comments": None}
+
+
+def replace(stored: list[dict], rows: list[tuple]) -> list[str]:
+    """Runs replace_plan_exercises against `stored` and returns the verbs of its statements."""
+    verbs = []
+
+    def respond(query, params):
+        verbs.append(query.split()[0])
+        return stored if query.startswith("SELECT") else []
+
+    asyncio.run(replace_plan_exercises(PLAN_ID, rows, FakeCursor(respond)))
+    return verbs
+
+
+def test_weight_with_more_than_two_decimals_is_unchanged():
+    # 12.345 is stored as 12.35, so sending it again changes nothing
+    assert replace([stored_row(0, Decimal("12.35"))], [(0, 1, 3, 10, 12.345, None)]) == ["SELECT"]
+
+
+def test_changed_weight_is_updated():
+    assert replace([stored_row(0, Decimal("12.35"))], [(0, 1, 3, 10, 12.5, None)]) == [
+        "SELECT",
+        "UPDATE",
+    ]
+
+
+def test_missing_weight_matches_null():
+    assert replace([stored_row(0, None)], [(0, 1, 3, 10, None, None)]) == ["SELECT"]
@@ -0,0 +1,137 @@
+import threading
+
+import pytest
+
+from app.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    """Enough of a psycopg2 connection for the pool: reset, close and a health check."""
+
+    def __init__(self):
+        self.closed = False
+        self.resets = 0
+        self.healthy = True
+
+    def reset(self):
+        self.resets += 1
+
+    def close(self):
+        self.closed = True
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                return False
+
+            def execute(self, query):
+                if not connection.healthy:
+                    raise RuntimeError("server closed the connection unexpectedly")
+
+        return Cursor()
+
+    def rollback(self):
+        pass
+
+
+class Connector:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.opened = []
+
+    def __call__(self):
+        if self.fail:
+            raise RuntimeError("could not connect to server")
+        conn = FakeConnection()
+        self.opened.append(conn)
+        return conn
+
+
+def make_pool(connector=None, **kwargs):
+    kwargs = {"min_size": 1, "max_size": 2, "timeout": 0.2, "reconnect_delay": 0.05, **kwargs}
+    return ConnectionPool(connector or Connector(), **kwargs)
+
+
+def test_opens_connections_lazily_up_to_max_size():
+    connector = Connector()
+    pool = make_pool(connector)
+    assert connector.opened == []
+
+    first, second = pool.getconn(), pool.getconn()
+    assert connector.opened == [first, second]
+    assert pool.get_stats()["in_use"] == 2
+
+
+def test_times_out_when_every_connection_is_in_use():
+    pool = make_pool()
+    pool.getconn()
+    pool.getconn()
+
+    with pytest.raises(PoolTimeout, match="Timed out"):
+        pool.getconn()
+    assert pool.get_stats()["timeouts"] == 1
+
+
+def test_waiter_gets_a_returned_connection():
+    pool = make_pool(max_size=1, timeout=2)
+    conn = pool.getconn()
+    threading.Timer(0.05, pool.putconn, (conn,)).start()
+
+    assert pool.getconn() is conn
+
+
+def test_reuses_and_resets_returned_connections():
+    connector = Connector()
+    pool = make_pool(connector)
+    conn = pool.getconn()
+    pool.putconn(conn)
+
+    assert conn.resets == 1
+    assert pool.getconn() is conn
+    assert len(connector.opened) == 1
+
+
+def test_connect_failure_raises_pool_timeout():
+    pool = make_pool(Connector(fail=True))
+
+    with pytest.raises(PoolTimeout, match="could not connect to server"):
+        pool.getconn()
+    # The slot it tried to fill is free again
+    assert pool.get_stats()["size"] == 0
+
+
+def test_replaces_connections_that_fail_their_health_check():
+    connector = Connector()
+    pool = make_pool(connector, check_interval=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.healthy = False
+
+    replacement = pool.getconn()
+    assert replacement is not conn
+    assert conn.closed
+
+
+def test_recycles_connections_past_their_lifetime():
+    pool = make_pool(max_lifetime=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+
+    assert conn.closed
+    assert pool.getconn() is not conn
+
+
+def test_close_discards_idle_connections_and_refuses_checkouts():
+    pool = make_pool()
+    conn = pool.getconn()
+    pool.putconn(conn)
+    pool.close()
+
+    assert conn.closed
+    with pytest.raises(PoolTimeout, match="closed"):
+        pool.getconn()
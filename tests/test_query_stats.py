@@ -0,0 +1,87 @@
+import logging
+
+import pytest
+
+from app.core.config import settings
+from app.core.query_stats import assert_max_queries
+
+from tests.fakes import make_plan, plans_responder
+
+PLAN_PATH = f"/workout-plans/{make_plan(0, 1)['plan_id']}"
+
+
+@pytest.fixture
+def plan_db(fake_db):
+    """A user with one plan; GET PLAN_PATH runs two statements of 10ms each."""
+    fake_db.respond = plans_responder(1, 3)
+    fake_db.duration = 0.01
+    return fake_db
+
+
+def query_stats_warnings(caplog):
+    return [
+        record for record in caplog.records
+        if record.name == "app.core.query_stats" and record.levelno == logging.WARNING
+    ]
+
+
+def test_counts_each_requests_queries_and_database_time(client, plan_db):
+    with assert_max_queries(2) as seen:
+        client.get(PLAN_PATH)
+        client.get(PLAN_PATH)
+
+    assert [(method, path) for method, path, _ in seen] == [("GET", PLAN_PATH)] * 2
+    for _, _, stats in seen:
+        assert stats.count == 2
+        assert stats.total_time == pytest.approx(0.02)
+        assert stats.slowest_time == pytest.approx(0.01)
+
+
+def test_assert_max_queries_fails_over_budget(client, plan_db):
+    with pytest.raises(AssertionError, match=f"at most 1 queries .*GET {PLAN_PATH}: 2 queries"):
+        with assert_max_queries(1):
+            client.get(PLAN_PATH)
+
+
+def test_no_warning_within_limits(client, plan_db, caplog):
+    caplog.set_level(logging.WARNING, logger="app.core.query_stats")
+    client.get(PLAN_PATH)
+    assert query_stats_warnings(caplog) == []
+
+
+def test_warns_about_requests_over_query_count(client, plan_db, caplog, monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_COUNT_WARNING", 1)
+    caplog.set_level(logging.WARNING, logger="app.core.query_stats")
+
+    client.get(PLAN_PATH)
+
+    [warning] = query_stats_warnings(caplog)
+    assert warning.query_count == 2
+    assert warning.path == PLAN_PATH
+
+
+def test_warns_about_requests_over_database_time(client, plan_db, caplog, monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_TIME_WARNING", 0.015)
+    caplog.set_level(logging.WARNING, logger="app.core.query_stats")
+
+    client.get(PLAN_PATH)
+
+    [warning] = query_stats_warnings(caplog)
+    assert warning.db_time_ms == pytest.approx(20.0)
+
+
+def test_warns_about_slow_statements(client, plan_db, caplog, monkeypatch):
+    monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD", 0.005)
+    caplog.set_level(logging.WARNING, logger="app.core.query_stats")
+
+    client.get(PLAN_PATH)
+
+    assert [record.duration_ms for record in query_stats_warnings(caplog)] == [10.0, 10.0]
+
+
+def test_server_timing_header_only_in_debug(client, plan_db, monkeypatch):
+    assert "server-timing" not in client.get(PLAN_PATH).headers
+
+    monkeypatch.setattr(settings, "DEBUG", True)
+    server_timing = client.get(PLAN_PATH).headers["server-timing"]
+    assert server_timing.startswith('db;dur=20.0;desc="2 queries", app;dur=')
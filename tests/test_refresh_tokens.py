@@ -0,0 +1,152 @@
+import uuid
+
+import pytest
+from passlib.hash import bcrypt
+
+from app.core import security
+from app.db import connection
+from app.main import app
+
+from tests.fakes import USER_ID
+
+EMAIL = "user@example.com"
+PASSWORD = "1%0TmlkiA220"
+USER = {"user_id": USER_ID, "email": EMAIL, "password": bcrypt.using(rounds=4).hash(PASSWORD)}
+
+
+class RefreshTokenTable:
+    """Answers the login and refresh token statements from an in-memory refresh_tokens table."""
+
+    def __init__(self):
+        self.tokens = {}
+
+    def __call__(self, query, params):
+        if query.startswith("SELECT * FROM users"):
+            return [USER] if params == (EMAIL,) else []
+        if query.startswith("DELETE FROM refresh_tokens"):
+            self.tokens = {
+                token_id: row for token_id, row in self.tokens.items() if not row["expired"]
+            }
+            return []
+        if query.startswith("INSERT INTO refresh_tokens"):
+            token_id, family_id, user_id, token_hash, _ = params
+            self.tokens[token_id] = {
+                "token_id": token_id, "family_id": family_id, "user_id": user_id,
+                "token_hash": token_hash, "expired": False, "used_at": None, "revoked_at": None,
+            }
+            return []
+        if query.startswith("SELECT token_id, family_id"):
+            row = self.tokens.get(params[0])
+            return [dict(row)] if row else []
+        if query.startswith("UPDATE refresh_tokens SET used_at"):
+            self.tokens[params[0]]["used_at"] = "now"
+            return []
+        if query.startswith("UPDATE refresh_tokens SET revoked_at"):
+            for row in self.tokens.values():
+                if row["family_id"] == params[0] and not row["revoked_at"]:
+                    row["revoked_at"] = "now"
+            return []
+        raise AssertionError(f"Unexpected query: {query}")
+
+    def row(self, refresh_token: str) -> dict:
+        return self.tokens[uuid.UUID(refresh_token.partition(".")[0])]
+
+
+@pytest.fixture
+def tokens(fake_db):
+    fake_db.respond = RefreshTokenTable()
+    return fake_db.respond
+
+
+def login(client) -> dict:
+    response = client.post("/login", data={"username": EMAIL, "password": PASSWORD})
+    assert response.status_code == 202, response.text
+    return response.json()
+
+
+def refresh(client, refresh_token: str):
+    return client.post("/token/refresh", json={"refresh_token": refresh_token})
+
+
+def test_login_issues_a_refresh_token_on_its_own_connection(client, tokens):
+    get_fake_db = app.dependency_overrides[connection.get_async_db]
+    borrowed = []
+
+    def counting_get_db():
+        borrowed.append(1)
+        return get_fake_db()
+
+    app.dependency_overrides[connection.get_async_db] = counting_get_db
+    token = login(client)
+
+    assert len(borrowed) == 1
+    row = tokens.row(token["refresh_token"])
+    assert row["user_id"] == USER_ID
+    # A login starts a new family of tokens
+    assert row["family_id"] == row["token_id"]
+
+
+def test_refresh_rotates_the_token_within_its_family(client, tokens):
+    first = login(client)["refresh_token"]
+
+    response = refresh(client, first)
+
+    assert response.status_code == 200, response.text
+    second = response.json()["refresh_token"]
+    assert second != first
+    assert tokens.row(first)["used_at"]
+    assert tokens.row(second)["family_id"] == tokens.row(first)["family_id"]
+    assert security.verify_access_token(response.json()["access_token"], None).user_id == USER_ID
+
+
+def test_reusing_a_spent_token_revokes_its_whole_family(client, tokens):
+    first = login(client)["refresh_token"]
+    second = refresh(client, first).json()["refresh_token"]
+    other_login = login(client)["refresh_token"]
+
+    assert refresh(client, first).status_code == 401
+    assert tokens.row(first)["revoked_at"] and tokens.row(second)["revoked_at"]
+    # The newest token of the family is no good any more, but other logins are untouched
+    assert refresh(client, second).status_code == 401
+    assert refresh(client, other_login).status_code == 200
+
+
+@pytest.mark.parametrize("state", ["expired", "revoked_at"])
+def test_expired_and_revoked_tokens_are_refused(client, tokens, state):
+    refresh_token = login(client)["refresh_token"]
+    tokens.row(refresh_token)[state] = True
+
+    response = refresh(client, refresh_token)
+
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Invalid refresh token"}
+
+
+@pytest.mark.parametrize(
+    "refresh_token", ["not-a-token", f"{uuid.uuid4()}.secret"], ids=["malformed", "unknown"]
+)
+def test_unknown_tokens_are_refused(client, tokens, refresh_token):
+    assert refresh(client, refresh_token).status_code == 401
+
+
+def test_wrong_secret_is_refused(client, tokens):
+    token_id = login(client)["refresh_token"].partition(".")[0]
+    assert refresh(client, f"{token_id}.wrong-secret").status_code == 401
+
+
+def test_revoke_logs_out_the_whole_family(client, tokens):
+    first = login(client)["refresh_token"]
+    second = refresh(client, first).json()["refresh_token"]
+
+    response = client.post("/token/revoke", json={"refresh_token": second})
+
+    assert response.status_code == 200
+    assert tokens.row(first)["revoked_at"] and tokens.row(second)["revoked_at"]
+    assert refresh(client, second).status_code == 401
+
+
+def test_revoking_an_unknown_token_looks_the_same(client, tokens):
+    response = client.post("/token/revoke", json={"refresh_token": f"{uuid.uuid4()}.secret"})
+
+    assert response.status_code == 200
+    assert response.json() == {"message": "Refresh token revoked."}
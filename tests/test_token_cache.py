@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import security, token_cache as token_cache_module
+from app.core.token_cache import TokenCache
+from app.schemas import users_schemas
+
+from tests.fakes import USER_ID
+
+TOKEN_DATA = users_schemas.TokenData(user_id=USER_ID)
+NOW = 1_700_000_000.0
+
+
+class Clock:
+    def __init__(self):
+        self.now = NOW
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(token_cache_module, "time", clock)
+    return clock
+
+
+def test_counts_hits_and_misses(clock):
+    cache = TokenCache(max_size=2, ttl=60)
+    assert cache.get("a") is None
+    cache.put("a", TOKEN_DATA, None)
+
+    assert cache.get("a") == TOKEN_DATA
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = TokenCache(max_size=2, ttl=60)
+    cache.put("a", TOKEN_DATA, None)
+
+    clock.now += 59
+    assert cache.get("a") == TOKEN_DATA
+    clock.now += 1
+    assert cache.get("a") is None
+    assert cache.get_stats()["size"] == 0
+
+
+def test_entries_never_outlive_the_tokens_exp(clock):
+    cache = TokenCache(max_size=2, ttl=60)
+    cache.put("a", TOKEN_DATA, NOW + 10)
+
+    clock.now += 10
+    assert cache.get("a") is None
+
+
+def test_evicts_the_least_recently_used_token(clock):
+    cache = TokenCache(max_size=2, ttl=60)
+    cache.put("a", TOKEN_DATA, None)
+    cache.put("b", TOKEN_DATA, None)
+    cache.get("a")
+    cache.put("c", TOKEN_DATA, None)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == cache.get("c") == TOKEN_DATA
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_disabled_cache_keeps_nothing_and_counts_nothing(clock):
+    cache = TokenCache(max_size=0, ttl=60)
+    cache.put("a", TOKEN_DATA, None)
+
+    assert cache.get("a") is None
+    stats = cache.get_stats()
+    assert stats["enabled"] is False
+    assert (stats["size"], stats["hits"], stats["misses"]) == (0, 0, 0)
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Counts the signature checks verify_access_token makes, with an empty token cache."""
+    cache = TokenCache(max_size=10, ttl=60)
+    monkeypatch.setattr(security, "token_cache", cache)
+    calls = []
+    decode = security.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(security.jwt, "decode", counting_decode)
+    return cache, calls
+
+
+def test_verified_tokens_skip_the_signature_check_until_discarded(decodes):
+    cache, calls = decodes
+    token = asyncio.run(security.create_access_token({"user_id": USER_ID}))
+    credentials_exception = HTTPException(status_code=401)
+
+    assert security.verify_access_token(token, credentials_exception) == TOKEN_DATA
+    assert security.verify_access_token(token, credentials_exception) == TOKEN_DATA
+    assert len(calls) == 1
+
+    cache.discard(token)
+    assert security.verify_access_token(token, credentials_exception) == TOKEN_DATA
+    assert len(calls) == 2
+
+
+def test_expired_tokens_are_checked_again_and_rejected(decodes):
+    cache, calls = decodes
+    token = security.jwt.encode(
+        {"user_id": USER_ID, "exp": 1}, security.SECRET_KEY, security.ALGORITHM
+    )
+    # Cached as if verified before it expired; its exp bounds the entry
+    cache.put(token, TOKEN_DATA, 1)
+
+    with pytest.raises(HTTPException) as raised:
+        security.verify_access_token(token, HTTPException(status_code=401))
+    assert raised.value.status_code == 401
+    assert calls == [token]
@@ -0,0 +1,55 @@
+from app.core.query_stats import assert_max_queries
+
+from tests.fakes import PLAN_BODY, make_plan, plan_writes_responder, plans_responder
+
+# A plan listing or lookup checks the version, then fetches the plans with their exercises;
+# exercise details come from the in-memory catalog
+PLAN_QUERIES = 2
+
+
+def query_counts(client, fake_db, path: str, n_plans: int, exercises_per_plan: int = 8):
+    fake_db.respond = plans_responder(n_plans, exercises_per_plan)
+    with assert_max_queries(PLAN_QUERIES) as seen:
+        response = client.get(path)
+    assert response.status_code == 200, response.text
+    return response, [stats.count for _, _, stats in seen]
+
+
+def test_list_workout_plans_query_count_does_not_grow_with_plans(client, fake_db):
+    one, one_counts = query_counts(client, fake_db, "/workout-plans?limit=50", n_plans=1)
+    many, many_counts = query_counts(client, fake_db, "/workout-plans?limit=50", n_plans=50)
+
+    assert one_counts == many_counts == [PLAN_QUERIES]
+    assert len(one.json()) == 1
+    assert len(many.json()) == 50
+    assert all(len(plan["exercises"]) == 8 for plan in many.json())
+
+
+def test_get_workout_plan_query_count_does_not_grow_with_exercises(client, fake_db):
+    plan_id = make_plan(0, 1)["plan_id"]
+    few, few_counts = query_counts(
+        client, fake_db, f"/workout-plans/{plan_id}", n_plans=1, exercises_per_plan=1
+    )
+    many, many_counts = query_counts(
+        client, fake_db, f"/workout-plans/{plan_id}", n_plans=1, exercises_per_plan=50
+    )
+
+    assert few_counts == many_counts == [PLAN_QUERIES]
+    assert len(many.json()["exercises"]) == 50
+    assert many.json()["exercises"][0]["exercise_name"] == "Exercise 1"
+    assert many.json()["metadata"] == {"exercise_count": 50}
+
+
+def test_create_and_update_return_the_plan(client, fake_db):
+    fake_db.respond = plan_writes_responder()
+    plan = make_plan(0, 1)
+
+    created = client.post("/workout-plans", json=PLAN_BODY)
+    updated = client.put(f"/workout-plans/{plan['plan_id']}", json=PLAN_BODY)
+
+    assert (created.status_code, updated.status_code) == (201, 200)
+    assert created.json() == updated.json()
+    assert created.json()["plan_id"] == plan["plan_id"]
+    assert created.json()["created_at"] == plan["created_at"].isoformat()
+    [exercise] = created.json()["exercises"]
+    assert exercise["exercise_name"] == "Exercise 1"